@@ -0,0 +1,68 @@
+"""
+Benchmark de l'ordonnanceur des complétions OpenAI (CompletionScheduler)
+
+Envoie une rafale de générations de lettres distinctes à un faux client OpenAI
+en mémoire, derrière un ordonnanceur aux limites réduites, et affiche le pic
+d'appels simultanés vu par le « fournisseur » et le temps d'attente en file.
+
+Usage:
+    python -m benchmarks.bench_completion_scheduler --requests 200 --concurrency 10 --rpm 120 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stubs import FakeOpenAIClient
+from scheduler import CompletionScheduler
+
+
+async def run(requests: int, concurrency: int, rpm: int, tpm: int, latency: float) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    from letter import LetterGenerator
+    from models import LetterRequest, TonEnum
+
+    client = FakeOpenAIClient(latency=latency)
+    # Fenêtre de 10 s au lieu d'une minute pour garder un benchmark court
+    scheduler = CompletionScheduler(max_concurrency=concurrency, requests_per_minute=rpm, tokens_per_minute=tpm, window=10.0)
+    generator = LetterGenerator(client=client, scheduler=scheduler)
+
+    letters = [
+        LetterRequest(
+            nom="Jean Dupont",
+            adresse="123 Rue de la Paix, 75001 Paris",
+            destinataire="Monsieur Martin",
+            objet=f"Demande de rendez-vous n°{index}",
+            contexte="Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+            ton=TonEnum.FORMEL
+        )
+        for index in range(requests)
+    ]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(generator.generate_letter(letter) for letter in letters), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    failures = sum(isinstance(result, Exception) for result in results)
+    stats = scheduler.stats()
+    print(f"{'Requêtes / échecs':<32}: {requests} / {failures}")
+    print(f"{'Durée totale':<32}: {elapsed:.2f} s")
+    print(f"{'Appels simultanés (pic)':<32}: {client.max_active} (limite {concurrency})")
+    print(f"{'Requêtes dans la fenêtre':<32}: {stats['requests_in_window']} (limite {rpm})")
+    print(f"{'Attente en file p50 / p95 / max':<32}: {stats['queue_wait_ms']['p50']:.0f} / {stats['queue_wait_ms']['p95']:.0f} / {stats['queue_wait_ms']['max']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Nombre de lettres demandées simultanément")
+    parser.add_argument("--concurrency", type=int, default=10, help="Appels OpenAI simultanés maximum")
+    parser.add_argument("--rpm", type=int, default=120, help="Budget de requêtes sur la fenêtre")
+    parser.add_argument("--tpm", type=int, default=1000000, help="Budget de tokens sur la fenêtre")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence simulée d'OpenAI (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.rpm, args.tpm, args.latency))
+
+
+if __name__ == "__main__":
+    main()
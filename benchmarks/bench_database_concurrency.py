@@ -0,0 +1,81 @@
+"""
+Benchmark des lectures concurrentes : client Supabase synchrone vs DatabaseManager asynchrone
+
+Un bouchon PostgREST local (servi dans un thread) simule la latence de Supabase.
+On lance N lectures par ID en parallèle depuis des coroutines, d'abord avec le
+client synchrone appelé dans la boucle (ancien comportement), puis avec le
+DatabaseManager asynchrone et son pool de connexions.
+
+Usage:
+    python -m benchmarks.bench_database_concurrency --requests 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+from supabase import create_client
+
+from benchmarks.stubs import create_postgrest_stub, run_stub_in_thread
+from database import DatabaseManager
+
+# Clé factice au format JWT (seul le format est vérifié par le client Supabase)
+ANON_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.bench"
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "destinataire": "Monsieur Martin",
+    "objet": "Demande de rendez-vous",
+    "contexte": "Je souhaite prendre rendez-vous.",
+    "ton": "formel",
+    "lettre_generée": "Monsieur Martin,\n\nJe me permets de vous contacter.\n\nCordialement,\nJean Dupont"
+}
+
+
+async def run(requests: int, latency: float) -> None:
+    app = create_postgrest_stub(latency=latency)
+
+    with run_stub_in_thread(app) as base_url:
+        database = DatabaseManager(DatabaseManager._create_client(base_url, ANON_KEY))
+        letter_id = (await database.save_letter(LETTER))["letter_id"]
+
+        # Ancien comportement : appel bloquant dans une coroutine
+        supabase = create_client(base_url, ANON_KEY)
+
+        async def blocking_read():
+            return supabase.table("letters").select("*").eq("id", letter_id).execute()
+
+        await blocking_read()
+        start = time.perf_counter()
+        await asyncio.gather(*(blocking_read() for _ in range(requests)))
+        blocking = time.perf_counter() - start
+
+        # Préchauffage du pool puis lectures asynchrones
+        await asyncio.gather(*(database.get_letter_by_id(letter_id) for _ in range(requests)))
+        app.state.max_active = 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*(database.get_letter_by_id(letter_id) for _ in range(requests)))
+        concurrent = time.perf_counter() - start
+        overlap = app.state.max_active
+
+        await database.close()
+
+    assert all(result["success"] for result in results)
+    print(f"{'Latence simulée':<32}: {latency * 1000:.0f} ms")
+    print(f"{'Client synchrone':<32}: {blocking:.3f} s ({requests / blocking:.1f} lectures/s)")
+    print(f"{'DatabaseManager asynchrone':<32}: {concurrent:.3f} s ({requests / concurrent:.1f} lectures/s)")
+    print(f"{'Requêtes simultanées (pic)':<32}: {overlap}")
+    print(f"{'Accélération':<32}: x{blocking / concurrent:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Nombre de lectures concurrentes")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée de Supabase (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
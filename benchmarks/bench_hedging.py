@@ -0,0 +1,74 @@
+"""
+Benchmark du hedging des générations (CallPolicy)
+
+Génère des lettres distinctes auprès d'un faux client OpenAI en mémoire dont
+une fraction des appels reste bloquée longtemps, et compare la latence de bout
+en bout sans puis avec hedging (requête de secours lancée au p95).
+
+Usage:
+    python -m benchmarks.bench_hedging --requests 400 --latency 0.05 --stall-rate 0.03 --stall-latency 2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stubs import FakeOpenAIClient
+from resilience import CallPolicy
+from scheduler import CompletionScheduler
+
+
+async def measure(hedging: bool, requests: int, concurrency: int, latency: float,
+                  stall_rate: float, stall_latency: float) -> None:
+    from letter import LetterGenerator
+    from models import LetterRequest, TonEnum
+
+    client = FakeOpenAIClient(latency=latency, stall_rate=stall_rate, stall_latency=stall_latency)
+    policy = CallPolicy(attempt_timeout=stall_latency * 2, deadline=stall_latency * 4, hedging=hedging, hedge_min_delay=latency)
+    generator = LetterGenerator(client=client, scheduler=CompletionScheduler(max_concurrency=1000), policy=policy)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> float:
+        letter = LetterRequest(
+            nom="Jean Dupont",
+            adresse="123 Rue de la Paix, 75001 Paris",
+            destinataire="Monsieur Martin",
+            objet=f"Demande de rendez-vous n°{index}",
+            contexte="Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+            ton=TonEnum.FORMEL
+        )
+        async with semaphore:
+            start = time.perf_counter()
+            await generator.generate_letter(letter)
+            return time.perf_counter() - start
+
+    durations = sorted(await asyncio.gather(*(one(index) for index in range(requests))))
+    stats = policy.stats()
+
+    label = "avec hedging" if hedging else "sans hedging"
+    p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+    print(f"{'Latence p50 / p99 ' + label:<32}: {statistics.median(durations) * 1000:.0f} / {p99 * 1000:.0f} ms")
+    print(f"{'Appels OpenAI ' + label:<32}: {client.calls} ({stats['hedges']} requêtes de secours, {stats['hedge_wins']} gagnantes)")
+
+
+async def run(requests: int, concurrency: int, latency: float, stall_rate: float, stall_latency: float) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    for hedging in (False, True):
+        await measure(hedging, requests, concurrency, latency, stall_rate, stall_latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400, help="Nombre de lettres générées")
+    parser.add_argument("--concurrency", type=int, default=50, help="Générations simultanées")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence normale d'OpenAI (s)")
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="Proportion d'appels bloqués")
+    parser.add_argument("--stall-latency", type=float, default=2.0, help="Durée d'un appel bloqué (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.latency, args.stall_rate, args.stall_latency))
+
+
+if __name__ == "__main__":
+    main()
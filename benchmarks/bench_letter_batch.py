@@ -0,0 +1,75 @@
+"""
+Benchmark de POST /generate-letters/batch
+
+L'application tourne en mémoire (transport ASGI) avec un faux client OpenAI et
+un stockage SQLite temporaire. On compare N appels successifs à /generate-letter
+avec un seul lot de N lettres.
+
+Usage:
+    python -m benchmarks.bench_letter_batch --letters 20 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.stubs import FakeOpenAIClient
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "contexte": "Livraison incomplète de la commande du 3 mars, merci de procéder au remboursement.",
+    "objet": "Réclamation",
+    "ton": "formel"
+}
+
+
+async def run(letters: int, latency: float) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    import main
+    from letter import LetterGenerator
+    from sqlite_storage import SQLiteDatabaseManager
+    from write_behind import WriteBehindBuffer
+
+    with tempfile.TemporaryDirectory() as directory:
+        main.database_manager = SQLiteDatabaseManager(os.path.join(directory, "bench.db"))
+        main.letter_generator = LetterGenerator(client=FakeOpenAIClient(latency=latency))
+        main.write_buffer = WriteBehindBuffer(main.database_manager)
+        main.write_buffer.start()
+
+        requests = [dict(LETTER, destinataire=f"Fournisseur n°{index}") for index in range(letters)]
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            start = time.perf_counter()
+            for request in requests:
+                (await client.post("/generate-letter", json=request)).raise_for_status()
+            serial = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = await client.post("/generate-letters/batch", json={"letters": requests}, params={"cache": "bypass"})
+            response.raise_for_status()
+            batch = time.perf_counter() - start
+
+        await main.write_buffer.stop()
+        await main.database_manager.close()
+
+    print(f"{'Latence simulée':<32}: {latency:.3f} s")
+    print(f"{f'{letters} appels successifs':<32}: {serial:.3f} s")
+    print(f"{f'Lot de {letters} lettres':<32}: {batch:.3f} s ({response.json()['failed']} échec(s))")
+    print(f"{'Accélération':<32}: x{serial / batch:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--letters", type=int, default=20, help="Nombre de lettres du lot")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latence simulée d'OpenAI (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.letters, args.latency))
+
+
+if __name__ == "__main__":
+    main()
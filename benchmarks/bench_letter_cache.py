@@ -0,0 +1,61 @@
+"""
+Benchmark du cache de génération de lettres
+
+Mesure le temps d'une génération non cachée (faux backend OpenAI en mémoire)
+puis celui d'un succès de cache pour la même requête, y compris le calcul
+de l'empreinte canonique.
+
+Usage:
+    python -m benchmarks.bench_letter_cache --latency 0.5 --lookups 10000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.stubs import FakeOpenAIClient
+from cache import TTLCache
+from letter import LetterGenerator
+from models import LetterRequest, TonEnum
+
+
+async def run(latency: float, lookups: int) -> None:
+    cache = TTLCache(max_entries=1000, ttl=3600)
+    client = FakeOpenAIClient(latency=latency, content="Madame, Monsieur,\n\n" + "Lorem ipsum dolor sit amet. " * 60)
+    generator = LetterGenerator(client=client, cache=cache)
+    request = LetterRequest(
+        nom="Luc Moreau",
+        adresse="22 Place du Commerce, 44000 Nantes",
+        destinataire="Service Client",
+        adresse_destinataire="Société XYZ\nService Client\n1 Rue de l'Industrie\n75001 Paris",
+        objet="Réclamation - Commande #12345",
+        contexte="Ma commande livrée le 10/01/2024 contient un article défectueux. Je demande un remboursement ou un échange.",
+        ton=TonEnum.CONCIS
+    )
+
+    start = time.perf_counter()
+    await generator.generate_letter(request)
+    miss = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(lookups):
+        await generator.generate_letter(request)
+    hit = (time.perf_counter() - start) / lookups
+
+    stats = cache.stats()
+    print(f"{'Génération (miss)':<24}: {miss * 1000:.1f} ms")
+    print(f"{'Succès de cache (hit)':<24}: {hit * 1e6:.1f} µs")
+    print(f"{'Appels au faux backend':<24}: {client.calls}")
+    print(f"{'Statistiques du cache':<24}: hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée d'OpenAI (s)")
+    parser.add_argument("--lookups", type=int, default=10000, help="Nombre de lectures en cache")
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
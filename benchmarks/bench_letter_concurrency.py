@@ -0,0 +1,72 @@
+"""
+Benchmark de débit concurrent de LetterGenerator.generate_letter
+
+Lance un bouchon OpenAI local avec une latence fixe puis compare le temps
+d'exécution de N générations en série et en parallèle.
+
+Usage:
+    python -m benchmarks.bench_letter_concurrency --requests 50 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stubs import create_openai_stub, run_stub
+
+
+async def run(requests: int, latency: float) -> None:
+    async with run_stub(create_openai_stub(latency=latency)) as base_url:
+        os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+        from letter import LetterGenerator
+        from llm_client import close_openai_client
+        from models import LetterRequest, TonEnum
+
+        generator = LetterGenerator()
+        request = LetterRequest(
+            nom="Jean Dupont",
+            adresse="123 Rue de la Paix, 75001 Paris",
+            destinataire="Monsieur Martin",
+            objet="Demande de rendez-vous",
+            contexte="Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+            ton=TonEnum.FORMEL
+        )
+
+        def distinct(index: int) -> LetterRequest:
+            # Objet unique : des requêtes identiques seraient regroupées en une seule génération
+            return request.model_copy(update={"objet": f"Demande de rendez-vous n°{index}"})
+
+        # Préchauffage de la connexion
+        await generator.generate_letter(distinct(-1))
+
+        start = time.perf_counter()
+        for index in range(min(requests, 5)):
+            await generator.generate_letter(distinct(index))
+        serial = (time.perf_counter() - start) / min(requests, 5)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(generator.generate_letter(distinct(requests + index)) for index in range(requests)))
+        concurrent = time.perf_counter() - start
+
+        await close_openai_client()
+
+    print(f"Latence simulée        : {latency:.3f} s")
+    print(f"Latence série / appel  : {serial:.3f} s")
+    print(f"{requests} appels concurrents : {concurrent:.3f} s")
+    print(f"Débit concurrent       : {requests / concurrent:.1f} lettres/s")
+    print(f"Débit série estimé     : {1 / serial:.1f} lettres/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Nombre d'appels concurrents")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée d'OpenAI (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
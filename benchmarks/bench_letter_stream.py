@@ -0,0 +1,75 @@
+"""
+Benchmark du temps jusqu'au premier fragment (TTFB) de LetterGenerator.stream_letter
+
+Compare, face à un bouchon OpenAI local, le délai avant le premier fragment
+streamé au délai d'une génération complète via generate_letter.
+
+Usage:
+    python -m benchmarks.bench_letter_stream --requests 20 --latency 2.0
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stubs import create_openai_stub, run_stub
+
+LETTER = " ".join(["Madame, Monsieur, je vous écris au sujet de ma demande."] * 40)
+
+
+async def _timed_stream(generator, request):
+    start = time.perf_counter()
+    first = None
+    async for _ in generator.stream_letter(request):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def _timed_full(generator, request):
+    start = time.perf_counter()
+    await generator.generate_letter(request)
+    return time.perf_counter() - start
+
+
+async def run(requests: int, latency: float) -> None:
+    async with run_stub(create_openai_stub(latency=latency, content=LETTER)) as base_url:
+        os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+        from letter import LetterGenerator
+        from llm_client import close_openai_client
+        from models import LetterRequest, TonEnum
+
+        generator = LetterGenerator()
+        request = LetterRequest(
+            nom="Jean Dupont",
+            adresse="123 Rue de la Paix, 75001 Paris",
+            destinataire="Monsieur Martin",
+            objet="Demande de rendez-vous",
+            contexte="Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+            ton=TonEnum.FORMEL
+        )
+
+        streamed = await asyncio.gather(*(_timed_stream(generator, request) for _ in range(requests)))
+        full = await asyncio.gather(*(_timed_full(generator, request) for _ in range(requests)))
+
+        await close_openai_client()
+
+    print(f"{'TTFB streaming (médiane)':<32}: {statistics.median(t for t, _ in streamed) * 1000:.0f} ms")
+    print(f"{'Durée streaming (médiane)':<32}: {statistics.median(t for _, t in streamed) * 1000:.0f} ms")
+    print(f"{'Réponse complète (médiane)':<32}: {statistics.median(full) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="Nombre de générations concurrentes")
+    parser.add_argument("--latency", type=float, default=2.0, help="Durée simulée de la complétion (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
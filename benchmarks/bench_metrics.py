@@ -0,0 +1,52 @@
+"""
+Benchmark du coût d'enregistrement des métriques (metrics.py)
+
+Mesure le temps par appel d'un compteur, d'un histogramme et d'une étape
+complète (metrics.stage), ainsi que le temps de rendu de GET /metrics.
+
+Usage:
+    python -m benchmarks.bench_metrics --iterations 200000
+"""
+
+import argparse
+import time
+
+import metrics
+
+
+def _per_call(function, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _stage() -> None:
+    with metrics.stage("bench", "noop"):
+        pass
+
+
+def run(iterations: int) -> None:
+    counter = _per_call(lambda: metrics.ERRORS.inc(stage="bench", cause="noop"), iterations)
+    histogram = _per_call(lambda: metrics.STAGE_DURATION.observe(0.003, stage="bench", operation="observe"), iterations)
+    stage = _per_call(_stage, iterations)
+
+    start = time.perf_counter()
+    text = metrics.REGISTRY.render()
+    render = (time.perf_counter() - start) * 1000
+
+    print(f"{'Compteur (inc)':<32}: {counter:.2f} µs")
+    print(f"{'Histogramme (observe)':<32}: {histogram:.2f} µs")
+    print(f"{'Étape (metrics.stage)':<32}: {stage:.2f} µs")
+    print(f"{'Rendu de /metrics':<32}: {render:.2f} ms ({len(text)} octets)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="Enregistrements mesurés par opération")
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
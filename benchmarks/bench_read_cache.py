@@ -0,0 +1,86 @@
+"""
+Benchmark du cache de lecture de DatabaseManager (/letters/{id}, /discours/{id})
+
+Un bouchon PostgREST local simule la latence de Supabase. On lit plusieurs fois
+un petit ensemble de lettres (liens de partage très consultés), sans puis avec
+cache, puis on vérifie qu'une mise à jour du statut d'email invalide l'entrée.
+
+Usage:
+    python -m benchmarks.bench_read_cache --reads 500 --letters 20 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.stubs import create_postgrest_stub, run_stub
+from cache import TTLCache
+from database import DatabaseManager
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "destinataire": "Monsieur Martin",
+    "objet": "Demande de rendez-vous",
+    "contexte": "Je souhaite prendre rendez-vous.",
+    "ton": "formel",
+    "lettre_generée": "Monsieur Martin,\n\nJe me permets de vous contacter.\n\nCordialement,\nJean Dupont"
+}
+
+
+async def _read_all(database: DatabaseManager, letter_ids, reads: int):
+    async def timed(letter_id):
+        start = time.perf_counter()
+        await database.get_letter_by_id(letter_id)
+        return time.perf_counter() - start
+
+    # Par vagues de 20 lectures simultanées
+    timings = []
+    for offset in range(0, reads, 20):
+        wave = [random.choice(letter_ids) for _ in range(min(20, reads - offset))]
+        timings.extend(await asyncio.gather(*(timed(letter_id) for letter_id in wave)))
+    return timings
+
+
+async def run(reads: int, letters: int, latency: float) -> None:
+    app = create_postgrest_stub(latency=latency)
+
+    async with run_stub(app) as base_url:
+        uncached = DatabaseManager(DatabaseManager._create_client(base_url, "bench"))
+        cached = DatabaseManager(DatabaseManager._create_client(base_url, "bench"), cache=TTLCache(max_entries=1000, ttl=300))
+        letter_ids = [(await uncached.save_letter(LETTER))["letter_id"] for _ in range(letters)]
+
+        requests = app.state.requests
+        plain = await _read_all(uncached, letter_ids, reads)
+        plain_requests = app.state.requests - requests
+
+        requests = app.state.requests
+        hot = await _read_all(cached, letter_ids, reads)
+        cached_requests = app.state.requests - requests
+
+        await cached.update_email_status(letter_ids[0], True, "jean.dupont@email.com")
+        refreshed = (await cached.get_letter_by_id(letter_ids[0]))["letter"]["email_envoye"]
+
+        await uncached.close()
+        await cached.close()
+
+    stats = cached.cache.stats()
+    print(f"{'Sans cache (médiane)':<32}: {statistics.median(plain) * 1000:.2f} ms, {plain_requests} requêtes")
+    print(f"{'Avec cache (médiane)':<32}: {statistics.median(hot) * 1e6:.1f} µs, {cached_requests} requêtes")
+    print(f"{'Taux de succès du cache':<32}: {stats['hit_rate']:.1%} ({stats['entries']} entrées, {stats['bytes']} octets)")
+    print(f"{'Statut relu après mise à jour':<32}: email_envoye={refreshed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=500, help="Nombre de lectures")
+    parser.add_argument("--letters", type=int, default=20, help="Nombre de lettres distinctes lues")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée de Supabase (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.reads, args.letters, args.latency))
+
+
+if __name__ == "__main__":
+    main()
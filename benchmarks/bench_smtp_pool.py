@@ -0,0 +1,76 @@
+"""
+Benchmark de latence d'envoi d'email : pool de sessions SMTP vs connexion par envoi
+
+Un puits SMTP local simule le coût de la poignée de main (TLS + login) d'un
+serveur distant. On compare l'ancienne stratégie (nouvelle connexion à chaque
+email) à EmailSender appuyé sur SMTPConnectionPool.
+
+Usage:
+    python -m benchmarks.bench_smtp_pool --emails 50 --handshake 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import aiosmtplib
+
+from benchmarks.stubs import SMTPSink
+from smtp_pool import SMTPConnectionPool
+
+REQUEST_DATA = {"objet": "Demande de rendez-vous", "ton": "formel", "nom": "Jean Dupont", "destinataire": "Monsieur Martin"}
+LETTER = "Monsieur Martin,\n\nJe me permets de vous contacter concernant une demande de rendez-vous.\n\nCordialement,\nJean Dupont"
+
+
+async def run(emails: int, handshake: float, pool_size: int) -> None:
+    os.environ.setdefault("SMTP_USERNAME", "bench@example.com")
+    os.environ.setdefault("SMTP_PASSWORD", "bench")
+
+    from mailer import EmailSender
+
+    async with SMTPSink(handshake_latency=handshake) as sink:
+        pool = SMTPConnectionPool("127.0.0.1", sink.port, "bench@example.com", "bench", size=pool_size, use_tls=False)
+        sender = EmailSender(pool=pool)
+
+        # Ancienne stratégie : une connexion + login par email
+        fresh = []
+        for _ in range(min(emails, 10)):
+            msg = sender._build_letter_message("dest@example.com", LETTER, REQUEST_DATA)
+            start = time.perf_counter()
+            await aiosmtplib.send(msg, hostname="127.0.0.1", port=sink.port, username="bench@example.com", password="bench")
+            fresh.append(time.perf_counter() - start)
+
+        # Pool : sessions authentifiées réutilisées
+        pooled = []
+        for _ in range(emails):
+            start = time.perf_counter()
+            await sender.send_letter_email("dest@example.com", LETTER, REQUEST_DATA)
+            pooled.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sender.send_letter_email("dest@example.com", LETTER, REQUEST_DATA) for _ in range(emails)))
+        concurrent = time.perf_counter() - start
+
+        stats = pool.stats()
+        await sender.close()
+
+    print(f"{'Connexion par email (médiane)':<34}: {statistics.median(fresh) * 1000:.1f} ms")
+    print(f"{'Pool SMTP (médiane)':<34}: {statistics.median(pooled) * 1000:.1f} ms")
+    print(f"{f'{emails} emails concurrents (pool)':<34}: {concurrent:.3f} s")
+    print(f"{'Connexions ouvertes par le pool':<34}: {stats['connections_opened']}")
+    print(f"{'Messages reçus par le puits':<34}: {len(sink.messages)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50, help="Nombre d'emails envoyés")
+    parser.add_argument("--handshake", type=float, default=0.3, help="Coût simulé connexion + login (s)")
+    parser.add_argument("--pool-size", type=int, default=3, help="Taille du pool SMTP")
+    args = parser.parse_args()
+    asyncio.run(run(args.emails, args.handshake, args.pool_size))
+
+
+if __name__ == "__main__":
+    main()
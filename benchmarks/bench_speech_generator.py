@@ -0,0 +1,90 @@
+"""
+Benchmark de SpeechGenerator avec un faux backend en mémoire
+
+Mesure la construction du prompt puis le débit de N discours concurrents,
+seuls ou mêlés à autant de lettres, afin de vérifier que les deux
+générateurs se chevauchent sans se bloquer.
+
+Usage:
+    python -m benchmarks.bench_speech_generator --requests 50 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.stubs import FakeOpenAIClient
+from letter import LetterGenerator
+from models import LetterRequest, SpeechRequest, TonEnum
+from speech import SpeechGenerator
+
+
+SPEECH_REQUEST = SpeechRequest(
+    prenom="Claire",
+    marie="Julie",
+    partenaire="Thomas",
+    lien="meilleure amie",
+    style="émouvant et drôle",
+    qualites="généreuse, loyale, pleine d'humour",
+    anecdotes="Le jour où nous nous sommes perdues à Rome en cherchant la fontaine de Trevi",
+    souvenir="Notre premier camp de vacances",
+    rencontre="Lors d'un cours de salsa à Lyon",
+    duree="3 minutes"
+)
+
+LETTER_REQUEST = LetterRequest(
+    nom="Jean Dupont",
+    adresse="123 Rue de la Paix, 75001 Paris",
+    destinataire="Monsieur Martin",
+    objet="Demande de rendez-vous",
+    contexte="Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+    ton=TonEnum.NEUTRE
+)
+
+
+def _speech(index: int) -> SpeechRequest:
+    # Requêtes distinctes : des requêtes identiques seraient regroupées en une seule génération
+    return SPEECH_REQUEST.model_copy(update={"anecdotes": f"{SPEECH_REQUEST.anecdotes} (n°{index})"})
+
+
+def _letter(index: int) -> LetterRequest:
+    return LETTER_REQUEST.model_copy(update={"objet": f"Demande de rendez-vous n°{index}"})
+
+
+async def run(requests: int, latency: float) -> None:
+    client = FakeOpenAIClient(latency=latency)
+    speeches = SpeechGenerator(client=client)
+    letters = LetterGenerator(client=client)
+
+    iterations = 10000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        speeches._build_prompt(SPEECH_REQUEST)
+    prompt_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    await asyncio.gather(*(speeches.generate_speech(_speech(index)) for index in range(requests)))
+    speeches_only = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(speeches.generate_speech(_speech(requests + index)) for index in range(requests)),
+        *(letters.generate_letter(_letter(index)) for index in range(requests))
+    )
+    mixed = time.perf_counter() - start
+
+    print(f"{'_build_prompt':<32}: {prompt_us:.1f} µs/appel")
+    print(f"{f'{requests} discours concurrents':<32}: {speeches_only:.3f} s (latence simulée {latency:.3f} s)")
+    print(f"{f'{requests} discours + {requests} lettres':<32}: {mixed:.3f} s")
+    print(f"{'Appels au faux backend':<32}: {client.calls}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Nombre de discours concurrents")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée d'OpenAI (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark des backends de stockage : Supabase (bouchon PostgREST) vs SQLite local (WAL)
+
+Mesure la latence médiane d'une sauvegarde, d'une lecture par ID et d'une page
+de liste, pour chaque backend. La latence du bouchon simule l'aller-retour réseau
+vers Supabase.
+
+Usage:
+    python -m benchmarks.bench_storage_backends --operations 200 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stubs import create_postgrest_stub, run_stub
+from database import DatabaseManager
+from sqlite_storage import SQLiteDatabaseManager
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "destinataire": "Monsieur Martin",
+    "objet": "Demande de rendez-vous",
+    "contexte": "Je souhaite prendre rendez-vous.",
+    "ton": "formel",
+    "lettre_generée": "Monsieur Martin,\n\nJe me permets de vous contacter.\n\nCordialement,\nJean Dupont"
+}
+
+
+async def _median(operation, count: int) -> float:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await operation()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def _measure(name: str, storage, operations: int) -> None:
+    letter_id = (await storage.save_letter(LETTER))["letter_id"]
+
+    save = await _median(lambda: storage.save_letter(LETTER), operations)
+    read = await _median(lambda: storage.get_letter_by_id(letter_id), operations)
+    page = await _median(lambda: storage.get_recent_letters(20), operations)
+
+    print(f"{name:<10}: sauvegarde {save:7.3f} ms | lecture {read:7.3f} ms | page de 20 {page:7.3f} ms")
+
+
+async def run(operations: int, latency: float) -> None:
+    async with run_stub(create_postgrest_stub(latency=latency)) as base_url:
+        supabase = DatabaseManager(DatabaseManager._create_client(base_url, "bench"))
+        await _measure("Supabase", supabase, operations)
+        await supabase.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite = SQLiteDatabaseManager(os.path.join(directory, "bench.db"))
+        await _measure("SQLite", sqlite, operations)
+        await sqlite.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=200, help="Nombre d'opérations par mesure")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence simulée de Supabase (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.operations, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark de l'écriture différée (WriteBehindBuffer) face à des sauvegardes directes
+
+Un faux DatabaseManager simule la latence d'un aller-retour Supabase. On compare
+la latence vue par l'API et le nombre de requêtes base pour N lettres sauvegardées
+en parallèle.
+
+Usage:
+    python -m benchmarks.bench_write_behind --letters 200 --db-latency 0.05
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stubs import FakeDatabaseManager
+from write_behind import WriteBehindBuffer
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "destinataire": "Monsieur Martin",
+    "adresse_destinataire": None,
+    "objet": "Demande de rendez-vous",
+    "contexte": "Je souhaite prendre rendez-vous.",
+    "date_effet": None,
+    "ton": "formel",
+    "lettre_generée": "Monsieur Martin,\n\nJe me permets de vous contacter.\n\nCordialement,\nJean Dupont",
+    "email_destinataire": None,
+    "email_envoye": False
+}
+
+
+async def _timed(save):
+    start = time.perf_counter()
+    await save(dict(LETTER))
+    return time.perf_counter() - start
+
+
+async def run(letters: int, db_latency: float, max_batch: int) -> None:
+    direct_db = FakeDatabaseManager(latency=db_latency)
+    direct = await asyncio.gather(*(_timed(direct_db.save_letter) for _ in range(letters)))
+
+    buffered_db = FakeDatabaseManager(latency=db_latency)
+    buffer = WriteBehindBuffer(buffered_db, max_batch=max_batch, flush_interval=0.2)
+    buffer.start()
+    buffered = await asyncio.gather(*(_timed(buffer.save_letter) for _ in range(letters)))
+    depth = buffer.queue_depth()
+    start = time.perf_counter()
+    await buffer.stop()
+    drain = time.perf_counter() - start
+
+    print(f"{'Sauvegarde directe (médiane)':<34}: {statistics.median(direct) * 1000:.2f} ms, {direct_db.requests} requêtes")
+    print(f"{'Écriture différée (médiane)':<34}: {statistics.median(buffered) * 1e6:.1f} µs")
+    print(f"{'Profondeur du tampon avant arrêt':<34}: {depth}")
+    print(f"{'Vidage du tampon':<34}: {drain * 1000:.1f} ms")
+    print(f"{'Requêtes base (écriture différée)':<34}: {buffered_db.requests} pour {len(buffered_db.tables['letters'])} lignes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--letters", type=int, default=200, help="Nombre de lettres sauvegardées")
+    parser.add_argument("--db-latency", type=float, default=0.05, help="Latence simulée d'un aller-retour base (s)")
+    parser.add_argument("--max-batch", type=int, default=50, help="Taille des lots d'insertion")
+    args = parser.parse_args()
+    asyncio.run(run(args.letters, args.db_latency, args.max_batch))
+
+
+if __name__ == "__main__":
+    main()
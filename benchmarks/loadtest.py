@@ -0,0 +1,308 @@
+"""
+Test de charge de l'application complète, avec des bouchons locaux
+
+Démarre un faux OpenAI (latence configurable, streaming compris), un puits SMTP
+et un faux PostgREST, lance l'application (uvicorn, dans un processus séparé)
+configurée pour les utiliser, puis exerce chaque endpoint de main.py à la
+concurrence demandée. Le débit et les latences p50/p95/p99 de chaque scénario
+sont écrits en JSON : ce fichier sert de référence pour les comparaisons
+suivantes (code de sortie 1 en cas de régression au-delà de la tolérance).
+
+Usage:
+    python -m benchmarks.loadtest --requests 200 --concurrency 20 --output loadtest.json
+    python -m benchmarks.loadtest --baseline loadtest.json --tolerance 0.2
+    python -m benchmarks.loadtest --scenarios generate_letter,letter_by_id --storage sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.stubs import _free_port, create_openai_stub, create_postgrest_stub, run_smtp_sink_in_thread, run_stub_in_thread
+
+LETTER = {
+    "nom": "Jean Dupont",
+    "adresse": "123 Rue de la Paix, 75001 Paris",
+    "destinataire": "Monsieur Martin",
+    "contexte": "Je souhaite prendre rendez-vous pour discuter d'un projet important.",
+    "ton": "formel"
+}
+SPEECH = {"prenom": "Julie", "marie": "Paul", "partenaire": "Claire", "lien": "Sœur du marié", "style": "émouvant"}
+EMAIL = "destinataire@example.com"
+EXPORT_TOKEN = "loadtest"
+
+Scenario = Callable[[httpx.AsyncClient, int, Dict[str, Any]], Awaitable[httpx.Response]]
+
+
+def _letter(index: int) -> Dict[str, Any]:
+    # Objet unique : des requêtes identiques seraient regroupées en une seule génération
+    return dict(LETTER, objet=f"Demande de rendez-vous n°{index}")
+
+
+def _speech(index: int) -> Dict[str, Any]:
+    return dict(SPEECH, anecdotes=f"Anecdote n°{index}")
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "root": lambda client, index, state: client.get("/"),
+    "ping": lambda client, index, state: client.get("/ping"),
+    "health": lambda client, index, state: client.get("/health"),
+    "metrics": lambda client, index, state: client.get("/metrics"),
+    "generate_letter": lambda client, index, state: client.post("/generate-letter", json=_letter(index)),
+    "generate_letter_stream": lambda client, index, state: client.post("/generate-letter/stream", json=_letter(index)),
+    "generate_letters_batch": lambda client, index, state: client.post(
+        "/generate-letters/batch", json={"letters": [_letter(index * 5 + offset) for offset in range(5)]}
+    ),
+    "send_email": lambda client, index, state: client.post("/send-email", json={
+        "lettre": state["letter"], "email": EMAIL, "objet": "Demande de rendez-vous",
+        "ton": "formel", "nom": LETTER["nom"], "destinataire": LETTER["destinataire"], "letter_id": state["letter_id"]
+    }),
+    "email_job": lambda client, index, state: client.get(f"/email-jobs/{state['job_id']}"),
+    "letters": lambda client, index, state: client.get("/letters", params={"limit": 20}),
+    "letter_by_id": lambda client, index, state: client.get(f"/letters/{state['letter_id']}"),
+    "letters_by_email": lambda client, index, state: client.get(f"/letters/email/{EMAIL}"),
+    "generate_speech": lambda client, index, state: client.post("/generate", data=_speech(index)),
+    "generate_speech_stream": lambda client, index, state: client.post("/generate/stream", data=_speech(index)),
+    "send_discours": lambda client, index, state: client.post("/send-discours", data={"email": EMAIL, "discours": state["speech"]}),
+    "discours_by_id": lambda client, index, state: client.get(f"/discours/{state['discours_id']}"),
+    "export_letters": lambda client, index, state: client.get("/export/letters", headers={"X-Export-Token": EXPORT_TOKEN})
+}
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * quantile))] if values else 0.0
+
+
+@contextmanager
+def run_app(env: Dict[str, str], log_path: Optional[str] = None):
+    """Lance l'application dans un processus uvicorn séparé et renvoie son URL de base"""
+    port = _free_port()
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"L'application s'est arrêtée au démarrage (code {process.returncode})")
+            try:
+                if httpx.get(f"{base_url}/ping", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("L'application n'a pas démarré en 30 s")
+            time.sleep(0.2)
+
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if log_path:
+            log.close()
+
+
+async def _seed(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Crée une lettre, un discours et un envoi d'email dont les IDs servent aux scénarios de lecture"""
+    letter = (await client.post("/generate-letter", json=_letter(-1))).raise_for_status().json()
+    speech = (await client.post("/generate", data=_speech(-1))).raise_for_status().json()
+    job = (await client.post("/send-email", json={
+        "lettre": letter["lettre"], "email": EMAIL, "objet": "Demande de rendez-vous",
+        "ton": "formel", "nom": LETTER["nom"], "destinataire": LETTER["destinataire"], "letter_id": letter["letter_id"]
+    })).raise_for_status().json()
+    return {
+        "letter": letter["lettre"],
+        "letter_id": letter["letter_id"],
+        "speech": speech["speech"],
+        "discours_id": speech["discours_id"],
+        "job_id": job["job_id"]
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, state: Dict[str, Any],
+                       requests: int, concurrency: int) -> Dict[str, Any]:
+    """Exécute `requests` requêtes d'un scénario, `concurrency` à la fois"""
+    latencies: List[float] = []
+    errors = 0
+    indices = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in indices:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, index, state)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        }
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Liste les scénarios dont le p95 ou le débit s'est dégradé au-delà de la tolérance"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        if current["latency_ms"]["p95"] > reference["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {reference['latency_ms']['p95']:.1f} -> {current['latency_ms']['p95']:.1f} ms")
+        if current["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: débit {reference['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s")
+        if current["errors"] > reference["errors"]:
+            regressions.append(f"{name}: erreurs {reference['errors']} -> {current['errors']}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def drive(base_url: str, names: List[str], requests: int, concurrency: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        state = await _seed(client)
+        scenarios = {}
+        for name in names:
+            scenarios[name] = await run_scenario(client, SCENARIOS[name], state, requests, concurrency)
+            result = scenarios[name]
+            print(
+                f"{name:<32}: {result['throughput_rps']:>8.1f} req/s  "
+                f"p50 {result['latency_ms']['p50']:>7.1f}  p95 {result['latency_ms']['p95']:>7.1f}  "
+                f"p99 {result['latency_ms']['p99']:>7.1f} ms  ({result['errors']} erreur(s))"
+            )
+        return scenarios
+
+
+def run(args: argparse.Namespace) -> int:
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Scénarios inconnus : {', '.join(unknown)} (disponibles : {', '.join(SCENARIOS)})")
+
+    with tempfile.TemporaryDirectory() as directory, \
+            run_stub_in_thread(create_openai_stub(latency=args.openai_latency)) as openai_url, \
+            run_stub_in_thread(create_postgrest_stub(latency=args.db_latency)) as postgrest_url, \
+            run_smtp_sink_in_thread(handshake_latency=args.smtp_latency, send_latency=args.smtp_latency) as sink:
+
+        env = dict(os.environ)
+        # Sans limite de débit OpenAI par défaut : on mesure l'application, pas le budget configuré
+        env.setdefault("OPENAI_RPM_LIMIT", "0")
+        env.setdefault("OPENAI_TPM_LIMIT", "0")
+        env.update({
+            "OPENAI_API_KEY": "sk-loadtest",
+            "OPENAI_BASE_URL": f"{openai_url}/v1",
+            "STORAGE_BACKEND": args.storage,
+            "SUPABASE_URL": postgrest_url,
+            "SUPABASE_ANON_KEY": "loadtest",
+            "SQLITE_PATH": os.path.join(directory, "loadtest.db"),
+            "EXPORT_TOKEN": EXPORT_TOKEN,
+            "SMTP_SERVER": "127.0.0.1",
+            "SMTP_PORT": str(sink.port),
+            "SMTP_USE_TLS": "false",
+            "SMTP_USERNAME": "loadtest@example.com",
+            "SMTP_PASSWORD": "loadtest",
+            "EMAIL_FROM": "discours@example.com",
+            "EMAIL_PASSWORD": "loadtest"
+        })
+
+        with run_app(env, args.app_log) as base_url:
+            scenarios = asyncio.run(drive(base_url, names, args.requests, args.concurrency))
+
+    results = {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "storage": args.storage,
+            "openai_latency": args.openai_latency,
+            "db_latency": args.db_latency,
+            "smtp_latency": args.smtp_latency
+        },
+        "scenarios": scenarios
+    }
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, ensure_ascii=False)
+        print(f"{'Résultats':<32}: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        differences = [
+            key for key in ("requests", "concurrency", "storage", "openai_latency", "db_latency", "smtp_latency")
+            if baseline.get("meta", {}).get(key) != results["meta"][key]
+        ]
+        if differences:
+            print(f"{'Attention':<32}: paramètres différents de la référence ({', '.join(differences)})")
+
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"{'Régression':<32}: {regression}")
+        if regressions:
+            return 1
+        print(f"{'Référence':<32}: aucune régression au-delà de {args.tolerance:.0%}")
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes par scénario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requêtes simultanées")
+    parser.add_argument("--scenarios", help=f"Scénarios à exécuter, séparés par des virgules (défaut : tous) : {', '.join(SCENARIOS)}")
+    parser.add_argument("--storage", choices=["supabase", "sqlite"], default="supabase", help="Backend de stockage de l'application")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="Latence simulée d'une complétion OpenAI (s)")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="Latence simulée d'une requête Supabase (s)")
+    parser.add_argument("--smtp-latency", type=float, default=0.05, help="Latence simulée de la connexion et de l'envoi SMTP (s)")
+    parser.add_argument("--output", help="Fichier JSON des résultats (référence pour les prochaines comparaisons)")
+    parser.add_argument("--baseline", help="Fichier JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Dégradation tolérée par rapport à la référence (0.2 = 20 %%)")
+    parser.add_argument("--app-log", help="Fichier recevant les logs de l'application")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
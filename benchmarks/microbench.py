@@ -0,0 +1,283 @@
+"""
+Microbenchmarks des chemins CPU d'une requête (hors appels réseau)
+
+Mesure le temps et la mémoire allouée par appel de :
+- la validation Pydantic de LetterRequest et EmailRequest ;
+- LetterGenerator._build_prompt ;
+- EmailSender._create_html_content et _create_text_content ;
+- l'assemblage et la sérialisation du message MIME (_build_letter_message).
+
+Les charges utiles sont les exemples de EXAMPLES.md, complétés de contextes
+très longs. Chaque exécution est ajoutée à un historique JSONL et comparée à
+la médiane des dernières exécutions comparables (même version de Python, même
+machine) : code de sortie 1 si le temps ou la mémoire par appel régresse
+au-delà de la tolérance.
+
+Usage:
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --no-save --tolerance 0.15
+    python -m benchmarks.microbench --filter build_prompt --history /tmp/historique.jsonl
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.stubs import FakeOpenAIClient
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "EXAMPLES.md")
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_history.jsonl")
+
+# Tailles (en caractères) des contextes longs ajoutés aux exemples
+LONG_CONTEXT_SIZES = (5_000, 50_000)
+
+CONTEXT_PARAGRAPH = (
+    "Suite à notre échange du mois dernier, je reviens vers vous concernant le dossier en cours. "
+    "Malgré plusieurs relances restées sans réponse, la situation n'a pas évolué et les délais "
+    "annoncés ne sont pas respectés, ce qui me cause un préjudice important. "
+)
+
+Case = Callable[[], Any]
+
+
+def load_examples(path: str = EXAMPLES_PATH) -> Dict[str, Dict[str, Any]]:
+    """Requêtes de lettre de la section « Exemples de requêtes » de EXAMPLES.md"""
+    with open(path, encoding="utf-8") as examples_file:
+        text = examples_file.read()
+
+    examples = {}
+    for number, block in re.findall(r"### (\d+)\..*?```json\n(.*?)```", text, re.DOTALL):
+        payload = json.loads(block)
+        if "contexte" in payload and f"exemple_{number}" not in examples:
+            examples[f"exemple_{number}"] = payload
+    return examples
+
+
+def build_payloads() -> Dict[str, Dict[str, Any]]:
+    """Exemples de EXAMPLES.md et variantes à contexte très long"""
+    payloads = load_examples()
+    base = next(iter(payloads.values()))
+    for size in LONG_CONTEXT_SIZES:
+        contexte = (CONTEXT_PARAGRAPH * (size // len(CONTEXT_PARAGRAPH) + 1))[:size]
+        payloads[f"contexte_{size // 1000}k"] = dict(base, contexte=contexte)
+    return payloads
+
+
+def _letter_content(payload: Dict[str, Any]) -> str:
+    """Lettre générée plausible : sa longueur suit celle du contexte"""
+    return (
+        f"{payload['nom']}\n{payload['adresse']}\n\n{payload['destinataire']}\n\n"
+        f"Objet : {payload['objet']}\n\nMadame, Monsieur,\n\n{payload['contexte']}\n\n"
+        "Je vous prie d'agréer, Madame, Monsieur, l'expression de mes salutations distinguées.\n\n"
+        f"{payload['nom']}"
+    )
+
+
+def build_cases(payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Case]:
+    """Un cas par couple (opération, charge utile)"""
+    os.environ.setdefault("SMTP_USERNAME", "bench@example.com")
+    os.environ.setdefault("SMTP_PASSWORD", "bench")
+
+    from letter import LetterGenerator
+    from mailer import EmailSender
+    from models import EmailRequest, LetterRequest
+    from smtp_pool import SMTPConnectionPool
+
+    generator = LetterGenerator(client=FakeOpenAIClient())
+    sender = EmailSender(pool=SMTPConnectionPool("127.0.0.1", 25, "bench@example.com", "bench", use_tls=False))
+
+    cases: Dict[str, Case] = {}
+    for name, payload in payloads.items():
+        letter_payload = {key: value for key, value in payload.items() if key != "email"}
+        letter_json = json.dumps(letter_payload, ensure_ascii=False)
+        request = LetterRequest.model_validate(letter_payload)
+        letter = _letter_content(payload)
+        email_payload = {
+            "lettre": letter, "email": payload.get("email", "destinataire@example.com"), "objet": payload["objet"],
+            "ton": payload["ton"], "nom": payload["nom"], "destinataire": payload["destinataire"]
+        }
+        request_data = {key: email_payload[key] for key in ("objet", "ton", "nom", "destinataire")}
+
+        cases[f"letter_request[{name}]"] = lambda p=letter_payload: LetterRequest.model_validate(p)
+        cases[f"letter_request_json[{name}]"] = lambda p=letter_json: LetterRequest.model_validate_json(p)
+        cases[f"email_request[{name}]"] = lambda p=email_payload: EmailRequest.model_validate(p)
+        cases[f"build_prompt[{name}]"] = lambda r=request: generator._build_prompt(r)
+        cases[f"html_content[{name}]"] = lambda l=letter, d=request_data: sender._create_html_content(l, d)
+        cases[f"text_content[{name}]"] = lambda l=letter, d=request_data: sender._create_text_content(l, d)
+        # Sérialisation comprise : c'est le coût réel avant l'envoi SMTP
+        cases[f"mime_message[{name}]"] = lambda e=email_payload["email"], l=letter, d=request_data: (
+            sender._build_letter_message(e, l, d).as_bytes()
+        )
+    return cases
+
+
+def measure_time(case: Case, repeat: int, min_time: float) -> Dict[str, float]:
+    """Temps par appel (µs) : médiane et minimum de `repeat` séries calibrées à `min_time` secondes"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            case()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    per_call = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            case()
+        per_call.append((time.perf_counter() - start) / loops)
+
+    return {
+        "time_us": round(statistics.median(per_call) * 1e6, 3),
+        "time_min_us": round(min(per_call) * 1e6, 3),
+        "loops": loops
+    }
+
+
+def measure_allocations(case: Case, calls: int) -> Dict[str, int]:
+    """Mémoire par appel (octets, médiane sur `calls` appels) : pic alloué et mémoire conservée"""
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        case()  # Premier appel hors mesure (caches, imports paresseux)
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = case()
+            current, peak = tracemalloc.get_traced_memory()
+            del result
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {"peak_bytes": int(statistics.median(peaks)), "result_bytes": int(statistics.median(retained))}
+
+
+def _environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": f"{platform.node()}/{platform.machine()}"
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def reference(history: List[Dict[str, Any]], environment: Dict[str, str], window: int) -> Dict[str, Dict[str, float]]:
+    """Médiane par cas des `window` dernières exécutions faites dans le même environnement"""
+    runs = [entry for entry in history if entry.get("environment") == environment][-window:]
+    values: Dict[str, Dict[str, List[float]]] = {}
+    for entry in runs:
+        for name, result in entry["cases"].items():
+            for metric in ("time_us", "peak_bytes"):
+                values.setdefault(name, {}).setdefault(metric, []).append(result[metric])
+    return {
+        name: {metric: statistics.median(samples) for metric, samples in metrics_values.items()}
+        for name, metrics_values in values.items()
+    }
+
+
+def compare(cases: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float, alloc_tolerance: float) -> List[str]:
+    """Liste les cas dont le temps ou le pic mémoire par appel s'est dégradé au-delà de la tolérance"""
+    regressions = []
+    for name, current in cases.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["time_us"] > previous["time_us"] * (1 + tolerance):
+            regressions.append(f"{name}: {previous['time_us']:.1f} -> {current['time_us']:.1f} µs/appel")
+        # Marge absolue d'1 Kio : quelques objets de plus ne font pas une régression
+        if current["peak_bytes"] > previous["peak_bytes"] * (1 + alloc_tolerance) + 1024:
+            regressions.append(f"{name}: {previous['peak_bytes']:.0f} -> {current['peak_bytes']} octets/appel")
+    return regressions
+
+
+def run(args: argparse.Namespace) -> int:
+    cases = build_cases(build_payloads())
+    if args.filter:
+        cases = {name: case for name, case in cases.items() if args.filter in name}
+    if not cases:
+        raise SystemExit(f"Aucun cas ne correspond à « {args.filter} »")
+
+    environment = _environment()
+    history = load_history(args.history)
+    baseline = reference(history, environment, args.window)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, case in cases.items():
+        result = measure_time(case, args.repeat, args.min_time)
+        result.update(measure_allocations(case, args.alloc_calls))
+        results[name] = result
+
+        previous = baseline.get(name)
+        delta = f"  ({result['time_us'] / previous['time_us'] - 1:+.0%})" if previous else ""
+        print(f"{name:<32}: {result['time_us']:>10.1f} µs  {result['peak_bytes'] / 1024:>9.1f} Kio{delta}")
+
+    regressions = compare(results, baseline, args.tolerance, args.alloc_tolerance)
+
+    if not args.no_save:
+        entry = {
+            "date": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "environment": environment,
+            "cases": results
+        }
+        with open(args.history, "a", encoding="utf-8") as history_file:
+            history_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"{'Historique':<32}: {args.history}")
+
+    if not baseline:
+        print(f"{'Référence':<32}: aucune exécution précédente dans cet environnement")
+        return 0
+
+    for regression in regressions:
+        print(f"{'Régression':<32}: {regression}")
+    if regressions:
+        return 1
+    print(f"{'Référence':<32}: aucune régression (temps {args.tolerance:.0%}, mémoire {args.alloc_tolerance:.0%})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="Ne mesurer que les cas dont le nom contient ce texte")
+    parser.add_argument("--repeat", type=int, default=5, help="Séries de mesure du temps par cas")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Durée minimale (s) d'une série")
+    parser.add_argument("--alloc-calls", type=int, default=20, help="Appels mesurés sous tracemalloc par cas")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="Fichier JSONL de l'historique des exécutions")
+    parser.add_argument("--window", type=int, default=5, help="Exécutions précédentes formant la référence")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Hausse tolérée du temps par appel (0.2 = 20 %%)")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.1, help="Hausse tolérée du pic mémoire par appel")
+    parser.add_argument("--no-save", action="store_true", help="Comparer sans ajouter l'exécution à l'historique")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
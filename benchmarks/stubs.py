@@ -0,0 +1,518 @@
+"""
+Serveurs bouchons locaux utilisés par les benchmarks
+
+Ils imitent les services externes (OpenAI, SMTP, PostgREST/Supabase), soit via HTTP, soit en mémoire, afin de
+mesurer le comportement du backend sans clé API ni accès réseau.
+"""
+
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from types import SimpleNamespace
+
+
+def _free_port() -> int:
+    """Réserve un port TCP libre sur l'interface locale"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_openai_stub(latency: float = 0.5, content: str = "Madame, Monsieur,\n\nLettre de test.\n\nCordialement") -> FastAPI:
+    """
+    Crée une application imitant l'endpoint /v1/chat/completions d'OpenAI
+
+    Les requêtes `stream=True` reçoivent le contenu mot par mot en Server-Sent
+    Events, la latence étant répartie entre les fragments (suivis d'un fragment
+    de consommation si stream_options.include_usage est demandé).
+
+    Args:
+        latency: Durée simulée de la complétion (en secondes)
+        content: Texte renvoyé comme réponse de l'assistant
+    """
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.cancelled = 0
+
+    def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    usage = {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "gpt-4o-mini")
+
+        if body.get("stream"):
+            words = re.findall(r"\S+\s*|\s+", content)
+
+            async def events():
+                try:
+                    yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+                    for word in words:
+                        await asyncio.sleep(latency / len(words))
+                        yield _chunk(completion_id, model, {"content": word})
+                    yield _chunk(completion_id, model, {}, "stop")
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        payload = {
+                            "id": completion_id,
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [],
+                            "usage": usage
+                        }
+                        yield f"data: {json.dumps(payload)}\n\n"
+                    yield "data: [DONE]\n\n"
+                except asyncio.CancelledError:
+                    app.state.cancelled += 1
+                    raise
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    return app
+
+
+class FakeOpenAIClient:
+    """
+    Faux client en mémoire exposant chat.completions.create comme AsyncOpenAI
+
+    Permet de mesurer un générateur sans pile HTTP, en isolant son propre coût.
+    """
+
+    def __init__(self, latency: float = 0.5, content: str = "Discours de test.",
+                 stall_rate: float = 0.0, stall_latency: float = 5.0):
+        """
+        Args:
+            latency: Durée simulée d'une complétion (en secondes)
+            content: Contenu retourné
+            stall_rate: Proportion d'appels anormalement lents (queue de latence)
+            stall_latency: Durée d'un appel lent (en secondes)
+        """
+        self.latency = latency
+        self.content = content
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.stall_latency if random.random() < self.stall_rate else self.latency)
+        finally:
+            self.active -= 1
+        message = SimpleNamespace(role="assistant", content=self.content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+        )
+
+
+@asynccontextmanager
+async def run_stub(app: FastAPI):
+    """Démarre une application bouchon dans la boucle courante et renvoie son URL de base"""
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+@contextmanager
+def run_stub_in_thread(app: FastAPI):
+    """
+    Démarre une application bouchon dans un thread dédié et renvoie son URL de base
+
+    Nécessaire lorsque le code mesuré bloque la boucle d'événements (client synchrone),
+    un bouchon servi dans la même boucle ne pouvant alors plus répondre.
+    """
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def _as_text(value) -> str:
+    """Représentation textuelle d'une valeur telle que PostgREST la compare"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _matches(value, operator: str, argument: str) -> bool:
+    """Évalue un filtre PostgREST (eq, neq, lt, lte, gt, gte, like, ilike, is) sur une valeur"""
+    if operator in ("like", "ilike"):
+        if value is None:
+            return False
+        pattern = "".join(".*" if char in "*%" else re.escape(char) for char in argument)
+        flags = re.IGNORECASE | re.DOTALL if operator == "ilike" else re.DOTALL
+        return re.fullmatch(pattern, str(value), flags) is not None
+    if operator == "is":
+        return _as_text(value) == argument.lower()
+
+    text = _as_text(value)
+    if operator == "eq":
+        return text == argument
+    if operator == "neq":
+        return text != argument
+    if value is None:
+        return False
+    return {
+        "lt": text < argument,
+        "lte": text <= argument,
+        "gt": text > argument,
+        "gte": text >= argument
+    }[operator]
+
+
+def _split_conditions(text: str):
+    """Découpe une liste de conditions PostgREST sur les virgules de premier niveau"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    return parts + [current] if current else parts
+
+
+def _evaluate(row, condition: str) -> bool:
+    """Évalue une condition PostgREST (col.op.valeur, and(...), or(...)) sur une ligne"""
+    for logic, combine in (("and(", all), ("or(", any)):
+        if condition.startswith(logic):
+            return combine(_evaluate(row, part) for part in _split_conditions(condition[len(logic):-1]))
+
+    column, operator, argument = condition.split(".", 2)
+    return _matches(row.get(column), operator, argument.strip('"'))
+
+
+def create_postgrest_stub(latency: float = 0.05) -> FastAPI:
+    """
+    Crée une application imitant l'API REST de Supabase (PostgREST) en mémoire
+
+    Couvre ce qu'utilise DatabaseManager : select avec filtres (dont or/and), tri et limite,
+    insert, upsert (Prefer: resolution=merge-duplicates) et update. Le nombre de
+    requêtes et le pic de requêtes simultanées sont exposés dans app.state.
+
+    Args:
+        latency: Durée simulée de chaque requête (en secondes)
+    """
+    app = FastAPI()
+    app.state.tables = {"letters": {}, "discours_mariage": {}}
+    app.state.requests = 0
+    app.state.active = 0
+    app.state.max_active = 0
+
+    reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def _filter(table: str, request: Request):
+        rows = list(app.state.tables.setdefault(table, {}).values())
+        for column, condition in request.query_params.multi_items():
+            if column in reserved:
+                continue
+            if column in ("and", "or"):
+                rows = [row for row in rows if _evaluate(row, f"{column}{condition}")]
+                continue
+            operator, _, argument = condition.partition(".")
+            rows = [row for row in rows if _matches(row.get(column), operator, argument)]
+        return rows
+
+    def _project(rows, request: Request):
+        select = request.query_params.get("select", "*")
+        if select.strip() == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    async def _round_trip():
+        app.state.requests += 1
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            app.state.active -= 1
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        await _round_trip()
+        rows = _filter(table, request)
+
+        order = request.query_params.get("order")
+        if order:
+            for clause in reversed(order.split(",")):
+                column, _, direction = clause.partition(".")
+                rows.sort(key=lambda row: _as_text(row.get(column)), reverse=direction.startswith("desc"))
+
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+
+        return _project(rows, request)
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        await _round_trip()
+        body = await request.json()
+        upsert = "merge-duplicates" in request.headers.get("prefer", "")
+        stored = app.state.tables.setdefault(table, {})
+
+        inserted = []
+        for data in body if isinstance(body, list) else [body]:
+            row = {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat(), **data}
+            if row["id"] in stored and not upsert:
+                return JSONResponse(status_code=409, content={
+                    "code": "23505", "message": "duplicate key value violates unique constraint",
+                    "details": None, "hint": None
+                })
+            stored[row["id"]] = {**stored.get(row["id"], {}), **row}
+            inserted.append(stored[row["id"]])
+
+        return JSONResponse(status_code=201, content=_project(inserted, request))
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        await _round_trip()
+        changes = await request.json()
+        rows = _filter(table, request)
+        for row in rows:
+            row.update(changes)
+        return _project(rows, request)
+
+    return app
+
+
+class SMTPSink:
+    """
+    Serveur SMTP minimal en clair qui accepte et conserve tous les messages
+
+    Gère EHLO/HELO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET et QUIT. La latence
+    de poignée de main (connexion + authentification) simule le coût d'une
+    négociation TLS et d'un login sur un serveur distant.
+    """
+
+    def __init__(self, handshake_latency: float = 0.0, send_latency: float = 0.0):
+        self.handshake_latency = handshake_latency
+        self.send_latency = send_latency
+        self.messages = []
+        self.connections = 0
+        self.port = None
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.handshake_latency / 2)
+        writer.write(b"220 sink ESMTP\r\n")
+
+        in_data = False
+        lines = []
+        try:
+            while True:
+                await writer.drain()
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+
+                if in_data:
+                    if line == ".":
+                        in_data = False
+                        await asyncio.sleep(self.send_latency)
+                        self.messages.append("\r\n".join(lines))
+                        writer.write(b"250 OK queued\r\n")
+                    else:
+                        lines.append(line[1:] if line.startswith("..") else line)
+                    continue
+
+                command = line.split(" ", 1)[0].upper()
+                if command == "EHLO":
+                    writer.write(b"250-sink\r\n250-8BITMIME\r\n250-SMTPUTF8\r\n250 AUTH PLAIN\r\n")
+                elif command == "HELO":
+                    writer.write(b"250 sink\r\n")
+                elif command == "AUTH":
+                    await asyncio.sleep(self.handshake_latency / 2)
+                    writer.write(b"235 Authentication successful\r\n")
+                elif command in ("MAIL", "RCPT", "NOOP", "RSET"):
+                    writer.write(b"250 OK\r\n")
+                elif command == "DATA":
+                    in_data = True
+                    lines = []
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self) -> "SMTPSink":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+@contextmanager
+def run_smtp_sink_in_thread(handshake_latency: float = 0.0, send_latency: float = 0.0):
+    """Démarre un SMTPSink dans un thread dédié (avec sa propre boucle) et le renvoie"""
+    sink = SMTPSink(handshake_latency=handshake_latency, send_latency=send_latency)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(sink.__aenter__())
+        ready.set()
+        loop.run_forever()
+        loop.run_until_complete(sink.__aexit__(None, None, None))
+        loop.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+
+    try:
+        yield sink
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+class FakeDatabaseManager:
+    """
+    Faux DatabaseManager en mémoire avec une latence fixe par requête
+
+    Reproduit le contrat des méthodes utilisées par les benchmarks (dictionnaires
+    success/error) pour simuler un aller-retour vers Supabase.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.tables = {"letters": {}, "discours_mariage": {}}
+        self.requests = 0
+
+    async def _round_trip(self) -> None:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+    async def save_letter(self, letter_data):
+        await self._round_trip()
+        row = {"id": str(uuid.uuid4()), **letter_data}
+        self.tables["letters"][row["id"]] = row
+        return {"success": True, "letter_id": row["id"], "message": "Lettre sauvegardée avec succès"}
+
+    async def save_letters(self, rows):
+        await self._round_trip()
+        for row in rows:
+            self.tables["letters"][row["id"]] = dict(row)
+        return {"success": True, "count": len(rows), "message": "Lettres sauvegardées avec succès"}
+
+    async def save_speech(self, speech_data):
+        await self._round_trip()
+        row = {"id": str(uuid.uuid4()), **speech_data}
+        self.tables["discours_mariage"][row["id"]] = row
+        return {"success": True, "speech_id": row["id"], "message": "Discours sauvegardé avec succès"}
+
+    async def save_speeches(self, rows):
+        await self._round_trip()
+        for row in rows:
+            self.tables["discours_mariage"][row["id"]] = dict(row)
+        return {"success": True, "count": len(rows), "message": "Discours sauvegardés avec succès"}
+
+    async def get_letter_by_id(self, letter_id):
+        await self._round_trip()
+        row = self.tables["letters"].get(letter_id)
+        if row is None:
+            return {"success": False, "error": "Lettre non trouvée"}
+        return {"success": True, "letter": dict(row)}
+
+    async def get_speech_by_id(self, speech_id):
+        await self._round_trip()
+        row = self.tables["discours_mariage"].get(speech_id)
+        if row is None:
+            return {"success": False, "error": "Discours non trouvé"}
+        return {"success": True, "speech": {"discours": row["discours"], "created_at": row.get("created_at")}}
+
+    async def update_email_status(self, letter_id, email_sent, email_destinataire=None):
+        await self._round_trip()
+        row = self.tables["letters"].get(letter_id)
+        if row is None:
+            return {"success": False, "error": "Erreur lors de la mise à jour: Lettre non trouvée"}
+        row["email_envoye"] = email_sent
+        if email_destinataire:
+            row["email_destinataire"] = email_destinataire
+        return {"success": True, "message": "Statut d'email mis à jour avec succès"}
@@ -0,0 +1,198 @@
+"""
+Génération de lettres en masse depuis un fichier JSONL (une LetterRequest par ligne)
+
+Le fichier d'entrée est lu au fil de l'eau et les lettres sont générées par
+LetterGenerator avec une concurrence bornée. Chaque lettre générée est ajoutée
+aussitôt au fichier de sortie (JSONL), les échecs dans <output>.errors :
+
+    python bulk_generate.py campagne.jsonl --output lettres.jsonl --concurrency 20
+
+Le fichier de sortie sert de point de reprise : chaque ligne porte le numéro de
+la ligne d'entrée correspondante, et --resume saute les lettres déjà générées
+(les échecs sont retentés). La progression, le débit et le temps restant estimé
+sont journalisés régulièrement.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from letter import LetterGenerator
+from llm_client import close_openai_client
+from models import LetterRequest
+
+
+logger = logging.getLogger(__name__)
+
+
+def _read_requests(input_path: str) -> Iterator[Tuple[int, str]]:
+    """Parcourt les lignes non vides du fichier d'entrée avec leur numéro (à partir de 1)"""
+    with open(input_path, encoding="utf-8") as input_file:
+        for number, line in enumerate(input_file, start=1):
+            if line.strip():
+                yield number, line
+
+
+def _load_checkpoint(output_path: str) -> Set[int]:
+    """
+    Relit le fichier de sortie et retourne les numéros de ligne déjà générés
+
+    Une dernière ligne incomplète (arrêt brutal pendant l'écriture) est retirée
+    du fichier pour que les ajouts suivants restent du JSONL valide.
+    """
+    done: Set[int] = set()
+    valid_size = 0
+
+    with open(output_path, "rb") as output_file:
+        for line in output_file:
+            try:
+                done.add(json.loads(line)["line"])
+            except (ValueError, KeyError):
+                break
+            valid_size += len(line)
+
+    if valid_size < os.path.getsize(output_path):
+        logger.warning(f"Dernière ligne incomplète retirée de {output_path}")
+        with open(output_path, "r+b") as output_file:
+            output_file.truncate(valid_size)
+
+    return done
+
+
+class _Progress:
+    """Compteurs de progression, journalisés à intervalle régulier"""
+
+    def __init__(self, total: int, interval: float):
+        self.total = total
+        self.interval = interval
+        self.generated = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._last_report = self.start
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.generated += 1
+        else:
+            self.failed += 1
+
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        processed = self.generated + self.failed
+        elapsed = time.monotonic() - self.start
+        rate = processed / elapsed if elapsed else 0.0
+        eta = (self.total - processed) / rate if rate else 0.0
+        logger.info(
+            f"{processed}/{self.total} lettre(s) traitée(s) ({self.failed} échec(s)) - "
+            f"{rate:.1f} lettres/s - temps restant estimé : {eta:.0f} s"
+        )
+
+
+async def generate_file(generator: LetterGenerator, input_path: str, output_path: str,
+                        concurrency: Optional[int] = None, resume: bool = False,
+                        progress_interval: float = 5.0) -> Dict[str, Any]:
+    """
+    Génère les lettres d'un fichier JSONL et les écrit au fil de l'eau, avec reprise
+
+    Args:
+        generator: Générateur de lettres
+        input_path: Fichier JSONL des requêtes (une LetterRequest par ligne)
+        output_path: Fichier JSONL des lettres générées
+        concurrency: Générations simultanées (BULK_CONCURRENCY, défaut: 10)
+        resume: Reprendre une génération interrompue en sautant les lettres déjà écrites
+        progress_interval: Intervalle (s) entre deux rapports de progression
+
+    Returns:
+        Dictionnaire avec le nombre de lettres générées, en échec et déjà présentes
+    """
+    concurrency = concurrency or int(os.getenv("BULK_CONCURRENCY", "10"))
+    errors_path = f"{output_path}.errors"
+
+    done: Set[int] = set()
+    if resume and os.path.exists(output_path):
+        done = _load_checkpoint(output_path)
+        logger.info(f"Reprise : {len(done)} lettre(s) déjà générée(s)")
+    elif os.path.exists(output_path):
+        raise ValueError(f"{output_path} existe déjà (utiliser --resume pour reprendre la génération)")
+
+    total = sum(1 for number, _ in _read_requests(input_path) if number not in done)
+    progress = _Progress(total, progress_interval)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as output_file, \
+            open(errors_path, "a", encoding="utf-8") as errors_file:
+
+        def write(target, record: Dict[str, Any]) -> None:
+            # Une ligne complète par écriture, vidée aussitôt : le fichier fait foi en cas d'arrêt
+            target.write(json.dumps(record, ensure_ascii=False) + "\n")
+            target.flush()
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                number, line = item
+                try:
+                    request = LetterRequest.model_validate_json(line)
+                    letter = await generator.generate_letter(request)
+                    write(output_file, {"line": number, "request": request.model_dump(mode="json"), "lettre": letter})
+                    progress.record(True)
+                except Exception as e:
+                    write(errors_file, {"line": number, "error": str(e)})
+                    progress.record(False)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for number, line in _read_requests(input_path):
+                if number not in done:
+                    await queue.put((number, line))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    progress.report()
+    return {"generated": progress.generated, "failed": progress.failed, "skipped": len(done)}
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        result = await generate_file(LetterGenerator(), args.input, args.output, args.concurrency,
+                                     args.resume, args.progress_interval)
+    finally:
+        # Ferme le pool de connexions OpenAI avant la fin de la boucle d'événements
+        await close_openai_client()
+    logger.info(
+        f"Génération terminée : {result['generated']} lettre(s) dans {args.output}, "
+        f"{result['failed']} échec(s) dans {args.output}.errors"
+    )
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Fichier JSONL des requêtes (une LetterRequest par ligne)")
+    parser.add_argument("--output", required=True, help="Fichier JSONL des lettres générées")
+    parser.add_argument("--concurrency", type=int, help="Générations simultanées")
+    parser.add_argument("--resume", action="store_true", help="Reprendre en sautant les lettres déjà générées")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Intervalle (s) entre deux rapports de progression")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _default_sizeof(value: Any) -> int:
+    """Taille approximative d'une valeur en octets"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (dict, list)):
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Cache LRU en mémoire avec durée de vie, borné en nombre d'entrées et en octets"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = _default_sizeof):
+        """
+        Initialise le cache
+
+        Args:
+            max_entries: Nombre maximal d'entrées
+            ttl: Durée de vie d'une entrée (en secondes)
+            max_bytes: Taille totale maximale des valeurs (en octets, illimitée si None)
+            sizeof: Fonction estimant la taille d'une valeur
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retourne la valeur associée à la clé, ou None si absente ou expirée"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Ajoute ou remplace une entrée, en évinçant les moins récemment utilisées si nécessaire"""
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (value, time.monotonic() + self.ttl, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Supprime une entrée ; retourne True si elle existait"""
+        if key in self._entries:
+            self._remove(key)
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Vide le cache (les compteurs sont conservés)"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+def _normalize(value: Any) -> Any:
+    """Normalise une valeur textuelle (Unicode NFC, espaces superflus retirés)"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    return value
+
+
+def request_fingerprint(fields: Dict[str, Any]) -> str:
+    """
+    Calcule une empreinte canonique (SHA-256) des champs d'une requête
+
+    Deux requêtes ne différant que par les espaces ou la forme Unicode
+    de leurs textes ont la même empreinte.
+    """
+    canonical = json.dumps(
+        {name: _normalize(value) for name, value in fields.items()},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(text: str) -> str:
+    """
+    Calcule l'empreinte (SHA-256) du texte normalisé d'une lettre
+
+    Stockée avec chaque lettre, elle permet de retrouver une lettre par son
+    contenu exact via un index au lieu d'une recherche par préfixe.
+    """
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
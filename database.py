@@ -1,22 +1,261 @@
+import base64
+import json
 import os
-from typing import Optional, Dict, Any
-from supabase import create_client, Client
+import uuid
+from abc import ABC, abstractmethod
+import httpx
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
+from postgrest import AsyncPostgrestClient
 from datetime import datetime
 
+import metrics
+from cache import TTLCache, content_fingerprint
 
-class DatabaseManager:
-    """Gestionnaire de base de données Supabase"""
+
+# Taille maximale d'une page de lettres
+MAX_PAGE_SIZE = 100
+
+# Colonnes renvoyées par les listes de lettres (sans le texte de la lettre ni le contexte)
+LETTER_SUMMARY_COLUMNS = "id, created_at, nom, adresse, destinataire, adresse_destinataire, objet, date_effet, ton, email_destinataire, email_envoye"
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Encode la position (created_at, id) d'une lettre en curseur de pagination opaque"""
+    payload = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def cursor_position(created_at: str, row_id: str) -> Tuple[str, str]:
+    """
+    Valide une position de pagination (created_at, id) fournie par le client
+    
+    Ses valeurs sont insérées dans un filtre PostgREST : created_at doit être
+    une date ISO et id un UUID.
+    
+    Raises:
+        ValueError: Si la position est invalide
+    """
+    try:
+        datetime.fromisoformat(created_at)
+        row_id = str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError("Position de pagination invalide") from e
+    
+    return created_at, row_id
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Décode un curseur de pagination en (created_at, id)
+    
+    Le curseur est le JSON [created_at, id] encodé en base64 URL-safe, sans
+    remplissage '=' (voir encode_cursor).
+    
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+        return cursor_position(created_at, row_id)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError("Curseur de pagination invalide") from e
+
+
+class StorageBackend(ABC):
+    """
+    Interface commune des backends de stockage des lettres et discours
+    
+    Les méthodes renvoient des dictionnaires success/error. Les lectures par ID
+    passent par le cache optionnel, invalidé à chaque modification d'une ligne.
+    """
+    
+    def __init__(self, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            cache: Cache des lectures par ID (lettres et discours), désactivé si None
+        """
+        self.cache = cache
+        # Incrémenté à chaque invalidation : une lecture commencée avant n'est pas mise en cache
+        self._cache_epoch = 0
+    
+    def _cache_get(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne une copie de la ligne en cache, ou None"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get((table, row_id))
+        return dict(cached) if cached is not None else None
+    
+    def _cache_set(self, table: str, row_id: str, row: Dict[str, Any], epoch: int) -> None:
+        """Met une ligne lue en cache, sauf si une modification a eu lieu pendant la lecture"""
+        if self.cache is not None and epoch == self._cache_epoch:
+            self.cache.set((table, row_id), dict(row))
+    
+    def _invalidate(self, table: str, row_ids: List[str]) -> None:
+        """Retire des lignes modifiées du cache de lecture"""
+        if self.cache is None:
+            return
+        self._cache_epoch += 1
+        for row_id in row_ids:
+            self.cache.invalidate((table, row_id))
+    
+    @staticmethod
+    def _letter_row(letter_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit les données d'une lettre en ligne de la table letters"""
+        row = {
+            "nom": letter_data["nom"],
+            "adresse": letter_data["adresse"],
+            "destinataire": letter_data["destinataire"],
+            "adresse_destinataire": letter_data.get("adresse_destinataire"),
+            "objet": letter_data["objet"],
+            "contexte": letter_data["contexte"],
+            "date_effet": letter_data.get("date_effet"),
+            "ton": letter_data["ton"],
+            "lettre_generée": letter_data["lettre_generée"],
+            "empreinte_contenu": content_fingerprint(letter_data["lettre_generée"]),
+            "email_destinataire": letter_data.get("email_destinataire"),
+            "email_envoye": letter_data.get("email_envoye", False)
+        }
+        
+        # ID et date de création attribués côté application (écriture différée)
+        for field in ("id", "created_at"):
+            if letter_data.get(field):
+                row[field] = letter_data[field]
+        
+        return row
+    
+    @staticmethod
+    def _speech_row(speech_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit les données d'un discours en ligne de la table discours_mariage"""
+        row = {
+            "prenom": speech_data["prenom"],
+            "marie": speech_data["marie"],
+            "partenaire": speech_data["partenaire"],
+            "style": speech_data.get("style"),
+            "lien": speech_data["lien"],
+            "rencontre": speech_data.get("rencontre"),
+            "qualites": speech_data.get("qualites"),
+            "anecdotes": speech_data.get("anecdotes"),
+            "souvenirs": speech_data.get("souvenir"),  # Note: "souvenir" dans les données, "souvenirs" en base
+            "duree": speech_data.get("duree"),
+            "discours": speech_data["discours"]
+        }
+        
+        # ID et date de création attribués côté application (écriture différée)
+        for field in ("id", "created_at"):
+            if speech_data.get(field):
+                row[field] = speech_data[field]
+        
+        return row
+    
+    @abstractmethod
+    async def close(self) -> None:
+        """Libère les connexions (à l'arrêt de l'application)"""
+    
+    @abstractmethod
+    async def save_letter(self, letter_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Sauvegarde une lettre ({"success", "letter_id"})"""
+    
+    @abstractmethod
+    async def save_letters(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sauvegarde plusieurs lettres portant leur ID, par upsert ({"success", "count"})"""
+    
+    @abstractmethod
+    async def update_email_status(self, letter_id: str, email_sent: bool, email_destinataire: str = None) -> Dict[str, Any]:
+        """Met à jour le statut d'envoi d'email d'une lettre"""
+    
+    @abstractmethod
+    async def get_letter_by_id(self, letter_id: str) -> Dict[str, Any]:
+        """Récupère une lettre par son ID ({"success", "letter"})"""
+    
+    @abstractmethod
+    async def get_recent_letters(self, limit: int = 10, after: Optional[Tuple[str, str]] = None,
+                                 full: bool = False) -> Dict[str, Any]:
+        """Récupère une page de lettres récentes ({"success", "letters", "count", "next_cursor"})"""
+    
+    @abstractmethod
+    async def get_letters_by_email(self, email: str, limit: int = 20, after: Optional[Tuple[str, str]] = None,
+                                   full: bool = False) -> Dict[str, Any]:
+        """Récupère une page des lettres envoyées à un email"""
+    
+    @abstractmethod
+    def iter_pages(self, table: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, ton: Optional[str] = None,
+                   page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Parcourt une table par ordre chronologique (created_at, id), page par page"""
+    
+    @abstractmethod
+    async def find_letter_by_content(self, content: str) -> Dict[str, Any]:
+        """Trouve la lettre la plus récente ayant exactement ce contenu (par empreinte)"""
+    
+    @abstractmethod
+    async def save_speech(self, speech_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Sauvegarde un discours ({"success", "speech_id"})"""
+    
+    @abstractmethod
+    async def save_speeches(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sauvegarde plusieurs discours portant leur ID, par upsert ({"success", "count"})"""
+    
+    @abstractmethod
+    async def get_speech_by_id(self, speech_id: str) -> Dict[str, Any]:
+        """Récupère un discours par son ID ({"success", "speech": {"discours", "created_at"}})"""
+
+
+class DatabaseManager(StorageBackend):
+    """Gestionnaire de base de données Supabase (API REST PostgREST, accès asynchrone)"""
+    
+    def __init__(self, client: Optional[AsyncPostgrestClient] = None, cache: Optional[TTLCache] = None):
+        """
+        Initialise la connexion à Supabase
+        
+        Args:
+            client: Client PostgREST asynchrone (créé depuis SUPABASE_URL et SUPABASE_ANON_KEY si absent)
+            cache: Cache des lectures par ID (lettres et discours), désactivé si None
+        """
+        if client is None:
+            supabase_url = os.getenv("SUPABASE_URL")
+            supabase_key = os.getenv("SUPABASE_ANON_KEY")
+            
+            if not supabase_url or not supabase_key:
+                raise ValueError("SUPABASE_URL et SUPABASE_ANON_KEY doivent être définis dans les variables d'environnement")
+            
+            client = self._create_client(supabase_url, supabase_key)
+        
+        super().__init__(cache)
+        self.postgrest = client
     
-    def __init__(self):
-        """Initialise la connexion à Supabase"""
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_ANON_KEY")
+    @staticmethod
+    def _create_client(supabase_url: str, supabase_key: str) -> AsyncPostgrestClient:
+        """
+        Crée un client PostgREST partageant un pool de connexions HTTP/2
+        
+        Le pool est dimensionné via SUPABASE_MAX_CONNECTIONS et le délai maximal
+        d'une requête via SUPABASE_TIMEOUT (en secondes).
+        """
+        max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+        timeout = float(os.getenv("SUPABASE_TIMEOUT", "10"))
         
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL et SUPABASE_ANON_KEY doivent être définis dans les variables d'environnement")
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=timeout,
+            follow_redirects=True
+        )
         
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        return AsyncPostgrestClient(
+            f"{supabase_url.rstrip('/')}/rest/v1",
+            headers={"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"},
+            http_client=http_client
+        )
     
+    async def close(self) -> None:
+        """Ferme le pool de connexions (à l'arrêt de l'application)"""
+        await self.postgrest.aclose()
+    
+    @metrics.timed_stage("db")
     async def save_letter(self, letter_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Sauvegarde une lettre dans la base de données
@@ -29,22 +268,10 @@ class DatabaseManager:
         """
         try:
             # Préparation des données pour l'insertion
-            insert_data = {
-                "nom": letter_data["nom"],
-                "adresse": letter_data["adresse"],
-                "destinataire": letter_data["destinataire"],
-                "adresse_destinataire": letter_data.get("adresse_destinataire"),
-                "objet": letter_data["objet"],
-                "contexte": letter_data["contexte"],
-                "date_effet": letter_data.get("date_effet"),
-                "ton": letter_data["ton"],
-                "lettre_generée": letter_data["lettre_generée"],
-                "email_destinataire": letter_data.get("email_destinataire"),
-                "email_envoye": letter_data.get("email_envoye", False)
-            }
+            insert_data = self._letter_row(letter_data)
             
             # Insertion dans la base de données
-            result = self.supabase.table("letters").insert(insert_data).execute()
+            result = await self.postgrest.table("letters").insert(insert_data).execute()
             
             if result.data:
                 return {
@@ -61,6 +288,37 @@ class DatabaseManager:
                 "error": f"Erreur lors de la sauvegarde: {str(e)}"
             }
     
+    @metrics.timed_stage("db")
+    async def save_letters(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sauvegarde plusieurs lettres en une seule requête
+        
+        Les lignes doivent porter leur ID : l'insertion est un upsert sur l'ID,
+        ce qui rend une nouvelle tentative après échec sans effet de bord.
+        
+        Args:
+            rows: Lignes de la table letters (voir _letter_row)
+            
+        Returns:
+            Dictionnaire avec le nombre de lettres sauvegardées
+        """
+        try:
+            result = await self.postgrest.table("letters").upsert(rows).execute()
+            self._invalidate("letters", [row["id"] for row in rows])
+            
+            return {
+                "success": True,
+                "count": len(result.data),
+                "message": "Lettres sauvegardées avec succès"
+            }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+    
+    @metrics.timed_stage("db")
     async def update_email_status(self, letter_id: str, email_sent: bool, email_destinataire: str = None) -> Dict[str, Any]:
         """
         Met à jour le statut d'envoi d'email d'une lettre
@@ -83,7 +341,8 @@ class DatabaseManager:
             if email_destinataire:
                 update_data["email_destinataire"] = email_destinataire
             
-            result = self.supabase.table("letters").update(update_data).eq("id", letter_id).execute()
+            result = await self.postgrest.table("letters").update(update_data).eq("id", letter_id).execute()
+            self._invalidate("letters", [letter_id])
             
             if result.data:
                 return {
@@ -99,6 +358,7 @@ class DatabaseManager:
                 "error": f"Erreur lors de la mise à jour: {str(e)}"
             }
     
+    @metrics.timed_stage("db")
     async def get_letter_by_id(self, letter_id: str) -> Dict[str, Any]:
         """
         Récupère une lettre par son ID
@@ -109,10 +369,19 @@ class DatabaseManager:
         Returns:
             Dictionnaire avec les données de la lettre
         """
+        cached = self._cache_get("letters", letter_id)
+        if cached is not None:
+            return {
+                "success": True,
+                "letter": cached
+            }
+        
         try:
-            result = self.supabase.table("letters").select("*").eq("id", letter_id).execute()
+            epoch = self._cache_epoch
+            result = await self.postgrest.table("letters").select("*").eq("id", letter_id).execute()
             
             if result.data:
+                self._cache_set("letters", letter_id, result.data[0], epoch)
                 return {
                     "success": True,
                     "letter": result.data[0]
@@ -129,24 +398,54 @@ class DatabaseManager:
                 "error": f"Erreur lors de la récupération: {str(e)}"
             }
     
-    async def get_recent_letters(self, limit: int = 10) -> Dict[str, Any]:
+    async def _list_letters(self, email: Optional[str], limit: int, after: Optional[Tuple[str, str]],
+                            full: bool) -> Dict[str, Any]:
+        """
+        Lit une page de lettres, de la plus récente à la plus ancienne
+        
+        La pagination se fait par clé (created_at, id) : la requête reprend
+        directement après la dernière lettre de la page précédente, quel que
+        soit le nombre de lettres déjà parcourues.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = self.postgrest.table("letters").select("*" if full else LETTER_SUMMARY_COLUMNS)
+        
+        if email is not None:
+            query = query.eq("email_destinataire", email)
+        
+        if after is not None:
+            created_at, row_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+        
+        # Une ligne de plus que demandé pour savoir s'il existe une page suivante
+        result = await query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+        
+        letters = result.data[:limit]
+        next_cursor = encode_cursor(letters[-1]) if len(result.data) > limit else None
+        
+        return {
+            "success": True,
+            "letters": letters,
+            "count": len(letters),
+            "next_cursor": next_cursor
+        }
+    
+    @metrics.timed_stage("db")
+    async def get_recent_letters(self, limit: int = 10, after: Optional[Tuple[str, str]] = None,
+                                 full: bool = False) -> Dict[str, Any]:
         """
-        Récupère les lettres récentes
+        Récupère les lettres récentes, page par page
         
         Args:
-            limit: Nombre de lettres à récupérer
+            limit: Nombre de lettres par page (au plus MAX_PAGE_SIZE)
+            after: Position (created_at, id) de la dernière lettre de la page précédente (voir decode_cursor)
+            full: Inclure le texte de la lettre et le contexte
             
         Returns:
-            Dictionnaire avec la liste des lettres
+            Dictionnaire avec la liste des lettres et le curseur de la page suivante
         """
         try:
-            result = self.supabase.table("letters").select("*").order("created_at", desc=True).limit(limit).execute()
-            
-            return {
-                "success": True,
-                "letters": result.data,
-                "count": len(result.data)
-            }
+            return await self._list_letters(None, limit, after, full)
                 
         except Exception as e:
             return {
@@ -154,24 +453,23 @@ class DatabaseManager:
                 "error": f"Erreur lors de la récupération: {str(e)}"
             }
     
-    async def get_letters_by_email(self, email: str) -> Dict[str, Any]:
+    @metrics.timed_stage("db")
+    async def get_letters_by_email(self, email: str, limit: int = 20, after: Optional[Tuple[str, str]] = None,
+                                   full: bool = False) -> Dict[str, Any]:
         """
-        Récupère toutes les lettres envoyées à un email
+        Récupère les lettres envoyées à un email, page par page
         
         Args:
             email: Adresse email
+            limit: Nombre de lettres par page (au plus MAX_PAGE_SIZE)
+            after: Position (created_at, id) de la dernière lettre de la page précédente (voir decode_cursor)
+            full: Inclure le texte de la lettre et le contexte
             
         Returns:
-            Dictionnaire avec la liste des lettres
+            Dictionnaire avec la liste des lettres et le curseur de la page suivante
         """
         try:
-            result = self.supabase.table("letters").select("*").eq("email_destinataire", email).order("created_at", desc=True).execute()
-            
-            return {
-                "success": True,
-                "letters": result.data,
-                "count": len(result.data)
-            }
+            return await self._list_letters(email, limit, after, full)
                 
         except Exception as e:
             return {
@@ -179,19 +477,64 @@ class DatabaseManager:
                 "error": f"Erreur lors de la récupération: {str(e)}"
             }
     
-    async def find_letter_by_content(self, content_start: str) -> Dict[str, Any]:
+    async def iter_pages(self, table: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                         until: Optional[str] = None, ton: Optional[str] = None,
+                         page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
         """
-        Trouve une lettre par le début de son contenu
+        Parcourt une table par ordre chronologique (created_at, id), page par page
+        
+        Une seule page est en mémoire à la fois ; chaque page reprend après la
+        dernière ligne de la précédente (pagination par clé).
         
         Args:
-            content_start: Début du contenu de la lettre
+            table: Nom de la table (letters ou discours_mariage)
+            after: Position (created_at, id) après laquelle reprendre (voir decode_cursor)
+            since: Date de création minimale incluse (ISO 8601)
+            until: Date de création maximale exclue (ISO 8601)
+            ton: Ton des lettres à retenir
+            page_size: Nombre de lignes par requête
+            
+        Raises:
+            Exception: En cas d'erreur de lecture (la page en cours n'est pas renvoyée)
+        """
+        while True:
+            query = self.postgrest.table(table).select("*")
+            
+            if since:
+                query = query.gte("created_at", since)
+            if until:
+                query = query.lt("created_at", until)
+            if ton:
+                query = query.eq("ton", ton)
+            if after is not None:
+                created_at, row_id = after
+                query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}")')
+            
+            result = await query.order("created_at").order("id").limit(page_size).execute()
+            
+            if result.data:
+                yield result.data
+            if len(result.data) < page_size:
+                return
+            
+            after = (result.data[-1]["created_at"], result.data[-1]["id"])
+    
+    @metrics.timed_stage("db")
+    async def find_letter_by_content(self, content: str) -> Dict[str, Any]:
+        """
+        Trouve la lettre la plus récente ayant exactement ce contenu
+        
+        La recherche porte sur l'empreinte du texte normalisé (colonne indexée
+        empreinte_contenu), et non sur un préfixe.
+        
+        Args:
+            content: Contenu complet de la lettre
             
         Returns:
             Dictionnaire avec les données de la lettre
         """
         try:
-            # Recherche de lettres contenant ce début de contenu
-            result = self.supabase.table("letters").select("*").ilike("lettre_generée", f"{content_start}%").order("created_at", desc=True).limit(1).execute()
+            result = await self.postgrest.table("letters").select("*").eq("empreinte_contenu", content_fingerprint(content)).order("created_at", desc=True).limit(1).execute()
             
             if result.data:
                 return {
@@ -212,6 +555,7 @@ class DatabaseManager:
     
     # Méthodes pour les discours de mariage
     
+    @metrics.timed_stage("db")
     async def save_speech(self, speech_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Sauvegarde un discours de mariage dans la base de données
@@ -224,22 +568,10 @@ class DatabaseManager:
         """
         try:
             # Préparation des données pour l'insertion
-            insert_data = {
-                "prenom": speech_data["prenom"],
-                "marie": speech_data["marie"],
-                "partenaire": speech_data["partenaire"],
-                "style": speech_data.get("style"),
-                "lien": speech_data["lien"],
-                "rencontre": speech_data.get("rencontre"),
-                "qualites": speech_data.get("qualites"),
-                "anecdotes": speech_data.get("anecdotes"),
-                "souvenirs": speech_data.get("souvenir"),  # Note: "souvenir" dans les données, "souvenirs" en base
-                "duree": speech_data.get("duree"),
-                "discours": speech_data["discours"]
-            }
+            insert_data = self._speech_row(speech_data)
             
             # Insertion dans la base de données
-            result = self.supabase.table("discours_mariage").insert(insert_data).execute()
+            result = await self.postgrest.table("discours_mariage").insert(insert_data).execute()
             
             if result.data:
                 return {
@@ -256,6 +588,34 @@ class DatabaseManager:
                 "error": f"Erreur lors de la sauvegarde: {str(e)}"
             }
     
+    @metrics.timed_stage("db")
+    async def save_speeches(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sauvegarde plusieurs discours en une seule requête (upsert sur l'ID)
+        
+        Args:
+            rows: Lignes de la table discours_mariage (voir _speech_row)
+            
+        Returns:
+            Dictionnaire avec le nombre de discours sauvegardés
+        """
+        try:
+            result = await self.postgrest.table("discours_mariage").upsert(rows).execute()
+            self._invalidate("discours_mariage", [row["id"] for row in rows])
+            
+            return {
+                "success": True,
+                "count": len(result.data),
+                "message": "Discours sauvegardés avec succès"
+            }
+                
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+    
+    @metrics.timed_stage("db")
     async def get_speech_by_id(self, speech_id: str) -> Dict[str, Any]:
         """
         Récupère un discours par son ID
@@ -266,10 +626,19 @@ class DatabaseManager:
         Returns:
             Dictionnaire avec les données du discours
         """
+        cached = self._cache_get("discours_mariage", speech_id)
+        if cached is not None:
+            return {
+                "success": True,
+                "speech": cached
+            }
+        
         try:
-            result = self.supabase.table("discours_mariage").select("discours, created_at").eq("id", speech_id).execute()
+            epoch = self._cache_epoch
+            result = await self.postgrest.table("discours_mariage").select("discours, created_at").eq("id", speech_id).execute()
             
             if result.data:
+                self._cache_set("discours_mariage", speech_id, result.data[0], epoch)
                 return {
                     "success": True,
                     "speech": result.data[0]
@@ -284,4 +653,24 @@ class DatabaseManager:
             return {
                 "success": False,
                 "error": f"Erreur lors de la récupération: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+def create_storage(cache: Optional[TTLCache] = None) -> StorageBackend:
+    """
+    Crée le backend de stockage choisi par STORAGE_BACKEND
+    
+    - supabase (défaut) : DatabaseManager, via SUPABASE_URL et SUPABASE_ANON_KEY
+    - sqlite : SQLiteDatabaseManager, fichier local SQLITE_PATH (défaut: lettre_facile.db)
+    
+    Args:
+        cache: Cache des lectures par ID, désactivé si None
+    """
+    backend = os.getenv("STORAGE_BACKEND", "supabase").lower()
+    
+    if backend == "supabase":
+        return DatabaseManager(cache=cache)
+    if backend == "sqlite":
+        from sqlite_storage import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(os.getenv("SQLITE_PATH", "lettre_facile.db"), cache=cache)
+    
+    raise ValueError(f"STORAGE_BACKEND inconnu: {backend} (valeurs possibles: supabase, sqlite)")
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Export des lettres et discours au format NDJSON (une ligne JSON par enregistrement)
+
+Les lignes sont lues page par page depuis le stockage (StorageBackend.iter_pages),
+si bien que la mémoire utilisée ne dépend pas de la taille des tables. Utilisé par
+l'endpoint GET /export/{table} et en ligne de commande :
+
+    python export.py letters --output letters.ndjson.gz --since 2024-01-01 --ton formel
+
+En ligne de commande, le curseur de la dernière page écrite est enregistré dans
+<output>.cursor ; --resume reprend l'export là où il s'était arrêté.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import zlib
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from database import StorageBackend, create_storage, decode_cursor, encode_cursor
+from models import TonEnum
+
+
+logger = logging.getLogger(__name__)
+
+# Tables exportables (nom public -> table Supabase)
+EXPORT_TABLES = {
+    "letters": "letters",
+    "discours": "discours_mariage"
+}
+
+
+def ndjson_lines(rows: List[Dict[str, Any]]) -> bytes:
+    """Sérialise des lignes en NDJSON (UTF-8)"""
+    return "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows).encode("utf-8")
+
+
+async def export_ndjson(database: StorageBackend, table: str, after: Optional[Tuple[str, str]] = None,
+                        since: Optional[str] = None, until: Optional[str] = None, ton: Optional[str] = None,
+                        compress: bool = False, page_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Produit l'export NDJSON d'une table, un bloc par page lue
+
+    Args:
+        database: Backend de stockage utilisé pour la lecture
+        table: Nom public de la table (voir EXPORT_TABLES)
+        after: Position (created_at, id) après laquelle reprendre
+        since: Date de création minimale incluse (ISO 8601)
+        until: Date de création maximale exclue (ISO 8601)
+        ton: Ton des lettres à retenir
+        compress: Compresser le flux en gzip
+        page_size: Lignes lues par requête (EXPORT_PAGE_SIZE, défaut: 500)
+    """
+    page_size = page_size or int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    async for rows in database.iter_pages(EXPORT_TABLES[table], after, since, until, ton, page_size):
+        chunk = ndjson_lines(rows)
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+async def export_to_file(database: StorageBackend, table: str, output: str, resume: bool = False,
+                         since: Optional[str] = None, until: Optional[str] = None, ton: Optional[str] = None,
+                         page_size: Optional[int] = None) -> int:
+    """
+    Exporte une table dans un fichier NDJSON (gzip si le nom finit par .gz), avec reprise
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    page_size = page_size or int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+    cursor_path = f"{output}.cursor"
+
+    after = None
+    if resume and os.path.exists(cursor_path):
+        with open(cursor_path) as cursor_file:
+            after = decode_cursor(cursor_file.read().strip())
+        logger.info(f"Reprise de l'export après {after[0]} ({after[1]})")
+    elif os.path.exists(output):
+        raise ValueError(f"{output} existe déjà (utiliser --resume pour reprendre l'export)")
+
+    opener = gzip.open if output.endswith(".gz") else open
+    written = 0
+
+    # Chaque page est ajoutée puis validée par l'écriture du curseur ; un fichier gzip
+    # complété après reprise reste lisible (membres gzip concaténés)
+    async for rows in database.iter_pages(EXPORT_TABLES[table], after, since, until, ton, page_size):
+        with opener(output, "ab") as output_file:
+            output_file.write(ndjson_lines(rows))
+        with open(cursor_path, "w") as cursor_file:
+            cursor_file.write(encode_cursor(rows[-1]))
+
+        written += len(rows)
+        logger.info(f"{written} ligne(s) exportée(s)")
+
+    return written
+
+
+async def run(args: argparse.Namespace) -> None:
+    database = create_storage()
+    try:
+        written = await export_to_file(database, args.table, args.output, args.resume,
+                                       args.since and args.since.isoformat(), args.until and args.until.isoformat(),
+                                       args.ton, args.page_size)
+        logger.info(f"Export terminé : {written} ligne(s) dans {args.output}")
+    finally:
+        await database.close()
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES), help="Table à exporter")
+    parser.add_argument("--output", required=True, help="Fichier de sortie (.ndjson ou .ndjson.gz)")
+    parser.add_argument("--resume", action="store_true", help="Reprendre après le dernier curseur enregistré")
+    parser.add_argument("--since", type=date.fromisoformat, help="Date de création minimale incluse (AAAA-MM-JJ)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Date de création maximale exclue (AAAA-MM-JJ)")
+    parser.add_argument("--ton", choices=[ton.value for ton in TonEnum], help="Ton des lettres à exporter (letters uniquement)")
+    parser.add_argument("--page-size", type=int, help="Lignes lues par requête")
+    args = parser.parse_args()
+
+    if args.ton and args.table != "letters":
+        parser.error("--ton ne s'applique qu'à la table letters")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
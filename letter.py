@@ -1,19 +1,49 @@
-import os
+import asyncio
 import openai
-from typing import Optional
+from typing import AsyncIterator, Optional
 from models import LetterRequest, TonEnum
+from llm_client import get_completion_scheduler, get_openai_client
+import metrics
+from cache import TTLCache, request_fingerprint
+from resilience import CallPolicy
+from scheduler import CompletionScheduler, estimate_tokens
+from singleflight import SingleFlight
+
+
+# Nombre maximal de tokens générés pour une lettre
+MAX_TOKENS = 1500
+
+# Champs de LetterRequest qui déterminent la lettre générée
+REQUEST_KEY_FIELDS = ("nom", "adresse", "destinataire", "adresse_destinataire", "objet", "contexte", "date_effet", "ton")
 
 
 class LetterGenerator:
     """Classe pour générer des lettres avec OpenAI"""
     
-    def __init__(self):
-        """Initialise le client OpenAI avec la clé API"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY non définie dans les variables d'environnement")
+    def __init__(self, client: Optional[openai.AsyncOpenAI] = None, cache: Optional[TTLCache] = None,
+                 scheduler: Optional[CompletionScheduler] = None,
+                 policy: Optional[CallPolicy] = None):
+        """
+        Initialise le client OpenAI asynchrone (pool de connexions partagé)
+        
+        Args:
+            client: Client compatible AsyncOpenAI (optionnel, ex: faux client pour les benchmarks)
+            cache: Cache des lettres générées, indexé sur l'empreinte de la requête (optionnel)
+            scheduler: Ordonnanceur des appels OpenAI (par défaut, celui partagé par tous les générateurs)
+            policy: Délais, nouvelles tentatives et hedging des générations (configuration par défaut si absent)
+        """
+        self.client = client or get_openai_client()
+        self.cache = cache
+        self.scheduler = scheduler or get_completion_scheduler()
+        self.policy = policy or CallPolicy()
         
-        self.client = openai.OpenAI(api_key=api_key)
+        # Regroupement des requêtes identiques en cours de génération
+        self.inflight = SingleFlight()
+    
+    @staticmethod
+    def request_key(request: LetterRequest) -> str:
+        """Empreinte canonique des champs de la requête qui déterminent la lettre (cache et regroupement)"""
+        return request_fingerprint(request.model_dump(mode="json", include=set(REQUEST_KEY_FIELDS)))
     
     def _build_prompt(self, request: LetterRequest) -> str:
         """Construit le prompt pour OpenAI basé sur les données de la requête"""
@@ -59,27 +89,63 @@ Générez uniquement le contenu de la lettre, sans commentaires supplémentaires
         
         return prompt.strip()
     
-    async def generate_letter(self, request: LetterRequest) -> str:
-        """Génère une lettre en utilisant l'API OpenAI"""
+    def _build_messages(self, request: LetterRequest) -> list:
+        """Construit la liste des messages envoyés à OpenAI"""
         
-        try:
+        with metrics.stage("prompt_build", "letter"):
             prompt = self._build_prompt(request)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Vous êtes un assistant spécialisé dans la rédaction de lettres professionnelles en français. Vous générez des lettres complètes et bien formatées."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
+        
+        return [
+            {
+                "role": "system",
+                "content": "Vous êtes un assistant spécialisé dans la rédaction de lettres professionnelles en français. Vous générez des lettres complètes et bien formatées."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    async def generate_letter(self, request: LetterRequest, use_cache: bool = True, timeout: Optional[float] = None) -> str:
+        """
+        Génère une lettre en utilisant l'API OpenAI
+        
+        Les requêtes identiques en cours de génération partagent une seule complétion OpenAI.
+        
+        Args:
+            request: Données de la lettre
+            use_cache: Si False, ignore le cache en lecture (la nouvelle lettre y est tout de même stockée)
+            timeout: Délai maximal d'attente de cet appel (en secondes)
+        """
+        
+        key = self.request_key(request)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            return await self.inflight.do(key, lambda: self._complete_and_store(request, key), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise Exception("Délai de génération de la lettre dépassé")
+    
+    async def _complete_and_store(self, request: LetterRequest, key: str) -> str:
+        """Génère la lettre puis la stocke dans le cache"""
+        
+        generated_letter = await self._complete(request)
+        
+        if self.cache is not None:
+            self.cache.set(key, generated_letter)
+        
+        return generated_letter
+    
+    async def _complete(self, request: LetterRequest) -> str:
+        """Appelle OpenAI (délais, nouvelles tentatives et hedging selon self.policy) et retourne la lettre complète"""
+        
+        messages = self._build_messages(request)
+        
+        try:
+            response = await self.policy.call(lambda: self._request_completion(messages))
             
             # Extraction du contenu généré
             generated_letter = response.choices[0].message.content.strip()
@@ -89,7 +155,77 @@ Générez uniquement le contenu de la lettre, sans commentaires supplémentaires
             
             return generated_letter
             
+        except asyncio.TimeoutError:
+            # Échéance de l'appel dépassée (délais par tentative et nouvelles tentatives épuisés)
+            metrics.ERRORS.inc(stage="openai_completion", cause="TimeoutError")
+            raise Exception("Délai de réponse d'OpenAI dépassé")
         except openai.APIError as e:
             raise Exception(f"Erreur API OpenAI: {str(e)}")
         except Exception as e:
-            raise Exception(f"Erreur lors de la génération de la lettre: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Erreur lors de la génération de la lettre: {str(e)}")
+    
+    async def _request_completion(self, messages: list):
+        """Une requête de complétion OpenAI, dans une place de l'ordonnanceur"""
+        
+        async with self.scheduler.slot(estimate_tokens(messages, MAX_TOKENS)) as ticket:
+            with metrics.stage("openai_completion", "letter"):
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    max_tokens=MAX_TOKENS,
+                    temperature=0.7
+                )
+            if response.usage:
+                self.scheduler.record_usage(ticket, response.usage.total_tokens)
+                metrics.record_usage(response.usage)
+        
+        return response
+    
+    async def stream_letter(self, request: LetterRequest, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Génère une lettre en flux, fragment par fragment, au fil de la complétion OpenAI
+        
+        Une lettre présente dans le cache est renvoyée en un seul fragment. La complétion
+        amont est fermée dès que l'itération s'arrête (fin, erreur ou annulation).
+        """
+        
+        key = self.request_key(request)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        messages = self._build_messages(request)
+        
+        # La place d'appel est occupée pendant toute la durée du flux
+        async with self.scheduler.slot(estimate_tokens(messages, MAX_TOKENS)) as ticket:
+            parts = []
+            try:
+                # Étape mesurée de la requête jusqu'au dernier fragment (erreurs comptées par type)
+                with metrics.stage("openai_completion", "letter_stream"):
+                    stream = await self.client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=messages,
+                        max_tokens=MAX_TOKENS,
+                        temperature=0.7,
+                        stream=True,
+                        # Dernier fragment : consommation réelle, imputée au budget de tokens
+                        stream_options={"include_usage": True}
+                    )
+                    try:
+                        async for chunk in stream:
+                            if chunk.usage:
+                                self.scheduler.record_usage(ticket, chunk.usage.total_tokens)
+                                metrics.record_usage(chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                parts.append(chunk.choices[0].delta.content)
+                                yield chunk.choices[0].delta.content
+                    finally:
+                        await stream.close()
+            except openai.APIError as e:
+                raise Exception(f"Erreur API OpenAI: {str(e)}")
+        
+        generated_letter = "".join(parts).strip()
+        if self.cache is not None and generated_letter:
+            self.cache.set(key, generated_letter)
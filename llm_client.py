@@ -0,0 +1,64 @@
+import os
+import httpx
+import openai
+from typing import Optional
+
+from scheduler import CompletionScheduler
+
+
+# Client OpenAI asynchrone partagé par tous les générateurs (un seul pool de connexions)
+_client: Optional[openai.AsyncOpenAI] = None
+
+# Ordonnanceur partagé : les limites de débit OpenAI s'appliquent à la clé API entière
+_scheduler: Optional[CompletionScheduler] = None
+
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """
+    Retourne le client OpenAI asynchrone partagé, en le créant au premier appel
+
+    Le pool de connexions HTTP est dimensionné via OPENAI_MAX_CONNECTIONS et
+    le délai maximal d'un appel via OPENAI_TIMEOUT (en secondes).
+    OPENAI_BASE_URL permet de pointer vers un serveur compatible (ex: bouchon local).
+    Les nouvelles tentatives du SDK sont désactivées : elles sont gérées par
+    CallPolicy (resilience.py), sous l'échéance de chaque appel.
+    """
+    global _client
+
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY non définie dans les variables d'environnement")
+
+        max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+        timeout = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=timeout
+        )
+        _client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    return _client
+
+
+def get_completion_scheduler() -> CompletionScheduler:
+    """Retourne l'ordonnanceur des complétions partagé, en le créant au premier appel"""
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = CompletionScheduler()
+
+    return _scheduler
+
+
+async def close_openai_client() -> None:
+    """Ferme le pool de connexions du client partagé (à l'arrêt de l'application)"""
+    global _client
+
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,25 +1,62 @@
+import html
 import os
-import smtplib
+import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formatdate
 from typing import Optional
+from smtp_pool import SMTPConnectionPool
 
 
 class EmailSender:
     """Classe pour envoyer des emails via SMTP"""
     
-    def __init__(self):
-        """Initialise la configuration SMTP pour Infomaniak"""
-        # Configuration directe pour Infomaniak
-        self.smtp_server = "mail.infomaniak.com"
-        self.smtp_port = 465  # Port SSL pour Infomaniak
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, speech_pool: Optional[SMTPConnectionPool] = None):
+        """
+        Initialise la configuration SMTP pour Infomaniak
+        
+        Args:
+            pool: Pool de sessions SMTP des lettres (optionnel, ex: serveur local pour les benchmarks)
+            speech_pool: Pool de sessions SMTP des discours (optionnel)
+        """
+        # Configuration Infomaniak par défaut (SMTP_SERVER / SMTP_PORT / SMTP_USE_TLS pour un autre serveur)
+        self.smtp_server = os.getenv("SMTP_SERVER", "mail.infomaniak.com")
+        self.smtp_port = int(os.getenv("SMTP_PORT", "465"))  # Port SSL pour Infomaniak
+        # TLS direct sur le port 465 ; sur les autres ports, STARTTLS si le serveur le propose
+        self.smtp_use_tls = os.getenv("SMTP_USE_TLS", str(self.smtp_port == 465)).lower() == "true"
         self.smtp_username = os.getenv("SMTP_USERNAME")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
         
         # Validation de la configuration
         if not all([self.smtp_username, self.smtp_password]):
             raise ValueError("SMTP_USERNAME et SMTP_PASSWORD doivent être définis dans les variables d'environnement")
+        
+        # Sessions SMTP authentifiées réutilisées entre les envois
+        self.pool = pool or SMTPConnectionPool(
+            hostname=self.smtp_server,
+            port=self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            size=int(os.getenv("SMTP_POOL_SIZE", "3")),
+            use_tls=self.smtp_use_tls,
+            keepalive_interval=float(os.getenv("SMTP_KEEPALIVE_INTERVAL", "60"))
+        )
+        
+        # Compte d'envoi des discours de mariage (optionnel) : même serveur, sessions dédiées
+        # car une session SMTP est authentifiée pour une seule adresse d'expédition
+        self.speech_from = os.getenv("EMAIL_FROM")
+        self.speech_password = os.getenv("EMAIL_PASSWORD")
+        self.speech_pool = speech_pool
+        if self.speech_pool is None and self.speech_from and self.speech_password:
+            self.speech_pool = SMTPConnectionPool(
+                hostname=self.smtp_server,
+                port=self.smtp_port,
+                username=self.speech_from,
+                password=self.speech_password,
+                size=int(os.getenv("SMTP_POOL_SIZE", "3")),
+                use_tls=self.smtp_use_tls,
+                keepalive_interval=float(os.getenv("SMTP_KEEPALIVE_INTERVAL", "60"))
+            )
     
     def _create_html_content(self, letter_content: str, request_data: dict) -> str:
         """Crée le contenu HTML de l'email"""
@@ -142,39 +179,184 @@ Vous pouvez copier ce contenu et l'utiliser selon vos besoins
         
         return text_content.strip()
     
+    def _build_letter_message(self, to_email: str, letter_content: str, request_data: dict) -> MIMEMultipart:
+        """Assemble le message MIME (texte + HTML) de la lettre"""
+        
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        msg['Subject'] = f"Lettre générée - {request_data.get('objet', 'Lettre Facile')}"
+        msg['Date'] = formatdate(localtime=True)
+        
+        # Contenu texte
+        text_content = self._create_text_content(letter_content, request_data)
+        text_part = MIMEText(text_content, 'plain', 'utf-8')
+        msg.attach(text_part)
+        
+        # Contenu HTML
+        html_content = self._create_html_content(letter_content, request_data)
+        html_part = MIMEText(html_content, 'html', 'utf-8')
+        msg.attach(html_part)
+        
+        return msg
+    
     async def send_letter_email(self, to_email: str, letter_content: str, request_data: dict) -> bool:
         """Envoie la lettre générée par email"""
         
         try:
             # Création du message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = f"Lettre générée - {request_data.get('objet', 'Lettre Facile')}"
-            msg['Date'] = formatdate(localtime=True)
+            msg = self._build_letter_message(to_email, letter_content, request_data)
             
-            # Contenu texte
-            text_content = self._create_text_content(letter_content, request_data)
-            text_part = MIMEText(text_content, 'plain', 'utf-8')
-            msg.attach(text_part)
+            # Envoi via une session SSL (port 465) du pool
+            await self.pool.send_message(msg)
             
-            # Contenu HTML
-            html_content = self._create_html_content(letter_content, request_data)
-            html_part = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(html_part)
+            return True
+            
+        except aiosmtplib.SMTPAuthenticationError:
+            raise Exception("Erreur d'authentification SMTP - vérifiez vos identifiants")
+        except aiosmtplib.SMTPRecipientsRefused:
+            raise Exception("Adresse email destinataire invalide")
+        except aiosmtplib.SMTPServerDisconnected:
+            raise Exception("Connexion au serveur SMTP perdue")
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'envoi de l'email: {str(e)}")
+    
+    def _create_speech_html_content(self, speech_content: str) -> str:
+        """Crée le contenu HTML de l'email de discours"""
+        
+        # Texte issu du modèle, influençable par l'utilisateur : échappé avant insertion dans le HTML
+        speech_html = html.escape(speech_content).replace("\n", "<br>")
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html lang="fr">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Votre discours de mariage</title>
+            <style>
+                body {{
+                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                    max-width: 800px;
+                    margin: 0 auto;
+                    padding: 20px;
+                    background-color: #f5f5f5;
+                }}
+                .container {{
+                    background-color: white;
+                    padding: 30px;
+                    border-radius: 10px;
+                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                }}
+                .header {{
+                    text-align: center;
+                    margin-bottom: 30px;
+                    padding-bottom: 20px;
+                    border-bottom: 2px solid #c2185b;
+                }}
+                .header h1 {{
+                    color: #c2185b;
+                    margin: 0;
+                    font-size: 28px;
+                }}
+                .speech-content {{
+                    background-color: #fdf2f6;
+                    padding: 25px;
+                    border-radius: 8px;
+                    border-left: 4px solid #c2185b;
+                    white-space: pre-wrap;
+                    font-family: Georgia, 'Times New Roman', serif;
+                    font-size: 15px;
+                    line-height: 1.8;
+                }}
+                .footer {{
+                    margin-top: 30px;
+                    padding-top: 20px;
+                    border-top: 1px solid #ddd;
+                    text-align: center;
+                    color: #666;
+                    font-size: 12px;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>💍 Votre discours de mariage</h1>
+                    <p>Voici la version complète de votre discours</p>
+                </div>
+                
+                <div class="speech-content">
+{speech_html}
+                </div>
+                
+                <div class="footer">
+                    <p>Ce discours a été généré automatiquement par le Générateur de Discours de Mariage</p>
+                    <p>Date de génération : {formatdate(localtime=True)}</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        return html_content
+    
+    def _create_speech_text_content(self, speech_content: str) -> str:
+        """Crée le contenu texte de l'email de discours"""
+        
+        text_content = f"""
+Votre discours de mariage complet
+
+{speech_content}
+
+---
+Ce discours a été généré automatiquement par le Générateur de Discours de Mariage
+Date de génération : {formatdate(localtime=True)}
+        """
+        
+        return text_content.strip()
+    
+    def _build_speech_message(self, to_email: str, speech_content: str) -> MIMEMultipart:
+        """Assemble le message MIME (texte + HTML) du discours"""
+        
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.speech_from
+        msg['To'] = to_email
+        msg['Subject'] = "Votre discours de mariage complet 💍"
+        msg['Date'] = formatdate(localtime=True)
+        
+        msg.attach(MIMEText(self._create_speech_text_content(speech_content), 'plain', 'utf-8'))
+        msg.attach(MIMEText(self._create_speech_html_content(speech_content), 'html', 'utf-8'))
+        
+        return msg
+    
+    async def send_speech_email(self, to_email: str, speech_content: str) -> bool:
+        """Envoie un discours de mariage par email"""
+        
+        if self.speech_pool is None:
+            raise ValueError("Configuration e-mail manquante")
+        
+        try:
+            msg = self._build_speech_message(to_email, speech_content)
             
-            # Connexion et envoi avec SSL (port 465)
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            # Envoi via une session SSL (port 465) du pool des discours
+            await self.speech_pool.send_message(msg)
             
             return True
             
-        except smtplib.SMTPAuthenticationError:
+        except aiosmtplib.SMTPAuthenticationError:
             raise Exception("Erreur d'authentification SMTP - vérifiez vos identifiants")
-        except smtplib.SMTPRecipientsRefused:
+        except aiosmtplib.SMTPRecipientsRefused:
             raise Exception("Adresse email destinataire invalide")
-        except smtplib.SMTPServerDisconnected:
+        except aiosmtplib.SMTPServerDisconnected:
             raise Exception("Connexion au serveur SMTP perdue")
         except Exception as e:
-            raise Exception(f"Erreur lors de l'envoi de l'email: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Erreur lors de l'envoi de l'email: {str(e)}")
+    
+    async def close(self):
+        """Ferme les sessions SMTP des pools"""
+        await self.pool.close()
+        if self.speech_pool is not None:
+            await self.speech_pool.close()
@@ -1,23 +1,32 @@
 import os
+import asyncio
+import json
 import logging
-import smtplib
 import uuid
-from datetime import datetime
-from fastapi import FastAPI, HTTPException, status, Form
+from datetime import date, datetime
+from typing import Optional
+from fastapi import FastAPI, HTTPException, status, Form, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 import uvicorn
-from openai import OpenAI
-from email.message import EmailMessage
 
 from models import (
-    LetterRequest, LetterResponse, EmailRequest, EmailResponse, ErrorResponse,
+    LetterRequest, LetterResponse, LetterBatchRequest, LetterBatchItem, LetterBatchResponse, CacheModeEnum, ExportTableEnum, TonEnum, EmailRequest, EmailJobResponse, ErrorResponse,
     SpeechRequest, SpeechResponse, SendSpeechRequest, SendSpeechResponse, GetSpeechResponse
 )
 from letter import LetterGenerator
+from speech import SpeechGenerator
 from mailer import EmailSender
-from database import DatabaseManager
+from database import create_storage, cursor_position, decode_cursor
+from outbox import EmailOutbox
+from write_behind import WriteBehindBuffer
+from llm_client import close_openai_client
+from cache import TTLCache
+from export import export_ndjson
+from profiler import LoopLagMonitor, profile
+import metrics
+import server_timing
 
 # Chargement des variables d'environnement
 load_dotenv()
@@ -47,45 +56,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comptage des requêtes et histogrammes de latence par route (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# En-tête Server-Timing et log de décomposition par phase des routes de génération et d'envoi
+app.add_middleware(server_timing.ServerTimingMiddleware)
+
 # Initialisation des services
 letter_generator = None
+speech_generator = None
 email_sender = None
 database_manager = None
-openai_client = None
-
-# Configuration pour les discours de mariage
-EMAIL_FROM = os.getenv("EMAIL_FROM")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+write_buffer = None
+email_outbox = None
+loop_monitor = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialise les services au démarrage de l'application"""
-    global letter_generator, email_sender, database_manager, openai_client
+    global letter_generator, speech_generator, email_sender, database_manager, write_buffer, email_outbox, loop_monitor
     
     try:
         # Vérification des variables d'environnement
         required_vars = [
             "OPENAI_API_KEY",
             "SMTP_USERNAME",
-            "SMTP_PASSWORD",
-            "SUPABASE_URL",
-            "SUPABASE_ANON_KEY"
+            "SMTP_PASSWORD"
         ]
+        if os.getenv("STORAGE_BACKEND", "supabase").lower() == "supabase":
+            required_vars += ["SUPABASE_URL", "SUPABASE_ANON_KEY"]
         
         missing_vars = [var for var in required_vars if not os.getenv(var)]
         if missing_vars:
             logger.error(f"Variables d'environnement manquantes: {missing_vars}")
             raise ValueError(f"Variables d'environnement manquantes: {missing_vars}")
         
+        # Cache optionnel des lettres générées (requêtes identiques resoumises)
+        letter_cache = None
+        if os.getenv("LETTER_CACHE_ENABLED", "false").lower() == "true":
+            letter_cache = TTLCache(
+                max_entries=int(os.getenv("LETTER_CACHE_MAX_ENTRIES", "1000")),
+                ttl=float(os.getenv("LETTER_CACHE_TTL", "3600")),
+                max_bytes=int(os.getenv("LETTER_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+            )
+        
+        # Cache des lectures par ID (liens de partage /letters/{id} et /discours/{id})
+        read_cache = None
+        if os.getenv("READ_CACHE_ENABLED", "true").lower() == "true":
+            read_cache = TTLCache(
+                max_entries=int(os.getenv("READ_CACHE_MAX_ENTRIES", "5000")),
+                ttl=float(os.getenv("READ_CACHE_TTL", "300")),
+                max_bytes=int(os.getenv("READ_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+            )
+        
         # Initialisation des services
-        letter_generator = LetterGenerator()
+        letter_generator = LetterGenerator(cache=letter_cache)
+        speech_generator = SpeechGenerator()
         email_sender = EmailSender()
-        database_manager = DatabaseManager()
+        database_manager = create_storage(cache=read_cache)
+        
+        # Écriture différée des lettres et discours générés (insertions en lot)
+        write_buffer = WriteBehindBuffer(database_manager)
+        write_buffer.start()
         
-        # Initialisation du client OpenAI pour les discours
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            openai_client = OpenAI(api_key=api_key)
+        # File d'envoi des emails de lettres, vidée en arrière-plan
+        email_outbox = EmailOutbox(email_sender, write_buffer)
+        email_outbox.start()
+        
+        # Détection des blocages de la boucle d'événements (appel synchrone, calcul long)
+        if os.getenv("LOOP_LAG_MONITOR_ENABLED", "true").lower() == "true":
+            loop_monitor = LoopLagMonitor()
+            loop_monitor.start()
         
         logger.info("Application démarrée avec succès")
         
@@ -93,6 +134,22 @@ async def startup_event():
         logger.error(f"Erreur lors du démarrage: {str(e)}")
         raise e
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Libère les ressources partagées à l'arrêt de l'application"""
+    await close_openai_client()
+    if loop_monitor:
+        await loop_monitor.stop()
+    if email_outbox:
+        await email_outbox.stop()
+    if write_buffer:
+        await write_buffer.stop()
+    if database_manager:
+        await database_manager.close()
+    if email_sender:
+        await email_sender.close()
+    logger.info("Application arrêtée")
+
 @app.get("/", tags=["Health"])
 async def root():
     """Point d'entrée principal - vérification de santé de l'API"""
@@ -112,7 +169,20 @@ async def health_check():
             "openai": "configured" if letter_generator else "not_configured",
             "smtp": "configured" if email_sender else "not_configured",
             "database": "configured" if database_manager else "not_configured"
-        }
+        },
+        "write_behind": write_buffer.stats() if write_buffer else None,
+        "letter_cache": letter_generator.cache.stats() if letter_generator and letter_generator.cache is not None else None,
+        "read_cache": database_manager.cache.stats() if database_manager and database_manager.cache is not None else None,
+        "openai_scheduler": letter_generator.scheduler.stats() if letter_generator else None,
+        "openai_calls": {
+            "letters": letter_generator.policy.stats() if letter_generator else None,
+            "speeches": speech_generator.policy.stats() if speech_generator else None
+        },
+        "coalescing": {
+            "letters": letter_generator.inflight.stats() if letter_generator else None,
+            "speeches": speech_generator.inflight.stats() if speech_generator else None
+        },
+        "event_loop": loop_monitor.stats() if loop_monitor else None
     }
 
 @app.get("/ping", tags=["Health"])
@@ -124,17 +194,83 @@ async def ping():
         "service": "Lettre Facile & Générateur de Discours Backend"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """Métriques au format Prometheus (requêtes, latences par étape, tokens, erreurs)"""
+    if letter_generator:
+        metrics.QUEUE_DEPTH.set(letter_generator.scheduler.queue_depth(), queue="openai_scheduler")
+    if write_buffer:
+        metrics.QUEUE_DEPTH.set(write_buffer.queue_depth(), queue="write_behind")
+    if email_outbox:
+        metrics.QUEUE_DEPTH.set(email_outbox.queue_depth(), queue="email_outbox")
+    
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+def _sse_event(event: str, data: dict) -> str:
+    """Formate un évènement Server-Sent Events avec une charge utile JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _letter_data(request: LetterRequest, letter_content: str) -> dict:
+    """Données à sauvegarder pour une lettre générée"""
+    return {
+        "nom": request.nom,
+        "adresse": request.adresse,
+        "destinataire": request.destinataire,
+        "adresse_destinataire": request.adresse_destinataire,
+        "objet": request.objet,
+        "contexte": request.contexte,
+        "date_effet": request.date_effet,
+        "ton": request.ton.value,
+        "lettre_generée": letter_content,
+        "email_destinataire": None,
+        "email_envoye": False
+    }
+
+
+def _check_write_capacity() -> None:
+    """Refuse (503) une génération dont le résultat ne pourrait pas être sauvegardé"""
+    if write_buffer is not None and write_buffer.saturated():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sauvegarde saturée, réessayez dans quelques instants",
+            headers={"Retry-After": "5"}
+        )
+
+
+async def _save_letter(request: LetterRequest, letter_content: str) -> Optional[str]:
+    """Sauvegarde une lettre générée en base et retourne son ID (None en cas d'échec)"""
+    
+    try:
+        db_result = await write_buffer.save_letter(_letter_data(request, letter_content))
+        if db_result["success"]:
+            letter_id = db_result["letter_id"]
+            logger.info(f"Lettre sauvegardée en base avec l'ID: {letter_id}")
+            return letter_id
+        
+        logger.warning(f"Erreur lors de la sauvegarde en base: {db_result['error']}")
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde en base: {str(e)}")
+    
+    return None
+
+
 @app.post("/generate-letter", 
           response_model=LetterResponse,
           responses={
               400: {"model": ErrorResponse},
-              500: {"model": ErrorResponse}
+              500: {"model": ErrorResponse},
+              503: {"model": ErrorResponse}
           },
           tags=["Letters"])
-async def generate_letter(request: LetterRequest):
+async def generate_letter(request: LetterRequest, cache: CacheModeEnum = CacheModeEnum.DEFAULT):
     """
     Génère une lettre basée sur les informations fournies.
     
+    Si le cache de génération est activé, une requête identique déjà traitée renvoie
+    la lettre en cache ; `?cache=bypass` force une nouvelle génération.
+    
     - **nom**: Nom de l'expéditeur
     - **adresse**: Adresse de l'expéditeur
     - **destinataire**: Nom du destinataire
@@ -145,39 +281,19 @@ async def generate_letter(request: LetterRequest):
     - **ton**: Ton de la lettre (formel, neutre, concis)
     """
     
+    _check_write_capacity()
+    
     try:
         logger.info(f"Début de génération de lettre")
         
         # Génération de la lettre
-        letter_content = await letter_generator.generate_letter(request)
+        with server_timing.phase("generation"):
+            letter_content = await letter_generator.generate_letter(request, use_cache=cache != CacheModeEnum.BYPASS)
         logger.info("Lettre générée avec succès")
         
         # Sauvegarde en base de données
-        letter_id = None
-        try:
-            letter_data = {
-                "nom": request.nom,
-                "adresse": request.adresse,
-                "destinataire": request.destinataire,
-                "adresse_destinataire": request.adresse_destinataire,
-                "objet": request.objet,
-                "contexte": request.contexte,
-                "date_effet": request.date_effet,
-                "ton": request.ton.value,
-                "lettre_generée": letter_content,
-                "email_destinataire": None,
-                "email_envoye": False
-            }
-            
-            db_result = await database_manager.save_letter(letter_data)
-            if db_result["success"]:
-                letter_id = db_result["letter_id"]
-                logger.info(f"Lettre sauvegardée en base avec l'ID: {letter_id}")
-            else:
-                logger.warning(f"Erreur lors de la sauvegarde en base: {db_result['error']}")
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde en base: {str(e)}")
+        with server_timing.phase("persistence"):
+            letter_id = await _save_letter(request, letter_content)
         
         return LetterResponse(
             lettre=letter_content,
@@ -199,8 +315,130 @@ async def generate_letter(request: LetterRequest):
         )
 
 
+@app.post("/generate-letters/batch",
+          response_model=LetterBatchResponse,
+          responses={
+              400: {"model": ErrorResponse},
+              503: {"model": ErrorResponse}
+          },
+          tags=["Letters"])
+async def generate_letters_batch(batch: LetterBatchRequest, cache: CacheModeEnum = CacheModeEnum.DEFAULT):
+    """
+    Génère plusieurs lettres en parallèle (ex: une même réclamation à plusieurs fournisseurs).
+    
+    Les lettres sont générées simultanément (LETTER_BATCH_CONCURRENCY à la fois),
+    puis sauvegardées en une seule insertion. Les résultats sont retournés dans
+    l'ordre de la requête ; une lettre en échec n'interrompt pas les autres.
+    
+    - **letters**: Liste de requêtes de lettre (au plus LETTER_BATCH_MAX_SIZE)
+    """
+    
+    max_size = int(os.getenv("LETTER_BATCH_MAX_SIZE", "50"))
+    if len(batch.letters) > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Un lot ne peut pas dépasser {max_size} lettres"
+        )
+    _check_write_capacity()
+    
+    logger.info(f"Début de génération d'un lot de {len(batch.letters)} lettre(s)")
+    semaphore = asyncio.Semaphore(int(os.getenv("LETTER_BATCH_CONCURRENCY", "10")))
+    
+    async def generate(request: LetterRequest) -> str:
+        async with semaphore:
+            return await letter_generator.generate_letter(request, use_cache=cache != CacheModeEnum.BYPASS)
+    
+    outcomes = await asyncio.gather(*(generate(request) for request in batch.letters), return_exceptions=True)
+    results = [
+        LetterBatchItem(index=index, success=False, error=str(outcome))
+        if isinstance(outcome, Exception) else
+        LetterBatchItem(index=index, success=True, lettre=outcome)
+        for index, outcome in enumerate(outcomes)
+    ]
+    generated = [item for item in results if item.success]
+    
+    # Sauvegarde de toutes les lettres générées en une seule insertion
+    if generated:
+        try:
+            db_result = await write_buffer.save_letters(
+                [_letter_data(batch.letters[item.index], item.lettre) for item in generated]
+            )
+            for item, letter_id in zip(generated, db_result["letter_ids"]):
+                item.letter_id = letter_id
+        except Exception as e:
+            logger.error(f"Erreur lors de la sauvegarde du lot en base: {str(e)}")
+    
+    failed = len(results) - len(generated)
+    logger.info(f"Lot généré: {len(generated)} lettre(s), {failed} échec(s)")
+    
+    return LetterBatchResponse(
+        results=results,
+        succeeded=len(generated),
+        failed=failed,
+        message="Lettres générées avec succès" if not failed else f"{failed} lettre(s) en échec"
+    )
+
+
+@app.post("/generate-letter/stream",
+          responses={
+              200: {"content": {"text/event-stream": {}}},
+              500: {"model": ErrorResponse},
+              503: {"model": ErrorResponse}
+          },
+          tags=["Letters"])
+async def generate_letter_stream(request: LetterRequest, cache: CacheModeEnum = CacheModeEnum.DEFAULT):
+    """
+    Génère une lettre en streaming (Server-Sent Events).
+    
+    Les fragments sont envoyés au fil de la génération sous forme d'évènements `token`
+    (`{"text": "..."}`). Une fois la lettre complète sauvegardée, un évènement `done`
+    transmet `{"letter_id": "..."}`. En cas d'échec, un évènement `error` est envoyé.
+    
+    Corps de la requête et paramètre `cache` identiques à `/generate-letter`.
+    """
+    
+    if not letter_generator:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service OpenAI non configuré"
+        )
+    _check_write_capacity()
+    
+    async def event_stream():
+        logger.info("Début de génération de lettre en streaming")
+        parts = []
+        letter_stream = letter_generator.stream_letter(request, use_cache=cache != CacheModeEnum.BYPASS)
+        
+        try:
+            async for text in letter_stream:
+                parts.append(text)
+                yield _sse_event("token", {"text": text})
+            
+            letter_content = "".join(parts).strip()
+            if not letter_content:
+                raise ValueError("Aucun contenu généré par OpenAI")
+            
+            logger.info("Lettre générée avec succès (streaming)")
+            letter_id = await _save_letter(request, letter_content)
+            yield _sse_event("done", {"letter_id": letter_id})
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de lettre en streaming: {str(e)}")
+            yield _sse_event("error", {"error": str(e)})
+        finally:
+            # Ferme la complétion amont (fin normale, erreur ou déconnexion du client)
+            await letter_stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/send-email", 
-          response_model=EmailResponse,
+          response_model=EmailJobResponse,
+          status_code=status.HTTP_202_ACCEPTED,
           responses={
               400: {"model": ErrorResponse},
               500: {"model": ErrorResponse}
@@ -208,7 +446,10 @@ async def generate_letter(request: LetterRequest):
           tags=["Email"])
 async def send_email(request: EmailRequest):
     """
-    Envoie une lettre par email.
+    Met en file l'envoi d'une lettre par email.
+    
+    L'email est envoyé en arrière-plan (avec nouvelles tentatives en cas d'échec) ;
+    l'état de l'envoi est consultable via `GET /email-jobs/{job_id}`.
     
     - **lettre**: Contenu de la lettre à envoyer
     - **email**: Email pour recevoir la lettre
@@ -220,57 +461,21 @@ async def send_email(request: EmailRequest):
     """
     
     try:
-        logger.info(f"Début d'envoi d'email à {request.email}")
-        
-        # Préparation des données pour l'email
-        request_data = {
-            "objet": request.objet,
-            "ton": request.ton.value,
-            "nom": request.nom,
-            "destinataire": request.destinataire
-        }
-        
-        # Envoi de l'email
-        email_sent = False
-        try:
-            await email_sender.send_letter_email(
-                to_email=request.email,
-                letter_content=request.lettre,
-                request_data=request_data
+        if not email_outbox:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Service d'envoi d'email non disponible"
             )
-            email_sent = True
-            logger.info(f"Email envoyé avec succès à {request.email}")
-        except Exception as e:
-            logger.error(f"Erreur lors de l'envoi de l'email: {str(e)}")
-            raise e
-        
-        # Recherche et mise à jour du statut en base de données
-        letter_id_to_update = request.letter_id
-        
-        # Si pas de letter_id fourni, essayer de trouver la lettre par contenu
-        if not letter_id_to_update:
-            try:
-                # Recherche de la lettre la plus récente avec ce contenu
-                result = await database_manager.find_letter_by_content(request.lettre[:100])  # Premiers 100 caractères
-                if result["success"] and result["letter"]:
-                    letter_id_to_update = result["letter"]["id"]
-                    logger.info(f"Lettre trouvée automatiquement: {letter_id_to_update}")
-            except Exception as e:
-                logger.warning(f"Impossible de trouver la lettre automatiquement: {str(e)}")
-        
-        # Mise à jour du statut si on a un letter_id
-        if letter_id_to_update:
-            try:
-                await database_manager.update_email_status(letter_id_to_update, email_sent, request.email)
-                logger.info(f"Statut d'email mis à jour en base pour la lettre {letter_id_to_update}")
-            except Exception as e:
-                logger.warning(f"Erreur lors de la mise à jour du statut: {str(e)}")
-        
-        return EmailResponse(
-            email_sent=email_sent,
-            message="Email envoyé avec succès" if email_sent else "Erreur lors de l'envoi de l'email"
-        )
         
+        # L'envoi SMTP a lieu après la réponse (voir le log "email_job" du job)
+        with server_timing.phase("enqueue"):
+            job = email_outbox.enqueue(request)
+        logger.info(f"Email pour {request.email} mis en file (job {job['job_id']})")
+        
+        return EmailJobResponse(**job, message="Email mis en file d'envoi")
+        
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Erreur de validation: {str(e)}")
         raise HTTPException(
@@ -278,32 +483,74 @@ async def send_email(request: EmailRequest):
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Erreur lors de l'envoi de l'email: {str(e)}")
+        logger.error(f"Erreur lors de la mise en file de l'email: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
 
+@app.get("/email-jobs/{job_id}", 
+         response_model=EmailJobResponse,
+         responses={
+             404: {"model": ErrorResponse}
+         },
+         tags=["Email"])
+async def get_email_job(job_id: str):
+    """
+    Récupère l'état d'un envoi d'email mis en file.
+    
+    - **job_id**: ID du job retourné par `/send-email`
+    """
+    
+    job = email_outbox.get_job(job_id) if email_outbox else None
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job d'envoi non trouvé"
+        )
+    
+    return EmailJobResponse(**job)
+
+
+def _decode_cursor(cursor: Optional[str]):
+    """Décode le curseur de pagination d'une requête (400 s'il est invalide)"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @app.get("/letters", 
           responses={
+              400: {"model": ErrorResponse},
               500: {"model": ErrorResponse}
           },
           tags=["Letters"])
-async def get_recent_letters(limit: int = 10):
+async def get_recent_letters(limit: int = 10, cursor: Optional[str] = None, full: bool = False):
     """
-    Récupère les lettres récentes.
+    Récupère les lettres récentes, page par page.
     
-    - **limit**: Nombre de lettres à récupérer (défaut: 10)
+    - **limit**: Nombre de lettres par page (défaut: 10, maximum: 100)
+    - **cursor**: Curseur `next_cursor` renvoyé par la page précédente
+    - **full**: Inclure le texte de la lettre et le contexte (défaut: résumé)
     """
     
+    after = _decode_cursor(cursor)
+    
     try:
-        result = await database_manager.get_recent_letters(limit)
+        result = await database_manager.get_recent_letters(limit, after, full)
         
         if result["success"]:
             return {
                 "letters": result["letters"],
                 "count": result["count"],
+                "next_cursor": result["next_cursor"],
                 "message": f"{result['count']} lettres récupérées"
             }
         else:
@@ -334,7 +581,7 @@ async def get_letter_by_id(letter_id: str):
     """
     
     try:
-        result = await database_manager.get_letter_by_id(letter_id)
+        result = await write_buffer.get_letter_by_id(letter_id)
         
         if result["success"]:
             return {
@@ -357,23 +604,30 @@ async def get_letter_by_id(letter_id: str):
 
 @app.get("/letters/email/{email}", 
           responses={
+              400: {"model": ErrorResponse},
               500: {"model": ErrorResponse}
           },
           tags=["Letters"])
-async def get_letters_by_email(email: str):
+async def get_letters_by_email(email: str, limit: int = 20, cursor: Optional[str] = None, full: bool = False):
     """
-    Récupère toutes les lettres envoyées à un email.
+    Récupère les lettres envoyées à un email, page par page.
     
     - **email**: Adresse email
+    - **limit**: Nombre de lettres par page (défaut: 20, maximum: 100)
+    - **cursor**: Curseur `next_cursor` renvoyé par la page précédente
+    - **full**: Inclure le texte de la lettre et le contexte (défaut: résumé)
     """
     
+    after = _decode_cursor(cursor)
+    
     try:
-        result = await database_manager.get_letters_by_email(email)
+        result = await database_manager.get_letters_by_email(email, limit, after, full)
         
         if result["success"]:
             return {
                 "letters": result["letters"],
                 "count": result["count"],
+                "next_cursor": result["next_cursor"],
                 "message": f"{result['count']} lettres trouvées pour {email}"
             }
         else:
@@ -392,14 +646,7 @@ async def get_letters_by_email(email: str):
 
 # Endpoints pour le générateur de discours de mariage
 
-@app.post("/generate", 
-          response_model=SpeechResponse,
-          responses={
-              400: {"model": ErrorResponse},
-              500: {"model": ErrorResponse}
-          },
-          tags=["Wedding Speeches"])
-async def generate_speech(
+def _speech_form(
     prenom: str = Form(...),
     marie: str = Form(...),
     partenaire: str = Form(...),
@@ -410,7 +657,63 @@ async def generate_speech(
     souvenir: str = Form(None),
     rencontre: str = Form(None),
     duree: str = Form(None),
-):
+) -> SpeechRequest:
+    """Construit une SpeechRequest à partir des champs de formulaire"""
+    return SpeechRequest(
+        prenom=prenom,
+        marie=marie,
+        partenaire=partenaire,
+        lien=lien,
+        style=style,
+        qualites=qualites,
+        anecdotes=anecdotes,
+        souvenir=souvenir,
+        rencontre=rencontre,
+        duree=duree
+    )
+
+
+async def _save_speech(request: SpeechRequest, speech: str) -> Optional[str]:
+    """Sauvegarde un discours généré en base et retourne son ID (None en cas d'échec)"""
+    
+    try:
+        speech_data = {
+            "prenom": request.prenom,
+            "marie": request.marie,
+            "partenaire": request.partenaire,
+            "style": request.style,
+            "lien": request.lien,
+            "rencontre": request.rencontre,
+            "qualites": request.qualites,
+            "anecdotes": request.anecdotes,
+            "souvenir": request.souvenir,
+            "duree": request.duree,
+            "discours": speech
+        }
+        
+        db_result = await write_buffer.save_speech(speech_data)
+        if db_result["success"]:
+            discours_id = db_result["speech_id"]
+            logger.info(f"Discours sauvegardé en base avec l'ID: {discours_id}")
+            return discours_id
+        
+        logger.warning(f"Erreur lors de la sauvegarde en base: {db_result['error']}")
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde en base: {str(e)}")
+    
+    return None
+
+
+@app.post("/generate", 
+          response_model=SpeechResponse,
+          responses={
+              400: {"model": ErrorResponse},
+              500: {"model": ErrorResponse},
+              503: {"model": ErrorResponse}
+          },
+          tags=["Wedding Speeches"])
+async def generate_speech(speech_request: SpeechRequest = Depends(_speech_form)):
     """
     Génère un discours de mariage personnalisé.
     
@@ -426,74 +729,24 @@ async def generate_speech(
     - **duree**: Durée souhaitée du discours (optionnel)
     """
     
+    _check_write_capacity()
+    
     try:
-        if not openai_client:
+        if not speech_generator:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Service OpenAI non configuré"
             )
         
-        logger.info(f"Début de génération de discours pour {prenom}")
+        logger.info(f"Début de génération de discours pour {speech_request.prenom}")
         
-        # Construction du prompt
-        prompt_parts = [
-            f"Tu es une intelligence artificielle chargée d'écrire un discours de mariage personnalisé.",
-            f"La personne qui parle s'appelle {prenom}, et fait un discours pour {marie}, qui se marie avec {partenaire}.",
-            f"Son lien avec les mariés est : {lien}.",
-        ]
-
-        if style:
-            prompt_parts.append(f"Le style du discours doit être {style}.")
-        if rencontre:
-            prompt_parts.append(f"Ils se sont rencontrés de la manière suivante : {rencontre}.")
-        if qualites:
-            prompt_parts.append(f"Voici les qualités du ou de la marié(e) : {qualites}.")
-        if anecdotes:
-            prompt_parts.append(f"Inclus l'anecdote suivante dans le discours : {anecdotes}.")
-        if souvenir:
-            prompt_parts.append(f"Voici un souvenir important à mentionner : {souvenir}.")
-        if duree:
-            prompt_parts.append(f"Le discours doit durer environ {duree}.")
-
-        prompt_parts.append("Rédige un discours naturel, fluide, adapté à un mariage.")
-
-        final_prompt = " ".join(prompt_parts)
-
         # Génération du discours avec OpenAI
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": final_prompt}],
-            max_tokens=1000
-        )
-
-        speech = response.choices[0].message.content
+        with server_timing.phase("generation"):
+            speech = await speech_generator.generate_speech(speech_request)
         
         # Sauvegarde en base de données
-        discours_id = None
-        try:
-            speech_data = {
-                "prenom": prenom,
-                "marie": marie,
-                "partenaire": partenaire,
-                "style": style,
-                "lien": lien,
-                "rencontre": rencontre,
-                "qualites": qualites,
-                "anecdotes": anecdotes,
-                "souvenir": souvenir,
-                "duree": duree,
-                "discours": speech
-            }
-            
-            db_result = await database_manager.save_speech(speech_data)
-            if db_result["success"]:
-                discours_id = db_result["speech_id"]
-                logger.info(f"Discours sauvegardé en base avec l'ID: {discours_id}")
-            else:
-                logger.warning(f"Erreur lors de la sauvegarde en base: {db_result['error']}")
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde en base: {str(e)}")
+        with server_timing.phase("persistence"):
+            discours_id = await _save_speech(speech_request, speech)
         
         logger.info("Discours généré avec succès")
         
@@ -512,6 +765,65 @@ async def generate_speech(
         )
 
 
+@app.post("/generate/stream",
+          responses={
+              200: {"content": {"text/event-stream": {}}},
+              500: {"model": ErrorResponse},
+              503: {"model": ErrorResponse}
+          },
+          tags=["Wedding Speeches"])
+async def generate_speech_stream(http_request: Request, speech_request: SpeechRequest = Depends(_speech_form)):
+    """
+    Génère un discours de mariage en streaming (Server-Sent Events).
+    
+    Mêmes champs de formulaire que `/generate`. Les fragments sont envoyés sous forme
+    d'évènements `token` (`{"text": "..."}`), puis un évènement `done` transmet
+    `{"discours_id": "..."}` une fois le discours complet sauvegardé.
+    Si le client se déconnecte, la complétion OpenAI est interrompue et rien n'est sauvegardé.
+    """
+    
+    if not speech_generator:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Service OpenAI non configuré"
+        )
+    _check_write_capacity()
+    
+    async def event_stream():
+        logger.info(f"Début de génération de discours en streaming pour {speech_request.prenom}")
+        parts = []
+        speech_stream = speech_generator.stream_speech(speech_request)
+        
+        try:
+            async for text in speech_stream:
+                if await http_request.is_disconnected():
+                    logger.info("Client déconnecté, génération du discours interrompue")
+                    return
+                parts.append(text)
+                yield _sse_event("token", {"text": text})
+            
+            speech = "".join(parts)
+            if not speech.strip():
+                raise ValueError("Aucun contenu généré par OpenAI")
+            
+            logger.info("Discours généré avec succès (streaming)")
+            discours_id = await _save_speech(speech_request, speech)
+            yield _sse_event("done", {"discours_id": discours_id})
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de discours en streaming: {str(e)}")
+            yield _sse_event("error", {"error": str(e)})
+        finally:
+            # Ferme la complétion amont (fin normale, erreur ou déconnexion du client)
+            await speech_stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/send-discours", 
           response_model=SendSpeechResponse,
           responses={
@@ -528,7 +840,7 @@ async def send_discours(email: str = Form(...), discours: str = Form(...)):
     """
     
     try:
-        if not EMAIL_FROM or not EMAIL_PASSWORD:
+        if not email_sender or email_sender.speech_pool is None:
             return SendSpeechResponse(
                 status="error",
                 message="Configuration e-mail manquante"
@@ -536,15 +848,8 @@ async def send_discours(email: str = Form(...), discours: str = Form(...)):
 
         logger.info(f"Début d'envoi de discours à {email}")
 
-        msg = EmailMessage()
-        msg["Subject"] = "Votre discours de mariage complet 💍"
-        msg["From"] = EMAIL_FROM
-        msg["To"] = email
-        msg.set_content(discours)
-
-        with smtplib.SMTP_SSL("mail.infomaniak.com", 465) as smtp:
-            smtp.login(EMAIL_FROM, EMAIL_PASSWORD)
-            smtp.send_message(msg)
+        with server_timing.phase("delivery"):
+            await email_sender.send_speech_email(to_email=email, speech_content=discours)
         
         logger.info(f"Discours envoyé avec succès à {email}")
         
@@ -577,7 +882,7 @@ async def get_discours(discours_id: str):
     """
     
     try:
-        if not database_manager:
+        if not write_buffer:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Service de base de données non disponible"
@@ -592,7 +897,7 @@ async def get_discours(discours_id: str):
                 detail="ID de discours invalide"
             )
         
-        result = await database_manager.get_speech_by_id(discours_id)
+        result = await write_buffer.get_speech_by_id(discours_id)
         
         if result["success"]:
             speech_data = result["speech"]
@@ -624,7 +929,8 @@ async def http_exception_handler(request, exc):
         content={
             "error": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -639,6 +945,157 @@ async def general_exception_handler(request, exc):
         }
     )
 
+@app.get("/export/{table}",
+          responses={
+              400: {"model": ErrorResponse},
+              403: {"model": ErrorResponse},
+              404: {"model": ErrorResponse}
+          },
+          tags=["Export"])
+async def export_table(
+    table: ExportTableEnum,
+    cursor: Optional[str] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    ton: Optional[TonEnum] = None,
+    gzip: bool = False,
+    x_export_token: Optional[str] = Header(None)
+):
+    """
+    Exporte une table en NDJSON (une ligne JSON par enregistrement), en flux.
+    
+    - **table**: `letters` ou `discours`
+    - **after_created_at** / **after_id**: Reprendre après l'enregistrement portant ces valeurs
+      (`created_at` et `id` de la dernière ligne reçue)
+    - **cursor**: Équivalent encodé de cette position : `[created_at, id]` en JSON, encodé
+      en base64 URL-safe sans `=` final (même format que `next_cursor` de GET /letters)
+    - **since** / **until**: Date de création minimale incluse / maximale exclue
+    - **ton**: Ton des lettres à exporter (letters uniquement)
+    - **gzip**: Compresser l'export
+    
+    Désactivé si EXPORT_TOKEN n'est pas défini ; le jeton doit être fourni dans l'en-tête X-Export-Token.
+    """
+    
+    export_token = os.getenv("EXPORT_TOKEN")
+    if not export_token:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export désactivé (EXPORT_TOKEN non défini)"
+        )
+    if x_export_token != export_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Jeton d'export invalide"
+        )
+    
+    if ton and table != ExportTableEnum.LETTERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le filtre ton ne s'applique qu'aux lettres"
+        )
+    
+    if cursor is not None and (after_created_at is not None or after_id is not None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor et after_created_at/after_id sont exclusifs"
+        )
+    if (after_created_at is None) != (after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_created_at et after_id doivent être fournis ensemble"
+        )
+    
+    if after_created_at is not None:
+        try:
+            after = cursor_position(after_created_at, after_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    else:
+        after = _decode_cursor(cursor)
+    
+    async def chunks():
+        try:
+            async for chunk in export_ndjson(
+                database_manager, table.value, after,
+                since.isoformat() if since else None,
+                until.isoformat() if until else None,
+                ton.value if ton else None,
+                compress=gzip
+            ):
+                yield chunk
+        except Exception as e:
+            # Les en-têtes sont déjà envoyés : l'export est interrompu
+            logger.error(f"Erreur lors de l'export de {table.value}: {str(e)}")
+            raise
+    
+    filename = f"{table.value}.ndjson.gz" if gzip else f"{table.value}.ndjson"
+    return StreamingResponse(
+        chunks(),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+
+@app.get("/debug/profile",
+         response_class=PlainTextResponse,
+         responses={
+             400: {"model": ErrorResponse},
+             403: {"model": ErrorResponse},
+             404: {"model": ErrorResponse},
+             409: {"model": ErrorResponse}
+         },
+         tags=["Debug"])
+async def debug_profile(seconds: float = 10, interval_ms: float = 5, x_debug_token: Optional[str] = Header(None)):
+    """
+    Profile le processus en cours par échantillonnage et renvoie les piles repliées.
+    
+    Le fichier obtenu (une ligne « thread;appelant;...;appelé nombre » par pile) s'ouvre
+    dans speedscope ou se convertit en flamegraph avec `flamegraph.pl`.
+    
+    - **seconds**: Durée du profilage (au plus 60 secondes)
+    - **interval_ms**: Intervalle entre deux échantillons (1 à 100 ms)
+    
+    Désactivé si DEBUG_TOKEN n'est pas défini ; le jeton doit être fourni dans l'en-tête X-Debug-Token.
+    """
+    
+    debug_token = os.getenv("DEBUG_TOKEN")
+    if not debug_token:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profilage désactivé (DEBUG_TOKEN non défini)"
+        )
+    if x_debug_token != debug_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Jeton de débogage invalide"
+        )
+    if not 0 < seconds <= 60 or not 1 <= interval_ms <= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="seconds doit être compris entre 0 et 60, interval_ms entre 1 et 100"
+        )
+    
+    try:
+        logger.info(f"Profilage du processus pendant {seconds} s")
+        profiler = await profile(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    logger.info(f"Profilage terminé : {profiler.sample_count} échantillon(s)")
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed"'}
+    )
+
 if __name__ == "__main__":
     # Configuration pour le développement
     uvicorn.run(
@@ -0,0 +1,236 @@
+"""
+Métriques au format d'exposition texte de Prometheus (GET /metrics)
+
+Compteurs, jauges et histogrammes minimalistes, sans dépendance externe : toute
+l'application tourne dans une seule boucle d'événements, un enregistrement se
+résume donc à quelques opérations sur des listes (de l'ordre de la microseconde).
+"""
+
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Bornes (en secondes) des histogrammes de latence, de la microseconde à la minute
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Métrique nommée, avec un jeu fixe de labels"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Compteur monotone"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valeur instantanée"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Histogramme à bornes fixes (comptes par intervalle, somme et nombre d'observations)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Comptes par intervalle (le dernier pour +Inf), puis somme
+            state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _samples(self) -> Iterator[str]:
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """Ensemble des métriques exposées"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Produit l'exposition texte de toutes les métriques"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter(
+    "lettre_facile_http_requests_total", "Requêtes HTTP traitées",
+    ("method", "route", "status")
+)
+HTTP_DURATION = Histogram(
+    "lettre_facile_http_request_duration_seconds", "Durée des requêtes HTTP, corps de réponse compris",
+    ("method", "route")
+)
+STAGE_DURATION = Histogram(
+    "lettre_facile_stage_duration_seconds", "Durée de chaque étape (prompt, OpenAI, base de données, SMTP)",
+    ("stage", "operation")
+)
+ERRORS = Counter(
+    "lettre_facile_errors_total", "Erreurs par étape et par cause",
+    ("stage", "cause")
+)
+OPENAI_TOKENS = Counter(
+    "lettre_facile_openai_tokens_total", "Tokens OpenAI consommés",
+    ("kind",)
+)
+OPENAI_QUEUE_WAIT = Histogram(
+    "lettre_facile_openai_queue_wait_seconds", "Attente en file de l'ordonnanceur OpenAI avant admission"
+)
+QUEUE_DEPTH = Gauge(
+    "lettre_facile_queue_depth", "Profondeur des files internes",
+    ("queue",)
+)
+
+
+@contextmanager
+def stage(name: str, operation: str) -> Iterator[None]:
+    """Mesure la durée d'une étape et compte ses erreurs par type d'exception"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=name, cause=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=name, operation=operation)
+
+
+def timed_stage(name: str) -> Callable:
+    """
+    Décorateur de méthode asynchrone : mesure chaque appel comme une étape
+    (l'opération est le nom de la méthode)
+
+    Les méthodes qui retournent {"success": False, ...} au lieu de lever une
+    exception sont comptées en erreur avec la cause "failed".
+    """
+    def decorator(method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        operation = method.__name__
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            with stage(name, operation):
+                result = await method(*args, **kwargs)
+            if isinstance(result, dict) and result.get("success") is False:
+                ERRORS.inc(stage=name, cause="failed")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_usage(usage: Any) -> None:
+    """Comptabilise les tokens d'une complétion OpenAI (champ usage de la réponse)"""
+    if usage is not None:
+        OPENAI_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+        OPENAI_TOKENS.inc(usage.completion_tokens, kind="completion")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI comptant les requêtes et mesurant leur durée par route
+
+    La route est le modèle de chemin FastAPI (ex: /letters/{letter_id}), pour
+    garder un nombre de séries borné. La durée court jusqu'au dernier fragment
+    du corps, flux SSE et exports compris.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "non_trouvee"
+            HTTP_REQUESTS.inc(method=scope["method"], route=path, status=str(status_code))
+            HTTP_DURATION.observe(time.perf_counter() - start, method=scope["method"], route=path)
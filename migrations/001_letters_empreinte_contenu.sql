@@ -0,0 +1,13 @@
+-- Empreinte du contenu des lettres (SHA-256 du texte normalisé, voir cache.content_fingerprint)
+-- Remplace la recherche ilike 'préfixe%' de find_letter_by_content par une égalité indexée.
+-- À appliquer AVANT de déployer le code qui écrit empreinte_contenu (toute insertion échouerait sinon).
+-- CREATE INDEX CONCURRENTLY refuse de s'exécuter dans une transaction : lancer ce fichier avec
+-- psql (sans --single-transaction), pas depuis l'éditeur SQL ni un outil de migration transactionnel.
+
+ALTER TABLE letters ADD COLUMN IF NOT EXISTS empreinte_contenu text;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS letters_empreinte_contenu_created_at_idx
+    ON letters (empreinte_contenu, created_at DESC);
+
+-- Les lignes existantes sont complétées ensuite par :
+--   python -m migrations.backfill_empreinte_contenu
@@ -0,0 +1,10 @@
+-- Index de la pagination par clé (created_at, id) de GET /letters et GET /letters/email/{email}
+-- Chaque page est lue par un parcours d'index borné, quelle que soit sa position dans l'historique.
+-- CREATE INDEX CONCURRENTLY refuse de s'exécuter dans une transaction : lancer ce fichier avec
+-- psql (sans --single-transaction), pas depuis l'éditeur SQL ni un outil de migration transactionnel.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS letters_created_at_id_idx
+    ON letters (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS letters_email_destinataire_created_at_id_idx
+    ON letters (email_destinataire, created_at DESC, id DESC);
@@ -0,0 +1,96 @@
+"""
+Complète la colonne empreinte_contenu des lettres enregistrées avant son ajout
+
+À lancer après migrations/001_letters_empreinte_contenu.sql. Les lettres sans
+empreinte sont lues par lots dans l'ordre des IDs, puis mises à jour en parallèle
+(par ID). Une mise à jour en échec (erreur ou aucune ligne modifiée, ex: RLS) est
+journalisée puis sautée : le parcours avance toujours. Le script peut être
+relancé sans risque : seules les lignes encore vides sont traitées.
+
+Usage:
+    python -m migrations.backfill_empreinte_contenu --batch 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from cache import content_fingerprint
+from database import DatabaseManager
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def backfill(database: DatabaseManager, batch: int = 200, concurrency: int = 10) -> Dict[str, int]:
+    """
+    Calcule et enregistre l'empreinte des lettres qui n'en ont pas
+
+    Le parcours se fait par clé (id croissant) : une ligne dont la mise à jour
+    échoue n'est pas relue indéfiniment, elle est comptée en échec.
+
+    Returns:
+        Dictionnaire avec le nombre de lettres mises à jour et en échec
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _update(row) -> bool:
+        async with semaphore:
+            try:
+                result = await database.postgrest.table("letters").update(
+                    {"empreinte_contenu": content_fingerprint(row["lettre_generée"] or "")}
+                ).eq("id", row["id"]).execute()
+            except Exception as e:
+                logger.error(f"Échec de la mise à jour de la lettre {row['id']}: {str(e)}")
+                return False
+        if not result.data:
+            logger.error(f"Lettre {row['id']} non modifiée (ligne introuvable ou protégée par RLS)")
+            return False
+        return True
+
+    updated = 0
+    failed = 0
+    last_id: Optional[str] = None
+    while True:
+        query = database.postgrest.table("letters").select("id, lettre_generée").is_("empreinte_contenu", "null")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        result = await query.order("id").limit(batch).execute()
+        if not result.data:
+            return {"updated": updated, "failed": failed}
+
+        outcomes = await asyncio.gather(*(_update(row) for row in result.data))
+        updated += sum(outcomes)
+        failed += len(outcomes) - sum(outcomes)
+        last_id = result.data[-1]["id"]
+        logger.info(f"{updated} lettre(s) complétée(s), {failed} échec(s)")
+
+
+async def run(batch: int, concurrency: int) -> None:
+    database = DatabaseManager()
+    try:
+        result = await backfill(database, batch, concurrency)
+        logger.info(f"Terminé : {result['updated']} lettre(s) mise(s) à jour, {result['failed']} échec(s)")
+    finally:
+        await database.close()
+
+    if result["failed"]:
+        sys.exit(1)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=200, help="Nombre de lettres lues par lot")
+    parser.add_argument("--concurrency", type=int, default=10, help="Mises à jour simultanées")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -10,6 +10,18 @@ class TonEnum(str, Enum):
     CONCIS = "concis"
 
 
+class CacheModeEnum(str, Enum):
+    """Enumération des modes d'utilisation du cache de génération"""
+    DEFAULT = "default"
+    BYPASS = "bypass"
+
+
+class ExportTableEnum(str, Enum):
+    """Enumération des tables exportables"""
+    LETTERS = "letters"
+    DISCOURS = "discours"
+
+
 class LetterRequest(BaseModel):
     """Modèle pour la requête de génération de lettre"""
     nom: str = Field(..., description="Nom de l'expéditeur")
@@ -40,6 +52,50 @@ class LetterResponse(BaseModel):
     letter_id: Optional[str] = Field(None, description="ID de la lettre en base de données")
 
 
+class LetterBatchRequest(BaseModel):
+    """Modèle pour la requête de génération de lettres en lot"""
+    letters: List[LetterRequest] = Field(..., min_length=1, description="Lettres à générer")
+
+
+class LetterBatchItem(BaseModel):
+    """Modèle pour le résultat d'une lettre d'un lot"""
+    index: int = Field(..., description="Position de la lettre dans la requête")
+    success: bool = Field(..., description="Statut de génération de la lettre")
+    lettre: Optional[str] = Field(None, description="Contenu de la lettre générée")
+    letter_id: Optional[str] = Field(None, description="ID de la lettre en base de données")
+    error: Optional[str] = Field(None, description="Erreur rencontrée pour cette lettre")
+
+
+class LetterBatchResponse(BaseModel):
+    """Modèle pour la réponse de génération de lettres en lot"""
+    results: List[LetterBatchItem] = Field(..., description="Résultats, dans l'ordre de la requête")
+    succeeded: int = Field(..., description="Nombre de lettres générées")
+    failed: int = Field(..., description="Nombre de lettres en échec")
+    message: str = Field(..., description="Message d'information")
+
+
+class EmailJobStatus(str, Enum):
+    """Enumération des états d'un envoi d'email en file d'attente"""
+    PENDING = "pending"
+    SENDING = "sending"
+    RETRYING = "retrying"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailJobResponse(BaseModel):
+    """Modèle pour l'état d'un envoi d'email en file d'attente"""
+    job_id: str = Field(..., description="ID du job d'envoi")
+    status: EmailJobStatus = Field(..., description="État de l'envoi (pending, sending, retrying, sent, failed)")
+    email: str = Field(..., description="Email du destinataire")
+    letter_id: Optional[str] = Field(None, description="ID de la lettre en base de données")
+    attempts: int = Field(..., description="Nombre de tentatives effectuées")
+    error: Optional[str] = Field(None, description="Dernière erreur rencontrée")
+    created_at: str = Field(..., description="Date de mise en file")
+    updated_at: str = Field(..., description="Date de dernière mise à jour")
+    message: Optional[str] = Field(None, description="Message d'information")
+
+
 class EmailResponse(BaseModel):
     """Modèle pour la réponse d'envoi d'email"""
     email_sent: bool = Field(..., description="Statut d'envoi de l'email")
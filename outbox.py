@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import random
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models import EmailRequest, EmailJobStatus
+from server_timing import RequestTiming
+
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """File d'envoi d'emails de lettres, vidée en arrière-plan par des workers"""
+
+    def __init__(self, email_sender, database_manager, workers: Optional[int] = None,
+                 max_attempts: Optional[int] = None, retry_base_delay: Optional[float] = None,
+                 max_jobs: int = 10000):
+        """
+        Initialise la file d'envoi
+
+        Args:
+            email_sender: EmailSender utilisé pour l'envoi (sessions SMTP réutilisées)
+            database_manager: DatabaseManager pour la mise à jour du statut des lettres
+            workers: Nombre de workers d'envoi (EMAIL_OUTBOX_WORKERS, défaut: 2)
+            max_attempts: Nombre maximal de tentatives par email (EMAIL_MAX_ATTEMPTS, défaut: 4)
+            retry_base_delay: Délai de base (s) du backoff exponentiel (EMAIL_RETRY_BASE_DELAY, défaut: 2)
+            max_jobs: Nombre de jobs conservés pour consultation du statut
+        """
+        self.email_sender = email_sender
+        self.database_manager = database_manager
+        self.workers = workers or int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+        self.max_attempts = max_attempts or int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else float(os.getenv("EMAIL_RETRY_BASE_DELAY", "2"))
+        self.max_jobs = max_jobs
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._requests: Dict[str, EmailRequest] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._retry_tasks: set = set()
+
+    def start(self) -> None:
+        """Démarre les workers dans la boucle courante"""
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        logger.info(f"Outbox email démarrée avec {self.workers} worker(s)")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Attend la fin des envois en cours (dans la limite du délai) puis arrête les workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox arrêtée avec {self._queue.qsize()} email(s) en attente")
+
+        if self._retry_tasks:
+            logger.warning(f"Outbox arrêtée avec {len(self._retry_tasks)} nouvelle(s) tentative(s) abandonnée(s)")
+
+        for task in [*self._tasks, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retry_tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, request: EmailRequest) -> Dict[str, Any]:
+        """
+        Ajoute un email à la file et retourne le job créé
+
+        Args:
+            request: Requête d'envoi d'email
+
+        Returns:
+            Dictionnaire décrivant le job (job_id, status, ...)
+        """
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "status": EmailJobStatus.PENDING,
+            "email": request.email,
+            "letter_id": request.letter_id,
+            "attempts": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+
+        self._jobs[job["job_id"]] = job
+        self._requests[job["job_id"]] = request
+        self._prune()
+        self._queue.put_nowait(job["job_id"])
+
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne l'état d'un job, ou None s'il est inconnu"""
+        return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        """Nombre d'emails en attente d'envoi"""
+        return self._queue.qsize()
+
+    def _prune(self) -> None:
+        """Oublie les jobs terminés les plus anciens au-delà de max_jobs"""
+        finished = (EmailJobStatus.SENT, EmailJobStatus.FAILED)
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in finished:
+                del self._jobs[job_id]
+
+    def _update(self, job: Dict[str, Any], **changes) -> None:
+        job.update(changes, updated_at=datetime.now().isoformat())
+
+    async def _worker(self, index: int) -> None:
+        """Vide la file en continu"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error(f"Erreur inattendue du worker email {index}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        """Tente l'envoi d'un job, puis le termine ou planifie une nouvelle tentative"""
+        job = self._jobs.get(job_id)
+        request = self._requests.get(job_id)
+        if job is None or request is None:
+            return
+
+        self._update(job, status=EmailJobStatus.SENDING, attempts=job["attempts"] + 1)
+
+        request_data = {
+            "objet": request.objet,
+            "ton": request.ton.value,
+            "nom": request.nom,
+            "destinataire": request.destinataire
+        }
+
+        timing = RequestTiming()
+        try:
+            with timing.phase("delivery"):
+                await self.email_sender.send_letter_email(
+                    to_email=request.email,
+                    letter_content=request.lettre,
+                    request_data=request_data
+                )
+        except Exception as e:
+            timing.log("email_job", job_id=job_id, attempt=job["attempts"], status="error")
+            if job["attempts"] >= self.max_attempts:
+                logger.error(f"Échec définitif de l'envoi à {request.email} après {job['attempts']} tentative(s): {str(e)}")
+                self._update(job, status=EmailJobStatus.FAILED, error=str(e))
+                del self._requests[job_id]
+                return
+
+            # Backoff exponentiel avec gigue
+            delay = self.retry_base_delay * (2 ** (job["attempts"] - 1)) * random.uniform(0.5, 1.5)
+            logger.warning(f"Envoi à {request.email} échoué (tentative {job['attempts']}), nouvel essai dans {delay:.1f}s: {str(e)}")
+            self._update(job, status=EmailJobStatus.RETRYING, error=str(e))
+
+            task = asyncio.create_task(self._requeue_later(job_id, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+            return
+
+        logger.info(f"Email envoyé avec succès à {request.email}")
+        self._update(job, status=EmailJobStatus.SENT, error=None)
+        del self._requests[job_id]
+
+        await self._record_delivery(job, request, timing)
+        timing.log("email_job", job_id=job_id, attempt=job["attempts"], status=EmailJobStatus.SENT.value)
+
+    async def _requeue_later(self, job_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job_id)
+
+    async def _record_delivery(self, job: Dict[str, Any], request: EmailRequest, timing: RequestTiming) -> None:
+        """Met à jour le statut d'envoi de la lettre en base (phases lookup et persistence de timing)"""
+        letter_id_to_update = request.letter_id
+
+        # Si pas de letter_id fourni, essayer de trouver la lettre par contenu
+        if not letter_id_to_update:
+            try:
+                # Recherche de la lettre la plus récente avec ce contenu (empreinte du texte complet)
+                with timing.phase("lookup"):
+                    result = await self.database_manager.find_letter_by_content(request.lettre)
+                if result["success"] and result["letter"]:
+                    letter_id_to_update = result["letter"]["id"]
+                    logger.info(f"Lettre trouvée automatiquement: {letter_id_to_update}")
+            except Exception as e:
+                logger.warning(f"Impossible de trouver la lettre automatiquement: {str(e)}")
+
+        # Mise à jour du statut si on a un letter_id
+        if letter_id_to_update:
+            self._update(job, letter_id=letter_id_to_update)
+            try:
+                with timing.phase("persistence"):
+                    await self.database_manager.update_email_status(letter_id_to_update, True, request.email)
+                logger.info(f"Statut d'email mis à jour en base pour la lettre {letter_id_to_update}")
+            except Exception as e:
+                logger.warning(f"Erreur lors de la mise à jour du statut: {str(e)}")
@@ -0,0 +1,224 @@
+"""
+Profilage du processus en cours d'exécution
+
+- SamplingProfiler : échantillonne la pile de tous les threads à intervalle
+  régulier (sys._current_frames) depuis un thread dédié, et produit des piles
+  repliées (« collapsed stacks ») exploitables par flamegraph.pl ou speedscope.
+- LoopLagMonitor : mesure le retard de la boucle d'événements ; lorsqu'elle
+  reste bloquée au-delà d'un seuil, un thread de surveillance relève la pile du
+  thread de la boucle pour désigner l'appel bloquant (ex: client synchrone).
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Racine du projet : sert à repérer, dans une pile, le dernier appel issu de notre code
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: Optional[FrameType]) -> List[FrameType]:
+    """Pile d'appels de la racine vers la frame courante"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _is_project_frame(frame: FrameType) -> bool:
+    filename = os.path.abspath(frame.f_code.co_filename)
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+
+
+def call_site(frame: Optional[FrameType]) -> str:
+    """Décrit l'appel en cours : dernier appel du projet, puis fonction effectivement exécutée"""
+    frames = _stack(frame)
+    if not frames:
+        return "inconnu"
+
+    leaf = frames[-1]
+    leaf_label = f"{leaf.f_code.co_name} ({os.path.basename(leaf.f_code.co_filename)}:{leaf.f_lineno})"
+    for candidate in reversed(frames):
+        if _is_project_frame(candidate):
+            if candidate is leaf:
+                return leaf_label
+            origin = f"{candidate.f_code.co_name} ({os.path.basename(candidate.f_code.co_filename)}:{candidate.f_lineno})"
+            return f"{origin} -> {leaf_label}"
+    return leaf_label
+
+
+class SamplingProfiler:
+    """Profileur par échantillonnage des piles de tous les threads"""
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Args:
+            interval: Intervalle entre deux échantillons (en secondes)
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = [names.get(thread_id, str(thread_id))]
+                labels.extend(_frame_label(stack_frame) for stack_frame in _stack(frame))
+                self.samples[";".join(labels)] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Piles repliées : une ligne « thread;appelant;...;appelé nombre » par pile distincte"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_profile_lock = asyncio.Lock()
+
+
+async def profile(seconds: float, interval: float = 0.005) -> SamplingProfiler:
+    """
+    Échantillonne le processus pendant `seconds` secondes sans bloquer la boucle
+
+    Raises:
+        RuntimeError: Si un profilage est déjà en cours
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("Un profilage est déjà en cours")
+
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+        return profiler
+
+
+class LoopLagMonitor:
+    """
+    Surveillance du retard de la boucle d'événements
+
+    Une tâche se réveille tous les `interval` et mesure son retard ; un thread
+    de surveillance vérifie qu'elle progresse. Si la boucle reste bloquée plus de
+    `threshold`, la pile du thread de la boucle est relevée et journalisée.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, interval: Optional[float] = None):
+        """
+        Args:
+            threshold: Blocage (s) au-delà duquel la boucle est signalée (LOOP_LAG_THRESHOLD, défaut: 0.1)
+            interval: Période (s) de mesure (LOOP_LAG_INTERVAL, défaut: 0.05)
+        """
+        self.threshold = threshold or float(os.getenv("LOOP_LAG_THRESHOLD", "0.1"))
+        self.interval = interval or float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._reported = False
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent_stalls: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def start(self) -> None:
+        """Démarre la mesure dans la boucle courante et le thread de surveillance"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _beat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+
+            if self._reported and self.recent_stalls and self.recent_stalls[-1]["lag_ms"] is None:
+                # Fin du blocage signalé : sa durée totale est enfin connue
+                self.recent_stalls[-1]["lag_ms"] = round(lag * 1000, 1)
+                logger.warning(f"Boucle d'événements débloquée après {lag * 1000:.0f} ms")
+
+            self._last_beat = time.monotonic()
+            self._reported = False
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked < self.threshold or self._reported:
+                continue
+
+            self._reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            site = call_site(frame)
+            self.stalls += 1
+            self.recent_stalls.append({
+                "detected_at": datetime.now().isoformat(),
+                "lag_ms": None,
+                "call_site": site
+            })
+            stack = "\n".join(f"  {_frame_label(stack_frame)}" for stack_frame in _stack(frame))
+            logger.warning(f"Boucle d'événements bloquée depuis {blocked * 1000:.0f} ms dans {site}\n{stack}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne le retard maximal observé et les derniers blocages"""
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent_stalls)
+        }
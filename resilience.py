@@ -0,0 +1,177 @@
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import openai
+
+
+# Erreurs transitoires pour lesquelles un nouvel essai a des chances d'aboutir
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    openai.APIConnectionError,  # inclut APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+# Nombre minimal de latences observées avant d'activer le hedging
+HEDGE_MIN_SAMPLES = 20
+
+
+def _retry_after(error: Exception) -> float:
+    """Délai demandé par le fournisseur (en-tête Retry-After d'une 429), ou 0"""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CallPolicy:
+    """
+    Délais, nouvelles tentatives et hedging des appels de génération
+
+    Chaque tentative a un délai maximal, et l'appel entier une échéance. Les
+    erreurs transitoires sont réessayées avec un backoff exponentiel à gigue.
+    Avec le hedging, une seconde requête identique est lancée quand la première
+    dépasse le p95 des latences observées ; la première réponse reçue l'emporte.
+    """
+
+    def __init__(self, attempt_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 max_retries: Optional[int] = None, retry_base_delay: Optional[float] = None,
+                 hedging: Optional[bool] = None, hedge_min_delay: Optional[float] = None):
+        """
+        Initialise la politique d'appel
+
+        Args:
+            attempt_timeout: Délai maximal d'une tentative en secondes (OPENAI_ATTEMPT_TIMEOUT, défaut: 30)
+            deadline: Échéance de l'appel, tentatives comprises (OPENAI_DEADLINE, défaut: 90)
+            max_retries: Nombre maximal de nouvelles tentatives (OPENAI_MAX_RETRIES, défaut: 2)
+            retry_base_delay: Délai de base (s) du backoff (OPENAI_RETRY_BASE_DELAY, défaut: 0.5)
+            hedging: Activer le hedging (OPENAI_HEDGING, défaut: false)
+            hedge_min_delay: Délai minimal (s) avant une requête de secours (OPENAI_HEDGE_MIN_DELAY, défaut: 1)
+        """
+        self.attempt_timeout = attempt_timeout or float(os.getenv("OPENAI_ATTEMPT_TIMEOUT", "30"))
+        self.deadline = deadline or float(os.getenv("OPENAI_DEADLINE", "90"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+        self.hedging = hedging if hedging is not None else os.getenv("OPENAI_HEDGING", "false").lower() == "true"
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else float(os.getenv("OPENAI_HEDGE_MIN_DELAY", "1"))
+
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def call(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute factory() avec délais, nouvelles tentatives et hedging
+
+        Args:
+            factory: Fonction retournant la coroutine d'une requête (appelée à chaque tentative)
+
+        Raises:
+            asyncio.TimeoutError: Si la dernière tentative a dépassé son délai
+            Exception: Dernière erreur rencontrée, si elle n'est pas transitoire ou si les tentatives sont épuisées
+        """
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self.attempts += 1
+            try:
+                return await self._attempt(factory, min(self.attempt_timeout, deadline - loop.time()))
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+
+                delay = max(self.retry_base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5), _retry_after(e))
+                if attempt > self.max_retries or loop.time() + delay >= deadline:
+                    self.failures += 1
+                    raise
+
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                self.failures += 1
+                raise
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Délai avant la requête de secours (p95 observé), ou None si le hedging est inactif"""
+        if not self.hedging or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        latencies = sorted(self._latencies)
+        return max(latencies[int(len(latencies) * 0.95)], self.hedge_min_delay)
+
+    async def _timed(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await factory()
+        self._latencies.append(time.monotonic() - start)
+        return result
+
+    async def _attempt(self, factory: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        """Une tentative : requête principale, plus une requête de secours si elle tarde"""
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + timeout
+
+        primary = asyncio.ensure_future(self._timed(factory))
+        pending = {primary}
+        error: Optional[BaseException] = None
+
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(self._timed(factory)))
+
+            while pending:
+                remaining = expires_at - loop.time()
+                done, pending = await asyncio.wait(pending, timeout=max(remaining, 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs d'appels, de nouvelles tentatives et de hedging"""
+        latencies = sorted(self._latencies)
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "hedging": self.hedging,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedges / self.attempts, 4) if self.attempts else 0.0,
+            "hedge_win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else 0.0,
+            "latency_ms": {
+                "p50": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else 0.0
+            }
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import metrics
+
+
+def _limit(name: str, default: str) -> Optional[int]:
+    """Lit une limite depuis l'environnement (0 = illimitée)"""
+    value = int(os.getenv(name, default))
+    return value or None
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    Estime le nombre de tokens consommés par une complétion
+
+    Environ 4 caractères par token pour le prompt, plus un surcoût fixe par
+    message, plus le maximum de tokens générés (borne haute de la réponse).
+    """
+    prompt_tokens = sum(len(message["content"]) // 4 + 4 for message in messages)
+    return prompt_tokens + max_tokens
+
+
+class CompletionScheduler:
+    """
+    Ordonnanceur des appels de complétion OpenAI
+
+    Limite le nombre d'appels simultanés et respecte des budgets glissants de
+    requêtes et de tokens par minute. Les appels au-delà des limites attendent
+    leur tour dans une file FIFO au lieu d'échouer en 429 ; le temps d'attente
+    est mesuré.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, window: float = 60.0):
+        """
+        Initialise l'ordonnanceur
+
+        Args:
+            max_concurrency: Appels simultanés maximum (OPENAI_MAX_CONCURRENCY, défaut: 20)
+            requests_per_minute: Budget de requêtes par minute (OPENAI_RPM_LIMIT, défaut: 500, 0 = illimité)
+            tokens_per_minute: Budget de tokens par minute (OPENAI_TPM_LIMIT, défaut: 200000, 0 = illimité)
+            window: Durée de la fenêtre glissante des budgets (en secondes)
+
+        Raises:
+            ValueError: Si la concurrence est inférieure à 1 ou un budget négatif
+                        (toute admission attendrait indéfiniment)
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("OPENAI_MAX_CONCURRENCY", "20"))
+        self.requests_per_minute = requests_per_minute or _limit("OPENAI_RPM_LIMIT", "500")
+        self.tokens_per_minute = tokens_per_minute or _limit("OPENAI_TPM_LIMIT", "200000")
+        self.window = window
+
+        if self.max_concurrency < 1:
+            raise ValueError(f"OPENAI_MAX_CONCURRENCY doit être au moins 1 (reçu: {self.max_concurrency})")
+        for name, value in (("OPENAI_RPM_LIMIT", self.requests_per_minute), ("OPENAI_TPM_LIMIT", self.tokens_per_minute)):
+            if value is not None and value < 1:
+                raise ValueError(f"{name} doit être positif, ou 0 pour aucune limite (reçu: {value})")
+
+        # File d'attente : (future, tokens estimés, instant de mise en file)
+        self._waiters: Deque[Tuple[asyncio.Future, int, float]] = deque()
+        # Appels admis dans la fenêtre glissante : [instant d'admission, tokens]
+        self._admitted: Deque[List[float]] = deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.admissions = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[List[float]]:
+        """
+        Attend son tour puis occupe une place d'appel pendant le bloc
+
+        Args:
+            estimated_tokens: Tokens estimés de l'appel (voir estimate_tokens)
+
+        Yields:
+            Jeton d'admission, à passer à record_usage une fois la consommation réelle connue
+        """
+        ticket = await self._acquire(estimated_tokens)
+        try:
+            yield ticket
+        finally:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def record_usage(self, ticket: List[float], tokens: int) -> None:
+        """Remplace l'estimation d'un appel par sa consommation réelle dans le budget de tokens"""
+        if ticket[0] > time.monotonic() - self.window:
+            self._window_tokens += tokens - ticket[1]
+            ticket[1] = tokens
+            self._dispatch()
+
+    async def _acquire(self, tokens: int) -> List[float]:
+        if self.tokens_per_minute is not None:
+            # Un appel plus gros que le budget entier passerait sinon jamais
+            tokens = min(tokens, self.tokens_per_minute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, tokens, time.monotonic()))
+        self._dispatch()
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admis au moment de l'annulation : la place est rendue
+                self._in_flight -= 1
+            self._dispatch()
+            raise
+
+    def _prune(self, now: float) -> None:
+        while self._admitted and self._admitted[0][0] <= now - self.window:
+            _, tokens = self._admitted.popleft()
+            self._window_tokens -= tokens
+
+    def _can_admit(self, tokens: int) -> bool:
+        if self._in_flight >= self.max_concurrency:
+            return False
+        if self.requests_per_minute is not None and len(self._admitted) >= self.requests_per_minute:
+            return False
+        if self.tokens_per_minute is not None and self._window_tokens + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    def _dispatch(self) -> None:
+        """Admet les appels en tête de file tant que les limites le permettent"""
+        now = time.monotonic()
+        self._prune(now)
+
+        while self._waiters:
+            future, tokens, queued_at = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._can_admit(tokens):
+                break
+
+            self._waiters.popleft()
+            ticket = [now, tokens]
+            self._admitted.append(ticket)
+            self._window_tokens += tokens
+            self._in_flight += 1
+
+            wait = now - queued_at
+            self.admissions += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent_waits.append(wait)
+            metrics.OPENAI_QUEUE_WAIT.observe(wait)
+
+            future.set_result(ticket)
+
+        # Bloqué par un budget : nouvel essai quand l'appel le plus ancien sort de la fenêtre
+        if self._waiters and self._in_flight < self.max_concurrency and self._admitted and self._timer is None:
+            delay = self._admitted[0][0] + self.window - now
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def queue_depth(self) -> int:
+        """Nombre d'appels en attente d'admission"""
+        return sum(1 for future, _, _ in self._waiters if not future.done())
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne l'état de l'ordonnanceur et les temps d'attente en file (en ms)"""
+        self._prune(time.monotonic())
+        waits = sorted(self._recent_waits)
+        return {
+            "in_flight": self._in_flight,
+            "queued": self.queue_depth(),
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "requests_in_window": len(self._admitted),
+            "tokens_in_window": self._window_tokens,
+            "admissions": self.admissions,
+            "queue_wait_ms": {
+                "avg": round(self.total_wait / self.admissions * 1000, 2) if self.admissions else 0.0,
+                "p50": round(statistics.median(waits) * 1000, 2) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                "max": round(self.max_wait * 1000, 2)
+            }
+        }
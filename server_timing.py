@@ -0,0 +1,105 @@
+"""
+Décomposition du temps de traitement par requête (en-tête Server-Timing)
+
+Les endpoints délimitent leurs phases (génération, persistance, recherche,
+envoi) avec phase(). Pour les routes suivies, le middleware renvoie la durée
+de chaque phase dans l'en-tête Server-Timing (lisible dans les outils de
+développement du navigateur) et écrit un enregistrement JSON par requête dans
+le logger "server_timing".
+"""
+
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from starlette.datastructures import MutableHeaders
+
+
+logger = logging.getLogger("server_timing")
+
+# Routes dont les réponses portent l'en-tête Server-Timing
+TIMED_ROUTES = ("/generate-letter", "/generate", "/send-email", "/send-discours")
+
+
+class RequestTiming:
+    """Durées cumulées des phases d'une requête (ou d'un traitement en arrière-plan)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Ajoute la durée du bloc à la phase (cumulée si la phase se répète)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en ms)"""
+        entries = [f"{name};dur={duration:.1f}" for name, duration in self.phases.items()]
+        entries.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(entries)
+
+    def log(self, event: str, **fields: Any) -> None:
+        """Écrit la décomposition en un seul enregistrement JSON"""
+        record = {
+            "event": event,
+            **fields,
+            "total_ms": round(self.total_ms(), 2),
+            "phases_ms": {name: round(duration, 2) for name, duration in self.phases.items()}
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+
+_current: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mesure une phase de la requête en cours (sans effet hors d'une route suivie)"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    with timing.phase(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """Middleware ASGI ajoutant l'en-tête Server-Timing et le log de décomposition aux routes suivies"""
+
+    def __init__(self, app, paths: Sequence[str] = TIMED_ROUTES):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timing.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            timing.log("request_timing", method=scope["method"], path=scope["path"], status=status_code)
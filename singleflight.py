@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """Appel partagé en cours : tâche amont et nombre d'appelants qui l'attendent"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Regroupe les appels identiques simultanés en une seule exécution
+
+    Le premier appelant pour une clé lance le travail ; les suivants attendent
+    son résultat tant qu'il est en cours. Chaque appelant garde son propre délai
+    et peut être annulé sans affecter les autres ; le travail amont n'est annulé
+    que lorsque plus personne ne l'attend.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Exécute factory() pour la clé, ou rejoint l'exécution déjà en cours
+
+        Args:
+            key: Clé identifiant les appels équivalents
+            factory: Fonction retournant la coroutine à exécuter
+            timeout: Délai maximal d'attente pour cet appelant (en secondes)
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Retiré dès maintenant : un nouvel appelant ne doit pas rejoindre un appel annulé
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Évite l'avertissement "exception never retrieved" si tous les appelants sont partis
+        if call.task.done() and not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Retourne les compteurs de regroupement"""
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
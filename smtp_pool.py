@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import Message
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import aiosmtplib
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Erreurs indiquant que la session SMTP n'est plus utilisable
+_CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError)
+
+
+class SMTPConnectionPool:
+    """Pool de sessions SMTP asynchrones authentifiées, réutilisées d'un envoi à l'autre"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        size: int = 3,
+        use_tls: bool = True,
+        keepalive_interval: float = 60.0,
+        timeout: float = 30.0
+    ):
+        """
+        Initialise le pool (les connexions sont ouvertes à la demande)
+
+        Args:
+            hostname: Serveur SMTP
+            port: Port SMTP
+            username: Identifiant de connexion (aucune authentification si None)
+            password: Mot de passe
+            size: Nombre maximal de sessions ouvertes simultanément
+            use_tls: Connexion TLS directe (port 465)
+            keepalive_interval: Délai (s) après lequel une session inactive est vérifiée par NOOP
+            timeout: Délai maximal (s) des opérations SMTP
+        """
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_tls = use_tls
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+
+        self._idle: Deque[Tuple[aiosmtplib.SMTP, float]] = deque()
+        self._slots = asyncio.Semaphore(size)
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.reconnections = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Ouvre et authentifie une nouvelle session SMTP"""
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            timeout=self.timeout
+        )
+        with metrics.stage("smtp", "connect"):
+            await smtp.connect()
+
+        try:
+            if self.username:
+                with metrics.stage("smtp", "login"):
+                    await smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+
+        self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    def _discard(smtp: aiosmtplib.SMTP) -> None:
+        """Ferme une session sans échange avec le serveur"""
+        if smtp.is_connected:
+            smtp.close()
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        """Récupère une session inactive valide, ou en ouvre une nouvelle"""
+        while self._idle:
+            smtp, last_used = self._idle.pop()
+            if not smtp.is_connected:
+                continue
+
+            if time.monotonic() - last_used >= self.keepalive_interval:
+                try:
+                    await smtp.noop()
+                except (aiosmtplib.SMTPException, OSError):
+                    self._discard(smtp)
+                    continue
+
+            return smtp
+
+        return await self._connect()
+
+    def _checkin(self, smtp: aiosmtplib.SMTP) -> None:
+        """Remet une session dans le pool après usage"""
+        if self._closed or not smtp.is_connected:
+            self._discard(smtp)
+        else:
+            self._idle.append((smtp, time.monotonic()))
+
+    def _ensure_keepalive(self) -> None:
+        """Démarre la tâche de keepalive dans la boucle courante si nécessaire"""
+        if self._keepalive_task is None or self._keepalive_task.done():
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self) -> None:
+        """Envoie périodiquement un NOOP aux sessions inactives et écarte celles qui sont mortes"""
+        while not self._closed:
+            await asyncio.sleep(self.keepalive_interval)
+
+            now = time.monotonic()
+            for entry in list(self._idle):
+                smtp, last_used = entry
+                if now - last_used < self.keepalive_interval or entry not in self._idle:
+                    continue
+
+                # La session est retirée le temps du NOOP pour ne pas être empruntée en parallèle
+                self._idle.remove(entry)
+                try:
+                    await smtp.noop()
+                    self._checkin(smtp)
+                except (aiosmtplib.SMTPException, OSError):
+                    logger.info("Session SMTP inactive fermée par le serveur, retirée du pool")
+                    self._discard(smtp)
+
+    async def send_message(self, message: Message) -> None:
+        """
+        Envoie un message via une session du pool
+
+        Si la session empruntée a été coupée par le serveur, une nouvelle
+        session est ouverte et l'envoi est retenté une fois.
+        """
+        if self._closed:
+            raise RuntimeError("Le pool SMTP est fermé")
+
+        self._ensure_keepalive()
+
+        async with self._slots:
+            smtp = await self._checkout()
+
+            try:
+                try:
+                    with metrics.stage("smtp", "send"):
+                        await smtp.send_message(message)
+                except _CONNECTION_ERRORS:
+                    self._discard(smtp)
+                    self.reconnections += 1
+                    smtp = await self._connect()
+                    with metrics.stage("smtp", "send"):
+                        await smtp.send_message(message)
+            except BaseException:
+                self._discard(smtp)
+                raise
+
+            self.messages_sent += 1
+            self._checkin(smtp)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs du pool"""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "messages_sent": self.messages_sent,
+            "reconnections": self.reconnections
+        }
+
+    async def close(self) -> None:
+        """Ferme proprement toutes les sessions inactives et arrête le keepalive"""
+        self._closed = True
+
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+        while self._idle:
+            smtp, _ = self._idle.pop()
+            try:
+                await smtp.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                self._discard(smtp)
@@ -0,0 +1,163 @@
+import asyncio
+import openai
+from typing import AsyncIterator, Optional
+from models import SpeechRequest
+from llm_client import get_completion_scheduler, get_openai_client
+import metrics
+from cache import request_fingerprint
+from resilience import CallPolicy
+from scheduler import CompletionScheduler, estimate_tokens
+from singleflight import SingleFlight
+
+
+# Nombre maximal de tokens générés pour un discours
+MAX_TOKENS = 1000
+
+
+class SpeechGenerator:
+    """Classe pour générer des discours de mariage avec OpenAI"""
+    
+    def __init__(self, client: Optional[openai.AsyncOpenAI] = None, scheduler: Optional[CompletionScheduler] = None,
+                 policy: Optional[CallPolicy] = None):
+        """
+        Initialise le client OpenAI asynchrone (pool de connexions partagé)
+        
+        Args:
+            client: Client compatible AsyncOpenAI (optionnel, ex: faux client pour les benchmarks)
+            scheduler: Ordonnanceur des appels OpenAI (par défaut, celui partagé par tous les générateurs)
+            policy: Délais, nouvelles tentatives et hedging des générations (configuration par défaut si absent)
+        """
+        self.client = client or get_openai_client()
+        self.scheduler = scheduler or get_completion_scheduler()
+        self.policy = policy or CallPolicy()
+        
+        # Regroupement des requêtes identiques en cours de génération
+        self.inflight = SingleFlight()
+    
+    @staticmethod
+    def request_key(request: SpeechRequest) -> str:
+        """Empreinte canonique des champs de la requête (regroupement des requêtes identiques)"""
+        return request_fingerprint(request.model_dump(mode="json"))
+    
+    def _build_prompt(self, request: SpeechRequest) -> str:
+        """Construit le prompt pour OpenAI basé sur les données de la requête"""
+        
+        prompt_parts = [
+            "Tu es une intelligence artificielle chargée d'écrire un discours de mariage personnalisé.",
+            f"La personne qui parle s'appelle {request.prenom}, et fait un discours pour {request.marie}, qui se marie avec {request.partenaire}.",
+            f"Son lien avec les mariés est : {request.lien}.",
+        ]
+
+        if request.style:
+            prompt_parts.append(f"Le style du discours doit être {request.style}.")
+        if request.rencontre:
+            prompt_parts.append(f"Ils se sont rencontrés de la manière suivante : {request.rencontre}.")
+        if request.qualites:
+            prompt_parts.append(f"Voici les qualités du ou de la marié(e) : {request.qualites}.")
+        if request.anecdotes:
+            prompt_parts.append(f"Inclus l'anecdote suivante dans le discours : {request.anecdotes}.")
+        if request.souvenir:
+            prompt_parts.append(f"Voici un souvenir important à mentionner : {request.souvenir}.")
+        if request.duree:
+            prompt_parts.append(f"Le discours doit durer environ {request.duree}.")
+
+        prompt_parts.append("Rédige un discours naturel, fluide, adapté à un mariage.")
+
+        return " ".join(prompt_parts)
+    
+    def _build_messages(self, request: SpeechRequest) -> list:
+        """Construit la liste des messages envoyés à OpenAI"""
+        with metrics.stage("prompt_build", "speech"):
+            prompt = self._build_prompt(request)
+        return [{"role": "user", "content": prompt}]
+    
+    async def generate_speech(self, request: SpeechRequest, timeout: Optional[float] = None) -> str:
+        """
+        Génère un discours de mariage en utilisant l'API OpenAI
+        
+        Les requêtes identiques en cours de génération partagent une seule complétion OpenAI.
+        
+        Args:
+            request: Données du discours
+            timeout: Délai maximal d'attente de cet appel (en secondes)
+        """
+        
+        try:
+            return await self.inflight.do(self.request_key(request), lambda: self._complete(request), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise Exception("Délai de génération du discours dépassé")
+    
+    async def _complete(self, request: SpeechRequest) -> str:
+        """Appelle OpenAI (délais, nouvelles tentatives et hedging selon self.policy) et retourne le discours complet"""
+        
+        messages = self._build_messages(request)
+        
+        try:
+            response = await self.policy.call(lambda: self._request_completion(messages))
+            
+            speech = response.choices[0].message.content
+            
+            if not speech:
+                raise ValueError("Aucun contenu généré par OpenAI")
+            
+            return speech
+            
+        except asyncio.TimeoutError:
+            # Échéance de l'appel dépassée (délais par tentative et nouvelles tentatives épuisés)
+            metrics.ERRORS.inc(stage="openai_completion", cause="TimeoutError")
+            raise Exception("Délai de réponse d'OpenAI dépassé")
+        except openai.APIError as e:
+            raise Exception(f"Erreur API OpenAI: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Erreur lors de la génération du discours: {str(e)}")
+    
+    async def _request_completion(self, messages: list):
+        """Une requête de complétion OpenAI, dans une place de l'ordonnanceur"""
+        
+        async with self.scheduler.slot(estimate_tokens(messages, MAX_TOKENS)) as ticket:
+            with metrics.stage("openai_completion", "speech"):
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    max_tokens=MAX_TOKENS
+                )
+            if response.usage:
+                self.scheduler.record_usage(ticket, response.usage.total_tokens)
+                metrics.record_usage(response.usage)
+        
+        return response
+    
+    async def stream_speech(self, request: SpeechRequest) -> AsyncIterator[str]:
+        """
+        Génère un discours en flux, fragment par fragment, au fil de la complétion OpenAI
+        
+        La complétion amont est fermée dès que l'itération s'arrête (fin, erreur ou annulation),
+        ce qui interrompt la facturation des tokens restants.
+        """
+        
+        messages = self._build_messages(request)
+        
+        # La place d'appel est occupée pendant toute la durée du flux
+        async with self.scheduler.slot(estimate_tokens(messages, MAX_TOKENS)) as ticket:
+            try:
+                # Étape mesurée de la requête jusqu'au dernier fragment (erreurs comptées par type)
+                with metrics.stage("openai_completion", "speech_stream"):
+                    stream = await self.client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=messages,
+                        max_tokens=MAX_TOKENS,
+                        stream=True,
+                        # Dernier fragment : consommation réelle, imputée au budget de tokens
+                        stream_options={"include_usage": True}
+                    )
+                    try:
+                        async for chunk in stream:
+                            if chunk.usage:
+                                self.scheduler.record_usage(ticket, chunk.usage.total_tokens)
+                                metrics.record_usage(chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                    finally:
+                        await stream.close()
+            except openai.APIError as e:
+                raise Exception(f"Erreur API OpenAI: {str(e)}")
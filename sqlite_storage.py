@@ -0,0 +1,410 @@
+import asyncio
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from cache import TTLCache, content_fingerprint
+from database import MAX_PAGE_SIZE, LETTER_SUMMARY_COLUMNS, StorageBackend, encode_cursor
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS letters (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    nom TEXT,
+    adresse TEXT,
+    destinataire TEXT,
+    adresse_destinataire TEXT,
+    objet TEXT,
+    contexte TEXT,
+    date_effet TEXT,
+    ton TEXT,
+    "lettre_generée" TEXT,
+    empreinte_contenu TEXT,
+    email_destinataire TEXT,
+    email_envoye INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS letters_created_at_id_idx ON letters (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS letters_email_destinataire_created_at_id_idx ON letters (email_destinataire, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS letters_empreinte_contenu_created_at_idx ON letters (empreinte_contenu, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS discours_mariage (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    prenom TEXT,
+    marie TEXT,
+    partenaire TEXT,
+    style TEXT,
+    lien TEXT,
+    rencontre TEXT,
+    qualites TEXT,
+    anecdotes TEXT,
+    souvenirs TEXT,
+    duree TEXT,
+    discours TEXT
+);
+CREATE INDEX IF NOT EXISTS discours_mariage_created_at_id_idx ON discours_mariage (created_at, id);
+"""
+
+TABLES = ("letters", "discours_mariage")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _quote(column: str) -> str:
+    return f'"{column}"'
+
+
+def _letter(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convertit une ligne SQLite de la table letters en dictionnaire (booléens restaurés)"""
+    letter = dict(row)
+    if "email_envoye" in letter:
+        letter["email_envoye"] = bool(letter["email_envoye"])
+    return letter
+
+
+class SQLiteDatabaseManager(StorageBackend):
+    """
+    Stockage local SQLite (mode WAL), même contrat que DatabaseManager
+
+    Une seule connexion est utilisée, depuis un thread dédié : les requêtes sont
+    sérialisées hors de la boucle d'événements. Adapté aux déploiements sur un
+    seul hôte et aux tests de charge sans service externe.
+    """
+
+    def __init__(self, path: str = "lettre_facile.db", cache: Optional[TTLCache] = None):
+        """
+        Ouvre (ou crée) la base SQLite
+
+        Args:
+            path: Chemin du fichier de base (":memory:" pour une base en mémoire)
+            cache: Cache des lectures par ID (lettres et discours), désactivé si None
+        """
+        super().__init__(cache)
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._connection = self._executor.submit(self._connect).result()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.executescript(SCHEMA)
+        return connection
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Exécute une fonction sur la connexion, dans le thread SQLite"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def close(self) -> None:
+        """Ferme la connexion et le thread SQLite"""
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
+
+    def _upsert(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """Insère ou remplace des lignes portant leur ID, en une transaction"""
+        with self._connection:
+            self._connection.execute("BEGIN")
+            for row in rows:
+                row = {"created_at": _now(), **row}
+                columns = list(row)
+                updates = ", ".join(f"{_quote(column)} = excluded.{_quote(column)}" for column in columns if column != "id")
+                self._connection.execute(
+                    f"INSERT INTO {table} ({', '.join(map(_quote, columns))}) "
+                    f"VALUES ({', '.join('?' for _ in columns)}) "
+                    f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                    [row[column] for column in columns]
+                )
+        return len(rows)
+
+    @metrics.timed_stage("db")
+    async def save_letter(self, letter_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Sauvegarde une lettre (voir DatabaseManager.save_letter)"""
+        try:
+            row = {"id": str(uuid.uuid4()), **self._letter_row(letter_data)}
+            await self._run(self._upsert, "letters", [row])
+            return {
+                "success": True,
+                "letter_id": row["id"],
+                "message": "Lettre sauvegardée avec succès"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+
+    @metrics.timed_stage("db")
+    async def save_letters(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sauvegarde plusieurs lettres par upsert sur l'ID (voir DatabaseManager.save_letters)"""
+        try:
+            count = await self._run(self._upsert, "letters", rows)
+            self._invalidate("letters", [row["id"] for row in rows])
+            return {
+                "success": True,
+                "count": count,
+                "message": "Lettres sauvegardées avec succès"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+
+    def _update_email_status(self, letter_id: str, email_sent: bool, email_destinataire: Optional[str]) -> int:
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE letters SET email_envoye = ?, updated_at = ?, "
+                "email_destinataire = COALESCE(?, email_destinataire) WHERE id = ?",
+                (int(email_sent), datetime.now().isoformat(), email_destinataire or None, letter_id)
+            )
+        return cursor.rowcount
+
+    @metrics.timed_stage("db")
+    async def update_email_status(self, letter_id: str, email_sent: bool, email_destinataire: str = None) -> Dict[str, Any]:
+        """Met à jour le statut d'envoi d'email d'une lettre (voir DatabaseManager.update_email_status)"""
+        try:
+            updated = await self._run(self._update_email_status, letter_id, email_sent, email_destinataire)
+            self._invalidate("letters", [letter_id])
+
+            if updated:
+                return {
+                    "success": True,
+                    "message": "Statut d'email mis à jour avec succès"
+                }
+            else:
+                raise Exception("Lettre non trouvée")
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la mise à jour: {str(e)}"
+            }
+
+    def _fetch(self, query: str, parameters: Tuple = ()) -> List[sqlite3.Row]:
+        return self._connection.execute(query, parameters).fetchall()
+
+    @metrics.timed_stage("db")
+    async def get_letter_by_id(self, letter_id: str) -> Dict[str, Any]:
+        """Récupère une lettre par son ID (voir DatabaseManager.get_letter_by_id)"""
+        cached = self._cache_get("letters", letter_id)
+        if cached is not None:
+            return {
+                "success": True,
+                "letter": cached
+            }
+
+        try:
+            epoch = self._cache_epoch
+            rows = await self._run(self._fetch, "SELECT * FROM letters WHERE id = ?", (letter_id,))
+
+            if rows:
+                letter = _letter(rows[0])
+                self._cache_set("letters", letter_id, letter, epoch)
+                return {
+                    "success": True,
+                    "letter": letter
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "Lettre non trouvée"
+                }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la récupération: {str(e)}"
+            }
+
+    async def _list_letters(self, email: Optional[str], limit: int, after: Optional[Tuple[str, str]],
+                            full: bool) -> Dict[str, Any]:
+        """Lit une page de lettres par clé (created_at, id), de la plus récente à la plus ancienne"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        columns = "*" if full else ", ".join(map(_quote, LETTER_SUMMARY_COLUMNS.split(", ")))
+
+        conditions, parameters = [], []
+        if email is not None:
+            conditions.append("email_destinataire = ?")
+            parameters.append(email)
+        if after is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            parameters.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = await self._run(
+            self._fetch,
+            f"SELECT {columns} FROM letters {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*parameters, limit + 1)
+        )
+
+        letters = [_letter(row) for row in rows[:limit]]
+        return {
+            "success": True,
+            "letters": letters,
+            "count": len(letters),
+            "next_cursor": encode_cursor(letters[-1]) if len(rows) > limit else None
+        }
+
+    @metrics.timed_stage("db")
+    async def get_recent_letters(self, limit: int = 10, after: Optional[Tuple[str, str]] = None,
+                                 full: bool = False) -> Dict[str, Any]:
+        """Récupère une page de lettres récentes (voir DatabaseManager.get_recent_letters)"""
+        try:
+            return await self._list_letters(None, limit, after, full)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la récupération: {str(e)}"
+            }
+
+    @metrics.timed_stage("db")
+    async def get_letters_by_email(self, email: str, limit: int = 20, after: Optional[Tuple[str, str]] = None,
+                                   full: bool = False) -> Dict[str, Any]:
+        """Récupère une page des lettres envoyées à un email (voir DatabaseManager.get_letters_by_email)"""
+        try:
+            return await self._list_letters(email, limit, after, full)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la récupération: {str(e)}"
+            }
+
+    async def iter_pages(self, table: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                         until: Optional[str] = None, ton: Optional[str] = None,
+                         page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Parcourt une table par ordre chronologique (voir DatabaseManager.iter_pages)"""
+        if table not in TABLES:
+            raise ValueError(f"Table inconnue: {table}")
+
+        while True:
+            conditions, parameters = [], []
+            if since:
+                conditions.append("created_at >= ?")
+                parameters.append(since)
+            if until:
+                conditions.append("created_at < ?")
+                parameters.append(until)
+            if ton:
+                conditions.append("ton = ?")
+                parameters.append(ton)
+            if after is not None:
+                conditions.append("(created_at, id) > (?, ?)")
+                parameters.extend(after)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            rows = await self._run(
+                self._fetch,
+                f"SELECT * FROM {table} {where} ORDER BY created_at, id LIMIT ?",
+                (*parameters, page_size)
+            )
+
+            page = [_letter(row) if table == "letters" else dict(row) for row in rows]
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+
+            after = (page[-1]["created_at"], page[-1]["id"])
+
+    @metrics.timed_stage("db")
+    async def find_letter_by_content(self, content: str) -> Dict[str, Any]:
+        """Trouve la lettre la plus récente ayant exactement ce contenu (voir DatabaseManager.find_letter_by_content)"""
+        try:
+            rows = await self._run(
+                self._fetch,
+                "SELECT * FROM letters WHERE empreinte_contenu = ? ORDER BY created_at DESC LIMIT 1",
+                (content_fingerprint(content),)
+            )
+
+            if rows:
+                return {
+                    "success": True,
+                    "letter": _letter(rows[0])
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "Aucune lettre trouvée avec ce contenu"
+                }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la recherche: {str(e)}"
+            }
+
+    @metrics.timed_stage("db")
+    async def save_speech(self, speech_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Sauvegarde un discours (voir DatabaseManager.save_speech)"""
+        try:
+            row = {"id": str(uuid.uuid4()), **self._speech_row(speech_data)}
+            await self._run(self._upsert, "discours_mariage", [row])
+            return {
+                "success": True,
+                "speech_id": row["id"],
+                "message": "Discours sauvegardé avec succès"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+
+    @metrics.timed_stage("db")
+    async def save_speeches(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sauvegarde plusieurs discours par upsert sur l'ID (voir DatabaseManager.save_speeches)"""
+        try:
+            count = await self._run(self._upsert, "discours_mariage", rows)
+            self._invalidate("discours_mariage", [row["id"] for row in rows])
+            return {
+                "success": True,
+                "count": count,
+                "message": "Discours sauvegardés avec succès"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la sauvegarde: {str(e)}"
+            }
+
+    @metrics.timed_stage("db")
+    async def get_speech_by_id(self, speech_id: str) -> Dict[str, Any]:
+        """Récupère un discours par son ID (voir DatabaseManager.get_speech_by_id)"""
+        cached = self._cache_get("discours_mariage", speech_id)
+        if cached is not None:
+            return {
+                "success": True,
+                "speech": cached
+            }
+
+        try:
+            epoch = self._cache_epoch
+            rows = await self._run(self._fetch, "SELECT discours, created_at FROM discours_mariage WHERE id = ?", (speech_id,))
+
+            if rows:
+                speech = dict(rows[0])
+                self._cache_set("discours_mariage", speech_id, speech, epoch)
+                return {
+                    "success": True,
+                    "speech": speech
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "Discours non trouvé"
+                }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Erreur lors de la récupération: {str(e)}"
+            }
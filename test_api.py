@@ -123,12 +123,22 @@ Jean Dupont"""
             headers={"Content-Type": "application/json"}
         )
         
-        if response.status_code == 200:
+        if response.status_code == 202:
             result = response.json()
-            print("✅ Envoi d'email réussi!")
-            print(f"   Email envoyé: {result.get('email_sent', False)}")
+            print("✅ Email mis en file d'envoi!")
+            print(f"   Job: {result.get('job_id', '')}")
             print(f"   Message: {result.get('message', '')}")
             
+            # Suivi de l'envoi en arrière-plan
+            for _ in range(10):
+                time.sleep(1)
+                job = requests.get(f"{BASE_URL}/email-jobs/{result['job_id']}").json()
+                if job.get("status") in ("sent", "failed"):
+                    break
+            print(f"   Statut de l'envoi: {job.get('status')}")
+            if job.get("error"):
+                print(f"   Erreur: {job['error']}")
+            
         else:
             print(f"❌ Erreur: {response.status_code}")
             print(f"   Détails: {response.text}")
@@ -0,0 +1,58 @@
+"""
+Tests de SingleFlight (regroupement des appels identiques en cours)
+"""
+
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_identical_calls_are_coalesced():
+    """Les appels simultanés d'une même clé partagent une seule exécution"""
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "lettre"
+
+        results = await asyncio.gather(*(flight.do("cle", work) for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["lettre"] * 5
+    assert calls == 1
+    assert stats == {"in_flight": 0, "executions": 1, "coalesced": 4}
+
+
+def test_new_call_after_last_waiter_cancelled_starts_fresh():
+    """Un appel lancé juste après l'annulation du seul appelant ne rejoint pas l'appel annulé"""
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "lettre"
+
+        waiter = asyncio.create_task(flight.do("cle", slow))
+        await started.wait()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+
+        # Aucun passage par la boucle entre l'annulation et le nouvel appel
+        return await flight.do("cle", fast), flight.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "lettre"
+    assert stats["executions"] == 2
+    assert stats["in_flight"] == 0
@@ -0,0 +1,389 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import content_fingerprint
+from database import StorageBackend
+
+
+logger = logging.getLogger(__name__)
+
+# Délai maximal (s) entre deux essais d'écriture lorsque la base refuse tout
+MAX_RETRY_DELAY = 30.0
+
+
+class WriteBehindFull(Exception):
+    """Le tampon a atteint max_pending lignes : la sauvegarde est refusée"""
+
+
+class WriteBehindBuffer:
+    """
+    Écriture différée des lettres et discours générés
+
+    Les sauvegardes reçoivent immédiatement un UUID attribué localement ; les
+    lignes sont ensuite insérées en lot par une tâche de fond, dès que
+    max_batch lignes sont en attente ou que flush_interval est écoulé.
+    Les lectures par ID et les mises à jour de statut voient les lignes en attente.
+
+    Un lot refusé est coupé en deux jusqu'à isoler les lignes rejetées, pour que
+    les autres soient écrites. Une ligne refusée max_attempts fois est retirée du
+    tampon et ajoutée au fichier des lignes rejetées (JSONL), tout comme les
+    lignes encore en attente à l'arrêt. Au-delà de max_pending lignes en
+    attente, les sauvegardes sont refusées (WriteBehindFull).
+    """
+
+    def __init__(self, database_manager: StorageBackend, max_batch: Optional[int] = None,
+                 flush_interval: Optional[float] = None, max_pending: Optional[int] = None,
+                 max_attempts: Optional[int] = None, dead_letter_path: Optional[str] = None):
+        """
+        Initialise le tampon d'écriture
+
+        Args:
+            database_manager: Backend de stockage utilisé pour les insertions en lot
+            max_batch: Nombre de lignes déclenchant une écriture (WRITE_BEHIND_MAX_BATCH, défaut: 50)
+            flush_interval: Délai maximal (s) avant écriture (WRITE_BEHIND_FLUSH_INTERVAL, défaut: 0.5)
+            max_pending: Lignes en attente au-delà desquelles les sauvegardes sont refusées
+                         (WRITE_BEHIND_MAX_PENDING, défaut: 5000)
+            max_attempts: Écritures refusées avant qu'une ligne soit écartée
+                          (WRITE_BEHIND_MAX_ATTEMPTS, défaut: 8)
+            dead_letter_path: Fichier JSONL des lignes écartées
+                              (WRITE_BEHIND_DEAD_LETTER_PATH, défaut: write_behind_dead_letter.jsonl)
+        """
+        self.database_manager = database_manager
+        self.max_batch = max_batch or int(os.getenv("WRITE_BEHIND_MAX_BATCH", "50"))
+        self.flush_interval = flush_interval or float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+        self.max_pending = max_pending or int(os.getenv("WRITE_BEHIND_MAX_PENDING", "5000"))
+        self.max_attempts = max_attempts or int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "8"))
+        self.dead_letter_path = dead_letter_path or os.getenv("WRITE_BEHIND_DEAD_LETTER_PATH", "write_behind_dead_letter.jsonl")
+
+        # Lignes en attente, indexées par ID (ordre d'insertion conservé)
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {"letters": {}, "discours_mariage": {}}
+        # Lignes en cours d'écriture
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+        # Écritures refusées par ligne (ID -> nombre d'échecs)
+        self._attempts: Dict[str, int] = {}
+        # Cycles consécutifs sans aucune ligne écrite (espacement des essais)
+        self._consecutive_failures = 0
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.rejected = 0
+        self.last_flush_ms = 0.0
+
+    def start(self) -> None:
+        """Démarre la tâche d'écriture en arrière-plan"""
+        self._stopping = False
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self) -> None:
+        """Arrête la tâche de fond et écrit toutes les lignes en attente"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+        if self.queue_depth():
+            # Dernier recours : les lignes restantes sont conservées dans le fichier des lignes écartées
+            logger.error(f"{self.queue_depth()} ligne(s) non sauvegardée(s) à l'arrêt, écrites dans {self.dead_letter_path}")
+            for table, pending in self._pending.items():
+                for row in pending.values():
+                    self._dead_letter(table, row, "Non écrite à l'arrêt du serveur")
+                pending.clear()
+
+    def queue_depth(self) -> int:
+        """Nombre de lignes en attente d'écriture"""
+        return sum(len(rows) for rows in self._pending.values()) + len(self._in_flight)
+
+    def saturated(self) -> bool:
+        """Vrai si le tampon n'accepte plus de nouvelles lignes"""
+        return self.queue_depth() >= self.max_pending
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du tampon"""
+        return {
+            "pending_letters": len(self._pending["letters"]),
+            "pending_speeches": len(self._pending["discours_mariage"]),
+            "in_flight": len(self._in_flight),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "retrying_rows": len(self._attempts),
+            "dead_lettered": self.dead_lettered,
+            "rejected": self.rejected,
+            "saturated": self.saturated(),
+            "last_flush_ms": round(self.last_flush_ms, 2)
+        }
+
+    @staticmethod
+    def _stamp(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Attribue à une ligne son ID et sa date de création"""
+        row["id"] = str(uuid.uuid4())
+        row["created_at"] = datetime.now(timezone.utc).isoformat()
+        return row
+
+    def _check_capacity(self, rows: int) -> None:
+        """
+        Raises:
+            WriteBehindFull: Si le tampon ne peut pas recevoir `rows` lignes de plus
+        """
+        if self.queue_depth() + rows > self.max_pending:
+            self.rejected += rows
+            raise WriteBehindFull(f"Tampon d'écriture saturé ({self.queue_depth()} ligne(s) en attente)")
+
+    async def _enqueue(self, table: str, row: Dict[str, Any]) -> str:
+        """
+        Ajoute une ligne au tampon et retourne son ID
+
+        Raises:
+            WriteBehindFull: Si le tampon reste saturé après une écriture immédiate
+        """
+        if self.saturated():
+            # Contre-pression si la base ne suit plus, puis refus si elle refuse toujours
+            await self.flush()
+        self._check_capacity(1)
+
+        self._stamp(row)
+        self._pending[table][row["id"]] = row
+
+        if len(self._pending[table]) >= self.max_batch and not self._consecutive_failures:
+            self._wakeup.set()
+
+        return row["id"]
+
+    async def save_letter(self, letter_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Met une lettre en attente d'écriture (même contrat que DatabaseManager.save_letter)"""
+        letter_id = await self._enqueue("letters", StorageBackend._letter_row(letter_data))
+        return {
+            "success": True,
+            "letter_id": letter_id,
+            "message": "Lettre sauvegardée avec succès"
+        }
+
+    async def save_letters(self, letters_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sauvegarde un lot de lettres en une seule insertion, sans attendre le prochain cycle
+
+        En cas d'échec, les lignes rejoignent le tampon et sont réessayées comme
+        les autres : les IDs retournés restent valides. L'écriture a lieu sous le
+        même verrou que flush(), qui ne voit donc jamais le tampon à moitié restauré.
+
+        Returns:
+            Dictionnaire avec les IDs des lettres, dans l'ordre de letters_data
+
+        Raises:
+            WriteBehindFull: Si le tampon ne pourrait pas reprendre le lot en cas d'échec
+        """
+        rows = [self._stamp(StorageBackend._letter_row(data)) for data in letters_data]
+        ids = [row["id"] for row in rows]
+
+        async with self._flush_lock:
+            self._check_capacity(len(rows))
+
+            self._in_flight.update(zip(ids, rows))
+
+            start = time.perf_counter()
+            try:
+                result = await self.database_manager.save_letters(rows)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            except BaseException:
+                self._restore("letters", ids, rows)
+                raise
+            finally:
+                for row_id in ids:
+                    self._in_flight.pop(row_id, None)
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+            if result["success"]:
+                self.flushes += 1
+                self.flushed_rows += len(rows)
+            else:
+                self.failures += 1
+                self._restore("letters", ids, rows)
+                self._wakeup.set()
+                logger.error(f"Échec de l'insertion d'un lot de {len(rows)} lettre(s), écriture différée: {result['error']}")
+
+        return {
+            "success": True,
+            "letter_ids": ids,
+            "message": f"{len(ids)} lettre(s) sauvegardée(s) avec succès"
+        }
+
+    async def save_speech(self, speech_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Met un discours en attente d'écriture (même contrat que DatabaseManager.save_speech)"""
+        speech_id = await self._enqueue("discours_mariage", StorageBackend._speech_row(speech_data))
+        return {
+            "success": True,
+            "speech_id": speech_id,
+            "message": "Discours sauvegardé avec succès"
+        }
+
+    async def get_letter_by_id(self, letter_id: str) -> Dict[str, Any]:
+        """Récupère une lettre, en attente d'écriture ou déjà en base"""
+        row = self._pending["letters"].get(letter_id) or self._in_flight.get(letter_id)
+        if row is not None:
+            return {"success": True, "letter": dict(row)}
+        return await self.database_manager.get_letter_by_id(letter_id)
+
+    async def get_speech_by_id(self, speech_id: str) -> Dict[str, Any]:
+        """Récupère un discours, en attente d'écriture ou déjà en base"""
+        row = self._pending["discours_mariage"].get(speech_id) or self._in_flight.get(speech_id)
+        if row is not None:
+            return {"success": True, "speech": {"discours": row["discours"], "created_at": row["created_at"]}}
+        return await self.database_manager.get_speech_by_id(speech_id)
+
+    async def find_letter_by_content(self, content: str) -> Dict[str, Any]:
+        """Trouve une lettre par son contenu exact, parmi les lignes en attente puis en base"""
+        fingerprint = content_fingerprint(content)
+        for row in reversed([*self._in_flight.values(), *self._pending["letters"].values()]):
+            if row.get("empreinte_contenu") == fingerprint:
+                return {"success": True, "letter": dict(row)}
+        return await self.database_manager.find_letter_by_content(content)
+
+    async def update_email_status(self, letter_id: str, email_sent: bool, email_destinataire: str = None) -> Dict[str, Any]:
+        """Met à jour le statut d'envoi d'une lettre, directement dans le tampon si elle n'est pas encore écrite"""
+        if letter_id in self._in_flight:
+            # Toute écriture (flush ou save_letters) a lieu sous _flush_lock : une fois le verrou
+            # libéré, la ligne est en base ou de retour dans le tampon (en cas d'échec)
+            async with self._flush_lock:
+                pass
+
+        row = self._pending["letters"].get(letter_id)
+        if row is not None:
+            row["email_envoye"] = email_sent
+            if email_destinataire:
+                row["email_destinataire"] = email_destinataire
+            return {"success": True, "message": "Statut d'email mis à jour avec succès"}
+
+        return await self.database_manager.update_email_status(letter_id, email_sent, email_destinataire)
+
+    async def _flusher(self) -> None:
+        """Écrit le tampon à intervalle régulier ou dès qu'un lot est plein (essais espacés si la base refuse tout)"""
+        while not self._stopping:
+            delay = min(self.flush_interval * 2 ** self._consecutive_failures, MAX_RETRY_DELAY)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erreur inattendue lors de l'écriture différée: {str(e)}")
+
+    async def flush(self) -> None:
+        """Écrit toutes les lignes en attente, par lots de max_batch"""
+        async with self._flush_lock:
+            written = False
+            for table, save in (("letters", self.database_manager.save_letters),
+                                ("discours_mariage", self.database_manager.save_speeches)):
+                pending = self._pending[table]
+                # Lignes refusées, réessayées au prochain cycle seulement
+                retry: List[Dict[str, Any]] = []
+                try:
+                    while pending:
+                        ids = list(pending)[:self.max_batch]
+                        batch: List[Dict[str, Any]] = [pending.pop(row_id) for row_id in ids]
+                        self._in_flight.update(zip(ids, batch))
+
+                        try:
+                            rejected = await self._write(table, save, batch)
+                        except BaseException:
+                            retry.extend(batch)
+                            raise
+                        finally:
+                            for row_id in ids:
+                                self._in_flight.pop(row_id, None)
+
+                        if rejected:
+                            retry.extend(self._retry_or_dead_letter(table, rejected))
+                        if len(rejected) == len(batch):
+                            # Aucune ligne acceptée (base indisponible ?) : nouvel essai au prochain cycle
+                            break
+                        written = True
+                finally:
+                    if retry:
+                        self._restore(table, [row["id"] for row in retry], retry)
+
+            if written or not self.queue_depth():
+                self._consecutive_failures = 0
+            else:
+                self._consecutive_failures += 1
+
+    async def _write(self, table: str, save, batch: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Écrit un lot ; en cas d'échec, le coupe en deux jusqu'à isoler les lignes refusées
+
+        Returns:
+            Lignes refusées, avec l'erreur de la base
+        """
+        start = time.perf_counter()
+        try:
+            result = await save(batch)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+        if result["success"]:
+            self.flushes += 1
+            self.flushed_rows += len(batch)
+            for row in batch:
+                self._attempts.pop(row["id"], None)
+            return []
+
+        self.failures += 1
+        if len(batch) == 1:
+            return [(batch[0], result["error"])]
+
+        middle = len(batch) // 2
+        return await self._write(table, save, batch[:middle]) + await self._write(table, save, batch[middle:])
+
+    def _retry_or_dead_letter(self, table: str, rejected: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Écarte les lignes refusées max_attempts fois et retourne celles à réessayer"""
+        retry = []
+        for row, error in rejected:
+            attempts = self._attempts.get(row["id"], 0) + 1
+            if attempts >= self.max_attempts:
+                self._attempts.pop(row["id"], None)
+                self._dead_letter(table, row, error)
+            else:
+                self._attempts[row["id"]] = attempts
+                retry.append(row)
+
+        logger.error(f"Échec de l'écriture de {len(rejected)} ligne(s) dans {table}: {rejected[0][1]}")
+        return retry
+
+    def _dead_letter(self, table: str, row: Dict[str, Any], error: str) -> None:
+        """Ajoute une ligne écartée au fichier des lignes rejetées (à réinsérer à la main)"""
+        self.dead_lettered += 1
+        record = {
+            "table": table,
+            "row": row,
+            "error": error,
+            "dead_lettered_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter_file:
+                dead_letter_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            logger.error(f"Ligne {row['id']} de {table} écartée dans {self.dead_letter_path}: {error}")
+        except OSError as e:
+            logger.critical(f"Ligne {row['id']} de {table} perdue (fichier {self.dead_letter_path} inaccessible: {str(e)}): {record}")
+
+    def _restore(self, table: str, ids: List[str], batch: List[Dict[str, Any]]) -> None:
+        """Remet un lot non écrit en tête du tampon"""
+        self._pending[table] = {**dict(zip(ids, batch)), **self._pending[table]}